@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class AuthxConfig(AppConfig):
+    name = "apps.authx"
+
+    def ready(self):
+        from . import signals  # noqa: F401
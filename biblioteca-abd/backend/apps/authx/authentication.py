@@ -5,6 +5,7 @@ from django.contrib.auth.models import User
 from django.core import signing
 from rest_framework import authentication, exceptions
 
+from .services import user_cache
 from .services.redis_service import cache_get
 
 
@@ -25,6 +26,11 @@ class SignedTokenAuthentication(authentication.BaseAuthentication):
         except signing.BadSignature as exc:
             raise exceptions.AuthenticationFailed("Token inválido") from exc
 
+        # The signature is always checked; only the Redis/DB lookups are cached.
+        user = user_cache.get_user(user_pk, token)
+        if user is not None:
+            return (user, token)
+
         cached = cache_get(f"auth:token:{token}")
         if not cached:
             raise exceptions.AuthenticationFailed("Token no encontrado")
@@ -38,4 +44,5 @@ class SignedTokenAuthentication(authentication.BaseAuthentication):
         except User.DoesNotExist as exc:
             raise exceptions.AuthenticationFailed("Usuario no encontrado") from exc
 
+        user_cache.remember_user(user, token)
         return (user, token)
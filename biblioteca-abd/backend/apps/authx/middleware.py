@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+
+class RateLimitHeadersMiddleware:
+    """Añade ``X-RateLimit-Limit``/``X-RateLimit-Remaining`` si la petición pasó por el limitador."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        result = getattr(request, "rate_limit", None)
+        if result is not None:
+            response["X-RateLimit-Limit"] = str(result.limit)
+            response["X-RateLimit-Remaining"] = str(result.remaining)
+        return response
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Optional, Union
+
+from django.conf import settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is in requirements.txt
+    msgpack = None
+
+# Framed entries start with a NUL byte, which JSON text can never start with,
+# followed by one byte for the format and one for the compression. Anything
+# else is a plain JSON value written before the codec layer existed.
+MARKER = b"\x00"
+FORMAT_JSON = b"j"
+FORMAT_MSGPACK = b"m"
+COMPRESSION_NONE = b"-"
+COMPRESSION_ZLIB = b"z"
+
+
+class CacheCodecError(ValueError):
+    pass
+
+
+def encode(value: Any, codec: Optional[str] = None, compress_min_bytes: Optional[int] = None) -> bytes:
+    """Serializa ``value`` con el codec configurado y comprime si supera el umbral.
+
+    Con ``CACHE_CODEC=json`` y sin compresión se escribe JSON plano, legible
+    también por procesos que todavía no conocen el marcador.
+    """
+    fmt = FORMAT_MSGPACK if (codec or settings.CACHE_CODEC) == "msgpack" and msgpack is not None else FORMAT_JSON
+    if fmt == FORMAT_MSGPACK:
+        payload = msgpack.packb(value, use_bin_type=True)
+    else:
+        payload = json.dumps(value, separators=(",", ":")).encode()
+    threshold = settings.CACHE_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+    if 0 < threshold <= len(payload):
+        return MARKER + fmt + COMPRESSION_ZLIB + zlib.compress(payload, settings.CACHE_COMPRESS_LEVEL)
+    if fmt == FORMAT_JSON:
+        return payload
+    return MARKER + fmt + COMPRESSION_NONE + payload
+
+
+def decode(data: Union[bytes, str]) -> Any:
+    if isinstance(data, str):
+        return json.loads(data)
+    if not data.startswith(MARKER):
+        return json.loads(data)
+    fmt, compression, payload = data[1:2], data[2:3], data[3:]
+    if compression == COMPRESSION_ZLIB:
+        payload = zlib.decompress(payload)
+    elif compression != COMPRESSION_NONE:
+        raise CacheCodecError(f"compresión desconocida: {compression!r}")
+    if fmt == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise CacheCodecError("msgpack no está instalado")
+        return msgpack.unpackb(payload, raw=False)
+    if fmt == FORMAT_JSON:
+        return json.loads(payload)
+    raise CacheCodecError(f"formato desconocido: {fmt!r}")
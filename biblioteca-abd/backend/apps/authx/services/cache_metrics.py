@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import structlog
+from django.conf import settings
+
+logger = structlog.get_logger(__name__)
+
+# Key families: a key is labelled with the first prefix it starts with, so ids,
+# digests and tokens never end up as metric labels.
+KEY_PREFIXES = (
+    "cache:books:list:",
+    "cache:books:detail:",
+    "cache:books:tag:",
+    "cache:books:summary:",
+    "cache:books:gen",
+    "cache:books:popular",
+    "stats:books:dirty",
+    "auth:token:",
+    "ratelimit:",
+    "antispam:",
+    "lock:",
+)
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def prefix_of(key: Optional[str]) -> str:
+    if not key:
+        return "other"
+    for prefix in KEY_PREFIXES:
+        if key.startswith(prefix):
+            return prefix.rstrip(":")
+    return key.split(":", 1)[0] + ":*"
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+class CacheMetrics:
+    """Contadores por prefijo y nivel, bytes leídos/escritos e histogramas de latencia por operación.
+
+    Son por proceso; ``render_prometheus`` los expone en formato de texto de
+    Prometheus y ``maybe_log`` los vuelca a structlog cada
+    CACHE_METRICS_LOG_INTERVAL_SECONDS segundos (0 lo desactiva).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.lookups: Dict[Tuple[str, str, str], int] = defaultdict(int)
+            self.bytes: Dict[Tuple[str, str], int] = defaultdict(int)
+            self.latency: Dict[Tuple[str, str], _Histogram] = defaultdict(_Histogram)
+            self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+            self.gauges: Dict[str, Callable[[], float]] = getattr(self, "gauges", {})
+            self._logged_at = time.monotonic()
+
+    def lookup(self, key: str, tier: str, outcome: str, size: int = 0) -> None:
+        prefix = prefix_of(key)
+        with self._lock:
+            self.lookups[(prefix, tier, outcome)] += 1
+            if size:
+                self.bytes[(prefix, "read")] += size
+
+    def written(self, key: str, size: int) -> None:
+        with self._lock:
+            self.bytes[(prefix_of(key), "written")] += size
+
+    def operation(self, op: str, key: Optional[str], elapsed_ms: float, failed: bool) -> None:
+        prefix = prefix_of(key)
+        with self._lock:
+            self.latency[(op, prefix)].observe(elapsed_ms)
+            if failed:
+                self.errors[(op, prefix)] += 1
+        self.maybe_log()
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        self.gauges[name] = read
+
+    def tiers(self) -> Dict[str, Dict[str, int]]:
+        totals: Dict[str, Dict[str, int]] = {
+            "l1": {"hits": 0, "misses": 0},
+            "l2": {"hits": 0, "misses": 0, "stale": 0, "errors": 0},
+        }
+        plural = {"hit": "hits", "miss": "misses", "stale": "stale", "error": "errors"}
+        with self._lock:
+            for (_prefix, tier, outcome), value in self.lookups.items():
+                totals[tier][plural[outcome]] = totals[tier].get(plural[outcome], 0) + value
+        return totals
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = {
+                f"{prefix}|{tier}|{outcome}": value for (prefix, tier, outcome), value in self.lookups.items()
+            }
+            latency = {
+                f"{op}|{prefix}": {"count": hist.count, "mean_ms": round(hist.total / hist.count, 3)}
+                for (op, prefix), hist in self.latency.items()
+                if hist.count
+            }
+            errors = {f"{op}|{prefix}": value for (op, prefix), value in self.errors.items()}
+        return {"lookups": lookups, "latency": latency, "errors": errors}
+
+    def maybe_log(self) -> None:
+        interval = settings.CACHE_METRICS_LOG_INTERVAL_SECONDS
+        now = time.monotonic()
+        if interval <= 0 or now - self._logged_at < interval:
+            return
+        self._logged_at = now
+        logger.info("cache_metrics", **self.snapshot())
+
+    def render_prometheus(self) -> str:
+        lines: List[str] = [
+            "# HELP biblioteca_cache_lookups_total Lecturas de cache por prefijo, nivel y resultado.",
+            "# TYPE biblioteca_cache_lookups_total counter",
+        ]
+        with self._lock:
+            for (prefix, tier, outcome), value in sorted(self.lookups.items()):
+                lines.append(
+                    f'biblioteca_cache_lookups_total{{prefix="{prefix}",tier="{tier}",outcome="{outcome}"}} {value}'
+                )
+            lines += [
+                "# HELP biblioteca_cache_bytes_total Bytes de valores de cache leídos y escritos en Redis.",
+                "# TYPE biblioteca_cache_bytes_total counter",
+            ]
+            for (prefix, direction), value in sorted(self.bytes.items()):
+                lines.append(
+                    f'biblioteca_cache_bytes_total{{prefix="{prefix}",direction="{direction}"}} {value}'
+                )
+            lines += [
+                "# HELP biblioteca_redis_errors_total Operaciones Redis fallidas.",
+                "# TYPE biblioteca_redis_errors_total counter",
+            ]
+            for (op, prefix), value in sorted(self.errors.items()):
+                lines.append(f'biblioteca_redis_errors_total{{op="{op}",prefix="{prefix}"}} {value}')
+            lines += [
+                "# HELP biblioteca_redis_latency_ms Latencia de las operaciones Redis en milisegundos.",
+                "# TYPE biblioteca_redis_latency_ms histogram",
+            ]
+            for (op, prefix), hist in sorted(self.latency.items()):
+                labels = f'op="{op}",prefix="{prefix}"'
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS_MS, "+Inf"), hist.buckets):
+                    cumulative += count
+                    lines.append(f'biblioteca_redis_latency_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"biblioteca_redis_latency_ms_sum{{{labels}}} {round(hist.total, 3)}")
+                lines.append(f"biblioteca_redis_latency_ms_count{{{labels}}} {hist.count}")
+            gauges = dict(self.gauges)
+        for name, read in sorted(gauges.items()):
+            lines += [f"# TYPE {name} gauge", f"{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = CacheMetrics()
@@ -2,12 +2,91 @@ from __future__ import annotations
 
 import hashlib
 import json
+import os
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import redis
+import structlog
 from django.conf import settings
 
+from . import cache_codec
+from .cache_metrics import metrics
+from .local_cache import LocalCache
+
+logger = structlog.get_logger(__name__)
+
+EVENTS_CHANNEL = "events:biblioteca"
+# Local-only pseudo event: fired when the subscription (re)starts or drops.
+EVENTS_RESET = "events_reset"
+LISTENER_RETRY_SECONDS = 5.0
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, bool], redis.Redis] = {}
+
+
+def _build_client(url: str, binary: bool = False) -> redis.Redis:
+    pool = redis.BlockingConnectionPool.from_url(
+        url,
+        decode_responses=not binary,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def get_client(url: Optional[str] = None, binary: bool = False) -> redis.Redis:
+    """Cliente compartido por proceso; todas las llamadas reutilizan su pool de conexiones.
+
+    ``binary=True`` devuelve bytes sin decodificar, para los valores de cache.
+    """
+    key = (url or settings.REDIS_URL, binary)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build_client(*key)
+        return client
+
+
+def reset_clients() -> None:
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.connection_pool.disconnect()
+
+
+def _reset_after_fork() -> None:
+    # redis-py already discards inherited connections on the first checkout in a
+    # new pid; dropping the clients as well gives each child its own pool sized
+    # by REDIS_MAX_CONNECTIONS instead of sharing the parent's counters.
+    global _lock, _listener, _events_connected, _local_generation
+    _lock = threading.Lock()
+    _clients.clear()
+    # The listener thread does not survive the fork: until the child starts its
+    # own, its L1 would miss invalidations, so it starts empty and disabled.
+    _listener = None
+    _events_connected = False
+    _local_generation = None
+    if _l1 is not None:
+        _l1.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 @dataclass
 class RedisClient:
@@ -15,75 +94,623 @@ class RedisClient:
 
     @property
     def client(self) -> redis.Redis:
-        return redis.from_url(self.url, decode_responses=True)
+        return get_client(self.url)
+
+    @property
+    def binary(self) -> redis.Redis:
+        return get_client(self.url, binary=True)
 
 
 redis_client = RedisClient()
 
 
-def _safe_execute(func, default=None):
+_redis_available = True
+
+
+def _safe_execute(func, default=None, op: str = "redis", key: Optional[str] = None):
+    """Ejecuta ``func`` midiendo su latencia; si Redis falla cuenta el error y devuelve ``default``."""
+    global _redis_available
+    started = time.perf_counter()
     try:
-        return func()
-    except redis.RedisError:
+        result = func()
+    except redis.RedisError as exc:
+        metrics.operation(op, key, (time.perf_counter() - started) * 1000, failed=True)
+        # Log transitions only, not every failed call while Redis stays down.
+        if _redis_available:
+            _redis_available = False
+            logger.warning("redis_unavailable", op=op, key=key, error=str(exc))
         return default
+    metrics.operation(op, key, (time.perf_counter() - started) * 1000, failed=False)
+    if not _redis_available:
+        _redis_available = True
+        logger.info("redis_recovered", op=op)
+    return result
+
+
+# --- L1: per-process cache kept coherent through pub/sub ----------------------
+
+_l1: Optional[LocalCache] = None
+_listener: Optional[threading.Thread] = None
+_events_connected = False
+_local_generation: Optional[Tuple[float, int]] = None
+_event_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = defaultdict(list)
+
+
+def _local_cache() -> Optional[LocalCache]:
+    """L1 activo solo si está habilitado y el proceso escucha las invalidaciones."""
+    global _l1
+    if not settings.CACHE_L1_ENABLED or not events_connected():
+        return None
+    if _l1 is None:
+        _l1 = LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_TTL_SECONDS)
+    return _l1
+
+
+def _local_cache_for(key: str) -> Optional[LocalCache]:
+    if not key.startswith(tuple(settings.CACHE_L1_PREFIXES)):
+        return None
+    return _local_cache()
+
+
+def reset_local_cache() -> None:
+    global _l1, _local_generation
+    _l1 = None
+    _local_generation = None
+    metrics.reset()
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Aciertos y fallos por nivel desde el arranque del proceso (detalle por prefijo en ``/metrics``)."""
+    report: Dict[str, Dict[str, Any]] = {}
+    for tier, counts in metrics.tiers().items():
+        hits = counts["hits"] + counts.get("stale", 0)
+        total = hits + counts["misses"]
+        report[tier] = {**counts, "hit_ratio": round(hits / total, 4) if total else 0.0}
+    report["l1"]["size"] = len(_l1) if _l1 is not None else 0
+    return report
+
+
+def events_connected() -> bool:
+    """Arranca el listener de ``events:biblioteca`` si hace falta e indica si está suscrito.
+
+    Las caches locales solo deben usarse mientras devuelva True: sin suscripción
+    se perderían las invalidaciones de otros procesos.
+    """
+    _ensure_listener()
+    return _events_connected
+
 
+def register_event_handler(event: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """Suscribe ``handler(payload)`` a un evento publicado con ``publish_event``."""
+    if handler not in _event_handlers[event]:
+        _event_handlers[event].append(handler)
 
-def cache_set(key: str, value: Any, ttl: Optional[int] = None) -> None:
-    serialized = json.dumps(value)
+
+def _dispatch_event(raw: str) -> None:
+    try:
+        message = json.loads(raw)
+    except (TypeError, ValueError):
+        return
+    for handler in list(_event_handlers.get(message.get("event"), ())):
+        try:
+            handler(message.get("payload") or {})
+        except Exception:
+            logger.exception("event_handler_failed", event=message.get("event"))
+
+
+def _ensure_listener() -> None:
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    with _lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        _listener = threading.Thread(target=_listen, name="redis-events", daemon=True)
+        _listener.start()
+
+
+def _listen() -> None:
+    global _events_connected
+    while True:
+        try:
+            client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+            )
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(EVENTS_CHANNEL)
+            # Whatever was cached before this subscription (previous connection,
+            # parent process before a fork) may have missed invalidations.
+            _drop_local_state()
+            _events_connected = True
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    _dispatch_event(message["data"])
+        except redis.RedisError as exc:
+            # Invalidations published while we were disconnected are lost: drop
+            # everything local and bypass L1 until the subscription is back.
+            if _events_connected:
+                logger.warning("cache_events_disconnected", error=str(exc))
+            _events_connected = False
+            _drop_local_state()
+            time.sleep(LISTENER_RETRY_SECONDS)
+
+
+def _drop_local_state() -> None:
+    global _local_generation
+    _local_generation = None
+    if _l1 is not None:
+        _l1.clear()
+    for handler in list(_event_handlers.get(EVENTS_RESET, ())):
+        handler({})
+
+
+def _on_cache_invalidated(payload: Dict[str, Any]) -> None:
+    global _local_generation
+    if _l1 is not None:
+        for key in payload.get("keys", ()):
+            _l1.delete(key)
+    prefix = payload.get("prefix")
+    if prefix is None:
+        return
+    if _l1 is not None:
+        _l1.delete_prefix(prefix)
+    if BOOKS_LIST_PREFIX.startswith(prefix):
+        _local_generation = None
+
+
+# --- Stale-while-revalidate and single-flight for expensive keys --------------
+
+_SWR_MARKER = "__swr__"
+_UNAVAILABLE = object()
+_LOCK_POLL_SECONDS = 0.025
+_held_locks = threading.local()
+
+
+def _uses_swr(key: str) -> bool:
+    return key.startswith(tuple(settings.CACHE_SWR_PREFIXES))
+
+
+def _try_lock(key: str) -> bool:
+    """Intenta ser quien recalcula ``key``; si Redis no responde, cada llamada recalcula."""
+    lock = redis_client.client.lock(f"lock:{key}", timeout=settings.CACHE_LOCK_TTL_MS / 1000, blocking=False)
+    acquired = _safe_execute(lock.acquire, default=True, op="lock", key=f"lock:{key}")
+    if acquired:
+        held = getattr(_held_locks, "locks", None)
+        if held is None:
+            held = _held_locks.locks = {}
+        held[key] = lock
+    return bool(acquired)
+
+
+def _release_lock(key: str) -> None:
+    lock = getattr(_held_locks, "locks", {}).pop(key, None)
+    if lock is None:
+        return
+    try:
+        lock.release()
+    except (redis.RedisError, redis.exceptions.LockError):
+        # Expired or unreachable: the lock TTL already frees it.
+        pass
+
+
+def _wait_for_value(key: str) -> Optional[str]:
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_MS / 1000
+    while time.monotonic() < deadline:
+        time.sleep(_LOCK_POLL_SECONDS)
+        data = _safe_execute(lambda: redis_client.binary.get(key), op="get", key=key)
+        if data is not None:
+            return data
+    return None
+
+
+def cache_set(key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+    """Guarda ``value``; cada clave de ``tags`` es un set que recuerda ``key`` para ``invalidate_cache_tags``."""
     ttl = ttl or settings.CACHE_TTL_SECONDS
-    _safe_execute(lambda: redis_client.client.setex(key, ttl, serialized))
+    if _uses_swr(key):
+        # Redis keeps the entry for the full ttl; after the soft ttl it is
+        # still served while a single caller recomputes it.
+        soft_ttl = min(settings.CACHE_SOFT_TTL_SECONDS, ttl)
+        serialized = cache_codec.encode({_SWR_MARKER: time.time() + soft_ttl, "value": value})
+    else:
+        serialized = cache_codec.encode(value)
+    tags = list(tags)
+    if tags:
+        _safe_execute(lambda: _setex_tagged(key, ttl, serialized, tags), op="setex_tagged", key=key)
+    else:
+        _safe_execute(lambda: redis_client.binary.setex(key, ttl, serialized), op="setex", key=key)
+    metrics.written(key, len(serialized))
+    _release_lock(key)
+    local = _local_cache_for(key)
+    if local is not None:
+        local.set(key, value, ttl)
+
+
+def _setex_tagged(key: str, ttl: int, serialized: bytes, tags: List[str]) -> List[Any]:
+    pipeline = redis_client.binary.pipeline(transaction=False)
+    pipeline.setex(key, ttl, serialized)
+    for tag in tags:
+        pipeline.sadd(tag, key)
+        # A tag lives as long as the newest entry it points to.
+        pipeline.expire(tag, ttl)
+    return pipeline.execute()
+
+
+def invalidate_cache_tags(tags: Iterable[str], keys: Iterable[str] = ()) -> int:
+    """Borra las entradas registradas bajo ``tags`` (y los propios sets) junto con ``keys``.
+
+    Todo va en dos viajes a Redis y un único aviso por pub/sub para que los
+    demás procesos vacíen su L1. Devuelve cuántas claves se invalidaron.
+    """
+    tags, extra = list(tags), list(keys)
+    if not tags and not extra:
+        return 0
+
+    def _invalidate() -> List[str]:
+        client = redis_client.client
+        pipeline = client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.smembers(tag)
+        found = sorted(set(extra).union(*pipeline.execute()))
+        pipeline = client.pipeline(transaction=False)
+        pipeline.delete(*tags, *found)
+        if found:
+            pipeline.publish(EVENTS_CHANNEL, json.dumps({"event": "cache_invalidated", "payload": {"keys": found}}))
+        pipeline.execute()
+        return found
+
+    deleted = _safe_execute(_invalidate, op="invalidate_tags", key=(tags or extra)[0])
+    _on_cache_invalidated({"keys": extra if deleted is None else deleted})
+    return len(deleted or [])
+
+
+def _decode(key: str, data: Any) -> Optional[Any]:
+    try:
+        return cache_codec.decode(data)
+    except (ValueError, zlib.error) as exc:
+        # An entry this process cannot read (unknown codec, corrupt) is a miss.
+        logger.warning("cache_decode_failed", key=key, error=str(exc))
+        return None
 
 
 def cache_delete(key: str) -> None:
-    _safe_execute(lambda: redis_client.client.delete(key))
+    _safe_execute(lambda: redis_client.client.delete(key), op="delete", key=key)
+    if _l1 is not None:
+        _l1.delete(key)
 
 
 def cache_get(key: str) -> Optional[Any]:
-    data = _safe_execute(lambda: redis_client.client.get(key))
+    """Lee ``key`` del L1 y luego de Redis.
+
+    Para las claves de CACHE_SWR_PREFIXES, devolver None significa "recalcula y
+    llama a cache_set": solo un proceso recibe None por clave a la vez. Los
+    demás reciben el valor caducado o esperan hasta CACHE_LOCK_WAIT_MS.
+    """
+    local = _local_cache_for(key)
+    if local is not None:
+        value = local.get(key)
+        if value is not None:
+            metrics.lookup(key, "l1", "hit")
+            return value
+        metrics.lookup(key, "l1", "miss")
+    data = _safe_execute(lambda: redis_client.binary.get(key), default=_UNAVAILABLE, op="get", key=key)
+    swr = _uses_swr(key)
+    if data is None and swr and not _try_lock(key):
+        data = _wait_for_value(key)
+    if data is _UNAVAILABLE:
+        metrics.lookup(key, "l2", "error")
+        return None
     if data is None:
+        metrics.lookup(key, "l2", "miss")
+        return None
+    value = _decode(key, data)
+    if value is None:
+        metrics.lookup(key, "l2", "error")
         return None
-    return json.loads(data)
+    if swr and isinstance(value, dict) and _SWR_MARKER in value:
+        if value[_SWR_MARKER] <= time.time():
+            if _try_lock(key):
+                metrics.lookup(key, "l2", "miss", len(data))
+                return None
+            metrics.lookup(key, "l2", "stale", len(data))
+            return value["value"]
+        value = value["value"]
+    metrics.lookup(key, "l2", "hit", len(data))
+    if local is not None:
+        local.set(key, value)
+    return value
 
 
-def rate_limit_hit(scope: str, identifier: str) -> bool:
-    window = settings.RATE_LIMIT_WINDOW_SECONDS
-    max_requests = settings.RATE_LIMIT_MAX_REQUESTS
-    key = f"ratelimit:{scope}:{identifier}:{window}"
+def cache_get_many(keys: List[str]) -> Dict[str, Any]:
+    """Lectura en bloque con un solo MGET; solo devuelve las claves presentes."""
+    if not keys:
+        return {}
+    values = _safe_execute(
+        lambda: redis_client.binary.mget(keys), default=_UNAVAILABLE, op="mget", key=keys[0]
+    )
+    if values is _UNAVAILABLE:
+        for key in keys:
+            metrics.lookup(key, "l2", "error")
+        return {}
+    found: Dict[str, Any] = {}
+    for key, data in zip(keys, values):
+        value = _decode(key, data) if data is not None else None
+        if value is None:
+            metrics.lookup(key, "l2", "miss" if data is None else "error")
+            continue
+        metrics.lookup(key, "l2", "hit", len(data))
+        if isinstance(value, dict) and _SWR_MARKER in value:
+            value = value["value"]
+        found[key] = value
+    return found
+
+
+def cache_set_many(items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+    if not items:
+        return
+    ttl = ttl or settings.CACHE_TTL_SECONDS
+
+    def _write():
+        pipeline = redis_client.binary.pipeline(transaction=False)
+        for key, value in items.items():
+            serialized = cache_codec.encode(value)
+            metrics.written(key, len(serialized))
+            pipeline.setex(key, ttl, serialized)
+        return pipeline.execute()
+
+    _safe_execute(_write, op="setex_many", key=next(iter(items)))
+
+
+# Sliding-window log: one sorted-set member per accepted event, scored by the
+# Redis server clock. Rejected attempts are not recorded, so a client that
+# keeps trying is let through again as soon as its oldest event leaves the
+# window. Returns {allowed, remaining, retry_after_ms}.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+  redis.call('ZADD', key, now, now .. ':' .. ARGV[3])
+  count = count + 1
+  allowed = 1
+end
+redis.call('PEXPIRE', key, window)
+local retry_after = 0
+if allowed == 0 then
+  local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+  retry_after = tonumber(oldest[2]) + window - now
+end
+return {allowed, limit - count, retry_after}
+"""
+
+_sliding_window = None
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float = 0.0
+
+
+def sliding_window_hit(key: str, limit: int, window: int) -> RateLimitResult:
+    """Registra un evento en ``key`` si cabe en la ventana; una sola llamada EVALSHA.
+
+    Si Redis no responde se deja pasar (fail open), como el resto de la cache.
+    """
+    global _sliding_window
+    if _sliding_window is None:
+        _sliding_window = redis_client.client.register_script(SLIDING_WINDOW_LUA)
     result = _safe_execute(
-        lambda: redis_client.client.pipeline().incr(key, 1).expire(key, window, nx=True).execute(),
-        default=[1, None],
+        lambda: _sliding_window(
+            keys=[key], args=[window * 1000, limit, uuid.uuid4().hex], client=redis_client.client
+        ),
+        op="rate_limit",
+        key=key,
+    )
+    if result is None:
+        return RateLimitResult(allowed=True, limit=limit, remaining=limit)
+    allowed, remaining, retry_after_ms = (int(value) for value in result)
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=limit,
+        remaining=max(remaining, 0),
+        retry_after=max(retry_after_ms, 0) / 1000,
     )
-    current = result[0] if isinstance(result, (list, tuple)) else 1
-    return int(current) > max_requests
+
+
+def rate_limit_check(scope: str, identifier: str) -> RateLimitResult:
+    return sliding_window_hit(
+        f"ratelimit:{scope}:{identifier}",
+        settings.RATE_LIMIT_MAX_REQUESTS,
+        settings.RATE_LIMIT_WINDOW_SECONDS,
+    )
+
+
+def rate_limit_hit(scope: str, identifier: str) -> bool:
+    return not rate_limit_check(scope, identifier).allowed
+
+
+def anti_spam_limit(user_id: str, max_events: int = 5, window: int = 300) -> RateLimitResult:
+    return sliding_window_hit(f"antispam:reviews:{user_id}", max_events, window)
 
 
 def anti_spam_check(user_id: str, max_events: int = 5, window: int = 300) -> bool:
-    key = f"antispam:reviews:{user_id}"
+    """True si ``user_id`` ya publicó ``max_events`` reseñas en los últimos ``window`` segundos."""
+    return not anti_spam_limit(user_id, max_events, window).allowed
+
+
+BOOKS_CACHE_GENERATION_KEY = "cache:books:gen"
+BOOKS_LIST_PREFIX = "cache:books:list:"
+
+
+def books_cache_generation() -> int:
+    """Generación vigente; con L1 activo se recuerda localmente hasta la siguiente invalidación."""
+    global _local_generation
+    local = _local_cache_for(BOOKS_LIST_PREFIX)
+    if local is not None and _local_generation is not None and _local_generation[0] > time.monotonic():
+        return _local_generation[1]
+    value = _safe_execute(
+        lambda: redis_client.client.get(BOOKS_CACHE_GENERATION_KEY), op="get", key=BOOKS_CACHE_GENERATION_KEY
+    )
+    generation = int(value or 0)
+    if local is not None and value is not None:
+        _local_generation = (time.monotonic() + settings.CACHE_L1_TTL_SECONDS, generation)
+    return generation
+
+
+def _books_digest(params: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def cache_key_for_books(params: dict[str, Any], generation: Optional[int] = None) -> str:
+    """Clave de una página del listado dentro de la generación vigente del catálogo."""
+    if generation is None:
+        generation = books_cache_generation()
+    return f"{BOOKS_LIST_PREFIX}{generation}:{_books_digest(params)}"
+
+
+def cache_key_for_books_count(params: dict[str, Any], generation: Optional[int] = None) -> str:
+    if generation is None:
+        generation = books_cache_generation()
+    return f"{BOOKS_LIST_PREFIX}{generation}:count:{_books_digest(params)}"
+
+
+POPULAR_BOOK_QUERIES_KEY = "cache:books:popular"
+
+
+def record_books_query(params: dict[str, Any]) -> None:
+    """Cuenta (muestreado) cuántas veces se pide cada combinación de parámetros del listado."""
+    if random.random() >= settings.CACHE_POPULAR_SAMPLE_RATE:
+        return
+    member = json.dumps(params, sort_keys=True)
     _safe_execute(
-        lambda: redis_client.client.pipeline()
-        .lpush(key, "1")
-        .ltrim(key, 0, max_events - 1)
-        .expire(key, window, nx=True)
-        .execute()
+        lambda: redis_client.client.zincrby(POPULAR_BOOK_QUERIES_KEY, 1, member),
+        op="zincrby",
+        key=POPULAR_BOOK_QUERIES_KEY,
+    )
+
+
+def popular_books_queries(limit: int) -> List[dict[str, Any]]:
+    members = _safe_execute(
+        lambda: redis_client.client.zrevrange(POPULAR_BOOK_QUERIES_KEY, 0, limit - 1),
+        default=[],
+        op="zrevrange",
+        key=POPULAR_BOOK_QUERIES_KEY,
     )
-    events_count = _safe_execute(lambda: redis_client.client.llen(key), default=0)
-    return events_count > max_events
+    return [json.loads(member) for member in members]
+
+
+def decay_popular_books_queries(factor: float, keep: int) -> None:
+    """Envejece las puntuaciones y recorta el ranking para que refleje lo reciente."""
+
+    def _decay():
+        pipeline = redis_client.client.pipeline()
+        pipeline.zunionstore(POPULAR_BOOK_QUERIES_KEY, {POPULAR_BOOK_QUERIES_KEY: factor})
+        pipeline.zremrangebyrank(POPULAR_BOOK_QUERIES_KEY, 0, -(keep + 1))
+        return pipeline.execute()
+
+    _safe_execute(_decay, op="decay", key=POPULAR_BOOK_QUERIES_KEY)
+
+
+def cache_missing(keys: List[str]) -> List[str]:
+    """Claves de ``keys`` que no existen en Redis (todas si Redis no responde)."""
+
+    def _exists():
+        pipeline = redis_client.client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.exists(key)
+        return pipeline.execute()
+
+    found = _safe_execute(_exists, default=None, op="exists_many", key=keys[0] if keys else None)
+    found = found or [0] * len(keys)
+    return [key for key, exists in zip(keys, found) if not exists]
+
+
+def claim(key: str, ttl: int) -> bool:
+    """SET NX con expiración: True solo para el primero que lo pide dentro de ``ttl``."""
+    claimed = _safe_execute(
+        lambda: redis_client.client.set(key, "1", nx=True, ex=ttl), default=False, op="claim", key=key
+    )
+    return bool(claimed)
+
 
+def cache_key_for_book(book_id: Any) -> str:
+    return f"cache:books:detail:{book_id}"
 
-def cache_key_for_books(params: dict[str, Any]) -> str:
-    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
-    return f"cache:books:list:{digest}"
+
+def cache_key_for_review_summary(book_id: Any) -> str:
+    return f"cache:books:summary:{book_id}"
+
+
+def cache_key_for_book_tag(book_id: Any) -> str:
+    """Set con las páginas del listado cacheadas que incluyen el libro."""
+    return f"cache:books:tag:{book_id}"
+
+
+BOOKS_DIRTY_STATS_KEY = "stats:books:dirty"
+
+
+def mark_books_dirty(book_ids: Iterable[str]) -> bool:
+    """Anota libros pendientes de recalcular; False si Redis no responde."""
+    book_ids = [str(book_id) for book_id in book_ids]
+    if not book_ids:
+        return True
+    added = _safe_execute(
+        lambda: redis_client.client.sadd(BOOKS_DIRTY_STATS_KEY, *book_ids),
+        default=None,
+        op="sadd",
+        key=BOOKS_DIRTY_STATS_KEY,
+    )
+    return added is not None
+
+
+def pop_dirty_books(count: int) -> List[str]:
+    """Saca hasta ``count`` libros pendientes (SPOP): cada id lo recibe un solo consumidor."""
+    popped = _safe_execute(
+        lambda: redis_client.client.spop(BOOKS_DIRTY_STATS_KEY, count),
+        default=[],
+        op="spop",
+        key=BOOKS_DIRTY_STATS_KEY,
+    )
+    return list(popped or [])
 
 
 def invalidate_books_cache() -> None:
-    def _invalidate():
-        client = redis_client.client
-        keys = client.keys("cache:books:list:*")
-        if keys:
-            client.delete(*keys)
+    """Invalida todo el listado en O(1) pasando a una nueva generación de claves.
 
-    _safe_execute(_invalidate)
+    Las entradas de generaciones anteriores ya no se leen y expiran por su TTL,
+    así que no hace falta recorrer el keyspace con ``KEYS``. El mismo pipeline
+    avisa por pub/sub a los demás procesos para que vacíen su L1.
+    """
+    event = json.dumps({"event": "cache_invalidated", "payload": {"prefix": BOOKS_LIST_PREFIX}})
+    _safe_execute(
+        lambda: redis_client.client.pipeline(transaction=False)
+        .incr(BOOKS_CACHE_GENERATION_KEY)
+        .publish(EVENTS_CHANNEL, event)
+        .execute(),
+        op="invalidate",
+        key=BOOKS_CACHE_GENERATION_KEY,
+    )
+    _on_cache_invalidated({"prefix": BOOKS_LIST_PREFIX})
 
 
 def publish_event(event: str, payload: dict[str, Any]) -> None:
-    _safe_execute(lambda: redis_client.client.publish("events:biblioteca", json.dumps({"event": event, "payload": payload})))
+    _safe_execute(
+        lambda: redis_client.client.publish(EVENTS_CHANNEL, json.dumps({"event": event, "payload": payload})),
+        op="publish",
+        key=EVENTS_CHANNEL,
+    )
+
+
+register_event_handler("cache_invalidated", _on_cache_invalidated)
+metrics.gauge("biblioteca_cache_l1_entries", lambda: len(_l1) if _l1 is not None else 0)
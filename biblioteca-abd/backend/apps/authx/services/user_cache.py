@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .local_cache import LocalCache
+from .redis_service import (
+    EVENTS_RESET,
+    events_connected,
+    publish_event,
+    register_event_handler,
+)
+
+_cache: Optional[LocalCache] = None
+
+
+def _active_cache() -> Optional[LocalCache]:
+    global _cache
+    if settings.AUTH_USER_CACHE_TTL_SECONDS <= 0 or not events_connected():
+        return None
+    if _cache is None:
+        _cache = LocalCache(settings.AUTH_USER_CACHE_MAX_ENTRIES, settings.AUTH_USER_CACHE_TTL_SECONDS)
+    return _cache
+
+
+def _key(user_pk: Any, token: str) -> str:
+    # Prefixed by user so a user change drops all of their tokens at once.
+    return f"{user_pk}:{hashlib.sha256(token.encode()).hexdigest()}"
+
+
+def get_user(user_pk: Any, token: str) -> Optional[User]:
+    """Usuario resuelto para ``token`` si está en la cache local y no ha caducado."""
+    cache = _active_cache()
+    if cache is None:
+        return None
+    snapshot = cache.get(_key(user_pk, token))
+    if snapshot is None:
+        return None
+    # A fresh instance per request: views may modify the user they receive.
+    return User.from_db(None, list(snapshot), list(snapshot.values()))
+
+
+def remember_user(user: User, token: str) -> None:
+    cache = _active_cache()
+    if cache is not None:
+        snapshot = {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+        cache.set(_key(user.pk, token), snapshot)
+
+
+def forget_token(user_pk: Any, token: str) -> None:
+    key = _key(user_pk, token)
+    _drop({"key": key})
+    publish_event("auth_token_revoked", {"key": key})
+
+
+def forget_user(user_pk: Any) -> None:
+    _drop({"user_id": user_pk})
+    publish_event("auth_user_changed", {"user_id": user_pk})
+
+
+def clear() -> None:
+    if _cache is not None:
+        _cache.clear()
+
+
+def _drop(payload: Dict[str, Any]) -> None:
+    if _cache is None:
+        return
+    if "key" in payload:
+        _cache.delete(payload["key"])
+    if "user_id" in payload:
+        _cache.delete_prefix(f"{payload['user_id']}:")
+
+
+register_event_handler("auth_token_revoked", _drop)
+register_event_handler("auth_user_changed", _drop)
+register_event_handler(EVENTS_RESET, lambda payload: clear())
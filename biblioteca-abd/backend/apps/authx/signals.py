@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .services import user_cache
+
+
+@receiver(post_save, sender=User, dispatch_uid="authx_user_saved")
+@receiver(post_delete, sender=User, dispatch_uid="authx_user_deleted")
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.forget_user(instance.pk)
@@ -3,7 +3,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from apps.authx.services import redis_service
+from apps.authx.services import redis_service, user_cache
 
 
 @pytest.fixture(autouse=True)
@@ -31,6 +31,37 @@ def fake_redis_cache(monkeypatch):
     monkeypatch.setattr(auth_auth, "cache_get", fake_get)
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache(monkeypatch):
+    # Off unless a test opts in: no pub/sub listener is started against a real Redis.
+    monkeypatch.setattr(user_cache, "events_connected", lambda: False)
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture
+def warm_user_cache(monkeypatch):
+    published = []
+    monkeypatch.setattr(user_cache, "events_connected", lambda: True)
+    monkeypatch.setattr(user_cache, "publish_event", lambda event, payload: published.append((event, payload)))
+    return published
+
+
+def _login(client):
+    client.post(reverse("signup"), {"username": "tester", "password": "secret"})
+    return client.post(reverse("login"), {"username": "tester", "password": "secret"}).data["token"]
+
+
+def _authenticate(token):
+    from rest_framework.test import APIRequestFactory
+
+    from apps.authx.authentication import SignedTokenAuthentication
+
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=token)
+    return SignedTokenAuthentication().authenticate(request)
+
+
 @pytest.mark.django_db
 def test_signup_and_login_flow():
     client = APIClient()
@@ -85,3 +116,81 @@ def test_request_fails_when_token_expired(monkeypatch, settings):
     logout_resp = client.post(reverse("logout"), HTTP_AUTHORIZATION=token)
     assert logout_resp.status_code == status.HTTP_403_FORBIDDEN
     assert logout_resp.data["detail"] == "Token expirado"
+
+
+def test_throttle_exposes_quota_headers_and_retry_after(monkeypatch):
+    from apps.authx import throttling
+
+    results = iter(
+        [
+            redis_service.RateLimitResult(allowed=True, limit=100, remaining=1),
+            redis_service.RateLimitResult(allowed=False, limit=100, remaining=0, retry_after=2.2),
+        ]
+    )
+    monkeypatch.setattr(throttling, "rate_limit_check", lambda scope, identifier: next(results))
+    client = APIClient()
+
+    allowed = client.get(reverse("health"))
+    throttled = client.get(reverse("health"))
+
+    assert allowed.status_code == 200
+    assert allowed["X-RateLimit-Remaining"] == "1"
+    assert throttled.status_code == 429
+    assert throttled["Retry-After"] == "3"
+    assert throttled["X-RateLimit-Limit"] == "100"
+    assert throttled["X-RateLimit-Remaining"] == "0"
+
+
+@pytest.mark.django_db
+def test_warm_token_authenticates_without_redis_or_database(warm_user_cache, monkeypatch, django_assert_num_queries):
+    import apps.authx.authentication as auth_auth
+
+    token = _login(APIClient())
+    user, _ = _authenticate(token)
+
+    monkeypatch.setattr(auth_auth, "cache_get", lambda key: pytest.fail("Redis should not be queried"))
+    with django_assert_num_queries(0):
+        cached_user, cached_token = _authenticate(token)
+
+    assert cached_token == token
+    assert cached_user.pk == user.pk and cached_user.username == "tester"
+    assert cached_user is not user
+
+
+@pytest.mark.django_db
+def test_logout_revokes_the_cached_token_everywhere(warm_user_cache):
+    from rest_framework.exceptions import AuthenticationFailed
+
+    client = APIClient()
+    token = _login(client)
+    user, _ = _authenticate(token)
+
+    assert client.post(reverse("logout"), HTTP_AUTHORIZATION=token).status_code == 204
+
+    assert ("auth_token_revoked", {"key": user_cache._key(user.pk, token)}) in warm_user_cache
+    with pytest.raises(AuthenticationFailed, match="Token no encontrado"):
+        _authenticate(token)
+
+
+@pytest.mark.django_db
+def test_user_changes_drop_cached_snapshots(warm_user_cache):
+    from django.contrib.auth.models import User
+
+    token = _login(APIClient())
+    user, _ = _authenticate(token)
+    warm_user_cache.clear()
+
+    User.objects.filter(pk=user.pk).update(first_name="stale")
+    user.first_name = "Nuevo"
+    user.save()
+
+    assert warm_user_cache == [("auth_user_changed", {"user_id": user.pk})]
+    assert _authenticate(token)[0].first_name == "Nuevo"
+
+
+@pytest.mark.django_db
+def test_user_cache_is_bypassed_without_the_event_subscription():
+    token = _login(APIClient())
+    user, _ = _authenticate(token)
+
+    assert user_cache.get_user(user.pk, token) is None
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from apps.authx.services import cache_codec, redis_service
+
+PAGE = {"results": [{"_id": "1", "title": "Canción de hielo", "avg_rating": 4.5}] * 50, "count": 50}
+
+
+@pytest.mark.parametrize("codec", ["json", "msgpack"])
+@pytest.mark.parametrize("threshold", [0, 64])
+def test_round_trip(codec, threshold):
+    encoded = cache_codec.encode(PAGE, codec=codec, compress_min_bytes=threshold)
+
+    assert cache_codec.decode(encoded) == PAGE
+
+
+def test_large_values_are_compressed_and_framed(settings):
+    settings.CACHE_COMPRESS_MIN_BYTES = 64
+
+    small = cache_codec.encode({"a": 1}, codec="msgpack")
+    large = cache_codec.encode(PAGE, codec="msgpack")
+
+    assert small[:3] == b"\x00m-"
+    assert large[:3] == b"\x00mz"
+    assert len(large) < len(json.dumps(PAGE))
+
+
+def test_uncompressed_json_stays_readable_by_older_processes():
+    encoded = cache_codec.encode(PAGE, codec="json", compress_min_bytes=0)
+
+    assert json.loads(encoded) == PAGE
+
+
+def test_legacy_entries_are_decoded():
+    assert cache_codec.decode(json.dumps(PAGE)) == PAGE
+    assert cache_codec.decode(json.dumps(PAGE).encode()) == PAGE
+
+
+def test_unknown_frames_are_rejected():
+    with pytest.raises(cache_codec.CacheCodecError):
+        cache_codec.decode(b"\x00q-data")
+
+
+def test_unreadable_entry_is_a_cache_miss(monkeypatch):
+    class FakeClient:
+        def get(self, key):
+            return b"\x00q-data"
+
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: FakeClient())
+
+    assert redis_service.cache_get("auth:token:abc") is None
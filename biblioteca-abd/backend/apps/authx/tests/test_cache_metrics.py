@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import pytest
+import redis
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.authx.services import redis_service
+from apps.authx.services.cache_metrics import metrics, prefix_of
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class DownRedis:
+    def get(self, key):
+        raise redis.ConnectionError("down")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+
+def test_keys_are_labelled_by_family_not_by_id():
+    assert prefix_of("cache:books:list:3:abcdef") == "cache:books:list"
+    assert prefix_of("cache:books:detail:42") == "cache:books:detail"
+    assert prefix_of("ratelimit:user:1.2.3.4") == "ratelimit"
+    assert prefix_of("session:xyz") == "session:*"
+
+
+def test_outage_is_counted_as_error_not_as_miss(monkeypatch):
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: DownRedis())
+    monkeypatch.setattr(redis_service, "_redis_available", True)
+
+    assert redis_service.cache_get("cache:books:detail:1") is None
+
+    stats = redis_service.cache_stats()["l2"]
+    assert stats["errors"] == 1 and stats["misses"] == 0
+    assert metrics.errors[("get", "cache:books:detail")] == 1
+    assert redis_service._redis_available is False
+
+
+def test_hits_misses_sizes_and_latency_are_recorded(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+    key = "cache:books:detail:1"
+
+    redis_service.cache_get(key)
+    redis_service.cache_set(key, {"title": "Libro"})
+    redis_service.cache_get(key)
+
+    size = len(fake.store[key])
+    assert metrics.lookups[("cache:books:detail", "l2", "miss")] == 1
+    assert metrics.lookups[("cache:books:detail", "l2", "hit")] == 1
+    assert metrics.bytes[("cache:books:detail", "written")] == size
+    assert metrics.bytes[("cache:books:detail", "read")] == size
+    assert metrics.latency[("get", "cache:books:detail")].count == 2
+    assert metrics.latency[("setex", "cache:books:detail")].count == 1
+
+
+def test_metrics_endpoint_renders_prometheus_text(settings):
+    metrics.lookup("cache:books:list:1:abc", "l2", "hit", 120)
+    metrics.operation("get", "cache:books:list:1:abc", 3.0, failed=False)
+    client = APIClient()
+
+    settings.METRICS_TOKEN = ""
+    assert client.get(reverse("metrics")).status_code == 404
+    settings.METRICS_TOKEN = "s3cret"
+    assert client.get(reverse("metrics")).status_code == 401
+    assert client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer otro").status_code == 401
+
+    response = client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    body = response.content.decode()
+    assert 'biblioteca_cache_lookups_total{prefix="cache:books:list",tier="l2",outcome="hit"} 1' in body
+    assert 'biblioteca_redis_latency_ms_bucket{op="get",prefix="cache:books:list",le="5"} 1' in body
+    assert 'biblioteca_redis_latency_ms_bucket{op="get",prefix="cache:books:list",le="2"} 0' in body
+    assert "biblioteca_cache_l1_entries 0" in body
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from apps.authx.services import local_cache as local_cache_module
+from apps.authx.services.local_cache import LocalCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_and_ttl_is_capped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(local_cache_module.time, "monotonic", lambda: now[0])
+    cache = LocalCache(max_entries=10, ttl=5)
+    cache.set("short", "x", ttl=2)
+    cache.set("long", "y", ttl=300)
+
+    now[0] = 103.0
+    assert cache.get("short") is None
+    assert cache.get("long") == "y"
+    now[0] = 106.0
+    assert cache.get("long") is None
+
+
+def test_delete_prefix_only_drops_matching_keys():
+    cache = LocalCache()
+    cache.set("cache:books:list:1:a", 1)
+    cache.set("cache:books:list:1:b", 2)
+    cache.set("auth:token:x", 3)
+
+    assert cache.delete_prefix("cache:books:list:") == 2
+    assert len(cache) == 1
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from apps.authx.services import redis_service
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    redis_service.reset_clients()
+    redis_service.reset_local_cache()
+    yield
+    redis_service.reset_clients()
+    redis_service.reset_local_cache()
+
+
+class FakeLock:
+    def __init__(self, locks, name):
+        self.locks = locks
+        self.name = name
+
+    def acquire(self):
+        if self.name in self.locks:
+            return False
+        self.locks.add(self.name)
+        return True
+
+    def release(self):
+        self.locks.discard(self.name)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.calls = []
+        self.published = []
+        self.locks = set()
+
+    def lock(self, name, timeout=None, blocking=True):
+        return FakeLock(self.locks, name)
+
+    def get(self, key):
+        self.calls.append(("get", key))
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def incr(self, key):
+        self.store[key] = str(int(self.store.get(key, 0)) + 1)
+        return self
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return self
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+
+@pytest.fixture
+def l1(monkeypatch, settings):
+    settings.CACHE_L1_ENABLED = True
+    settings.CACHE_L1_PREFIXES = ("cache:books:list:",)
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+    monkeypatch.setattr(redis_service, "_ensure_listener", lambda: None)
+    monkeypatch.setattr(redis_service, "_events_connected", True)
+    return fake
+
+
+def test_calls_share_one_pool_per_process(settings):
+    settings.REDIS_MAX_CONNECTIONS = 7
+    settings.REDIS_SOCKET_TIMEOUT_SECONDS = 0.25
+    settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS = 15
+
+    first = redis_service.redis_client.client
+    second = redis_service.RedisClient().client
+
+    assert first is second
+    pool = first.connection_pool
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["socket_timeout"] == 0.25
+    assert pool.connection_kwargs["health_check_interval"] == 15
+    assert pool.connection_kwargs["decode_responses"] is True
+
+
+def test_fork_gives_the_child_a_new_pool():
+    parent = redis_service.get_client()
+
+    redis_service._reset_after_fork()
+
+    assert redis_service.get_client() is not parent
+
+
+class FakeScriptClient:
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    def register_script(self, script):
+        def run(keys, args, client=None):
+            if isinstance(self.reply, Exception):
+                raise self.reply
+            self.calls.append((keys, args))
+            return self.reply
+
+        return run
+
+
+@pytest.fixture
+def script_client(monkeypatch):
+    def install(reply):
+        fake = FakeScriptClient(reply)
+        monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+        monkeypatch.setattr(redis_service, "_sliding_window", None)
+        return fake
+
+    return install
+
+
+def test_anti_spam_check_is_one_script_call(script_client):
+    fake = script_client([0, 0, 1500])
+
+    result = redis_service.anti_spam_limit("user-1", max_events=5, window=300)
+
+    assert result == redis_service.RateLimitResult(allowed=False, limit=5, remaining=0, retry_after=1.5)
+    assert redis_service.anti_spam_check("user-1") is True
+    keys, args = fake.calls[0]
+    assert keys == ["antispam:reviews:user-1"]
+    assert args[:2] == [300_000, 5]
+    assert len(fake.calls) == 2
+
+
+def test_rate_limit_reports_remaining_quota(script_client, settings):
+    settings.RATE_LIMIT_MAX_REQUESTS = 10
+    settings.RATE_LIMIT_WINDOW_SECONDS = 60
+    script_client([1, 7, 0])
+
+    result = redis_service.rate_limit_check("user", "user:42")
+
+    assert result.allowed and result.remaining == 7 and result.limit == 10
+    assert redis_service.rate_limit_hit("user", "user:42") is False
+
+
+def test_limiter_fails_open_when_redis_is_down(script_client):
+    script_client(redis_service.redis.ConnectionError("down"))
+
+    assert redis_service.anti_spam_check("user-1") is False
+
+
+def test_invalidation_bumps_the_generation_instead_of_scanning_keys(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+    params = {"sort": "rating", "page": 1}
+    before = redis_service.cache_key_for_books(params)
+
+    redis_service.invalidate_books_cache()
+
+    after = redis_service.cache_key_for_books(params)
+    assert before.startswith("cache:books:list:0:")
+    assert after.startswith("cache:books:list:1:")
+    assert after.split(":")[-1] == before.split(":")[-1]
+    assert redis_service.cache_key_for_books_count(params, 1).startswith("cache:books:list:1:count:")
+    assert not hasattr(fake, "keys")
+
+
+def test_l1_serves_hot_pages_without_touching_redis(l1):
+    key = "cache:books:list:0:abc"
+    l1.store[key] = json.dumps({"results": [1, 2]})
+
+    assert redis_service.cache_get(key) == {"results": [1, 2]}
+    l1.calls.clear()
+    assert redis_service.cache_get(key) == {"results": [1, 2]}
+    assert l1.calls == []
+
+    redis_service.cache_get("auth:token:xyz")
+    stats = redis_service.cache_stats()
+    assert stats["l1"] == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "size": 1}
+    assert stats["l2"]["hits"] == 1 and stats["l2"]["misses"] == 1
+
+
+def test_generation_is_remembered_until_an_invalidation_arrives(l1):
+    l1.store[redis_service.BOOKS_CACHE_GENERATION_KEY] = "4"
+    assert redis_service.books_cache_generation() == 4
+    l1.store[redis_service.BOOKS_CACHE_GENERATION_KEY] = "5"
+    assert redis_service.books_cache_generation() == 4
+
+    redis_service._dispatch_event(json.dumps({"event": "cache_invalidated", "payload": {"prefix": "cache:"}}))
+
+    assert redis_service.books_cache_generation() == 5
+
+
+def test_invalidation_is_broadcast_and_clears_local_pages(l1):
+    redis_service.cache_set("cache:books:list:0:abc", {"results": []})
+
+    redis_service.invalidate_books_cache()
+
+    channel, message = l1.published[0]
+    assert channel == redis_service.EVENTS_CHANNEL
+    assert json.loads(message) == {"event": "cache_invalidated", "payload": {"prefix": "cache:books:list:"}}
+    assert redis_service.cache_stats()["l1"]["size"] == 0
+
+
+def test_l1_is_bypassed_while_the_event_subscription_is_down(l1, monkeypatch):
+    monkeypatch.setattr(redis_service, "_events_connected", False)
+    key = "cache:books:list:0:abc"
+    l1.store[key] = json.dumps({"results": []})
+
+    redis_service.cache_get(key)
+    redis_service.cache_get(key)
+
+    assert l1.calls == [("get", key), ("get", key)]
+
+
+@pytest.fixture
+def swr(monkeypatch, settings):
+    settings.CACHE_SWR_PREFIXES = ("cache:books:list:",)
+    settings.CACHE_LOCK_WAIT_MS = 100
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+    return fake
+
+
+def test_expired_entry_is_recomputed_by_one_caller_and_served_stale_to_the_rest(swr, monkeypatch):
+    key = "cache:books:list:0:abc"
+    redis_service.cache_set(key, {"results": ["old"]})
+    now = redis_service.time.time()
+    monkeypatch.setattr(redis_service.time, "time", lambda: now + 3600)
+
+    assert redis_service.cache_get(key) is None
+    assert f"lock:{key}" in swr.locks
+    assert redis_service.cache_get(key) == {"results": ["old"]}
+
+    redis_service.cache_set(key, {"results": ["new"]})
+
+    assert swr.locks == set()
+    monkeypatch.setattr(redis_service.time, "time", lambda: now + 3601)
+    assert redis_service.cache_get(key) == {"results": ["new"]}
+    assert redis_service.cache_stats()["l2"]["stale"] == 1
+
+
+def test_concurrent_miss_waits_for_the_value_being_computed(swr, monkeypatch):
+    key = "cache:books:list:0:abc"
+    swr.locks.add(f"lock:{key}")
+    monkeypatch.setattr(redis_service, "_LOCK_POLL_SECONDS", 0)
+    polls = []
+    original_get = swr.get
+
+    def get(name):
+        polls.append(name)
+        if len(polls) == 3:
+            swr.store[key] = json.dumps({"__swr__": redis_service.time.time() + 60, "value": {"results": [1]}})
+        return original_get(name)
+
+    monkeypatch.setattr(swr, "get", get)
+
+    assert redis_service.cache_get(key) == {"results": [1]}
+
+
+def test_miss_without_a_finished_recompute_falls_back_to_the_caller(swr):
+    key = "cache:books:list:0:abc"
+    swr.locks.add(f"lock:{key}")
+
+    assert redis_service.cache_get(key) is None
+
+
+class TaggingRedis(FakeRedis):
+    def __init__(self):
+        super().__init__()
+        self.sets = {}
+        self.results = []
+
+    def setex(self, key, ttl, value):
+        super().setex(key, ttl, value)
+        self.results.append(True)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+        self.results.append(len(members))
+
+    def expire(self, key, ttl):
+        self.results.append(True)
+
+    def smembers(self, key):
+        self.results.append(set(self.sets.get(key, ())))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+            self.sets.pop(key, None)
+        self.results.append(len(keys))
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+
+def test_tag_invalidation_drops_only_pages_with_the_book(monkeypatch):
+    fake = TaggingRedis()
+    monkeypatch.setattr(redis_service, "get_client", lambda url=None, binary=False: fake)
+    tag_a, tag_b = redis_service.cache_key_for_book_tag("a"), redis_service.cache_key_for_book_tag("b")
+    redis_service.cache_set("cache:books:list:1:p1", {"results": ["a"]}, tags=[tag_a])
+    redis_service.cache_set("cache:books:list:1:p2", {"results": ["a", "b"]}, tags=[tag_a, tag_b])
+    redis_service.cache_set("cache:books:list:1:p3", {"results": ["b"]}, tags=[tag_b])
+
+    deleted = redis_service.invalidate_cache_tags([tag_a], keys=["cache:books:detail:a"])
+
+    assert deleted == 3
+    assert set(fake.store) == {"cache:books:list:1:p3"}
+    assert tag_a not in fake.sets
+    assert json.loads(fake.published[0][1])["payload"]["keys"] == [
+        "cache:books:detail:a",
+        "cache:books:list:1:p1",
+        "cache:books:list:1:p2",
+    ]
@@ -1,18 +1,29 @@
-from rest_framework.throttling import SimpleRateThrottle
+import math
 
-from .services.redis_service import rate_limit_hit
+from rest_framework.throttling import BaseThrottle
 
+from .services.redis_service import rate_limit_check
+
+
+class UserIPRateThrottle(BaseThrottle):
+    """Ventana deslizante en Redis (un EVALSHA por petición) por usuario o IP."""
 
-class UserIPRateThrottle(SimpleRateThrottle):
     scope = "user"
 
+    def __init__(self):
+        self.result = None
+
     def get_cache_key(self, request, view):
         ident = request.user.id if request.user and request.user.is_authenticated else self.get_ident(request)
-        return f"throttle:{self.scope}:{ident}"
+        return f"{self.scope}:{ident}"
 
     def allow_request(self, request, view):
-        cache_key = self.get_cache_key(request, view)
-        hit_limit = rate_limit_hit(self.scope, cache_key)
-        if hit_limit:
-            return False
-        return super().allow_request(request, view)
+        self.result = rate_limit_check(self.scope, self.get_cache_key(request, view))
+        # RateLimitHeadersMiddleware reads it from the underlying HttpRequest.
+        getattr(request, "_request", request).rate_limit = self.result
+        return self.result.allowed
+
+    def wait(self):
+        if self.result is None or self.result.allowed:
+            return None
+        return math.ceil(self.result.retry_after)
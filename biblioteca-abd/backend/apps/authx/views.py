@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .authentication import SignedTokenAuthentication
+from .services import user_cache
 from .services.redis_service import cache_delete, cache_set
 
 
@@ -50,4 +51,5 @@ class LogoutView(APIView):
         token = request.headers.get("Authorization")
         if token:
             cache_delete(f"auth:token:{token}")
+            user_cache.forget_token(request.user.pk, token)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ....reviews.services.mongo_reviews import mongo_reviews
+from ...services.mongo_service import mongo_service
+
+
+class Command(BaseCommand):
+    help = "Crea los índices de MongoDB de libros, autores y reseñas (idempotente)."
+
+    def handle(self, *args, **options):
+        if mongo_service.db() is None:
+            self.stdout.write(self.style.WARNING("MongoDB no disponible; no hay índices que crear."))
+            return
+        mongo_service.ensure_indexes()
+        mongo_reviews.ensure_indexes()
+        self.stdout.write(self.style.SUCCESS("Índices creados."))
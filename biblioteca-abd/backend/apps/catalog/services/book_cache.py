@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from ...authx.services.redis_service import (
+    cache_delete,
+    cache_get,
+    cache_get_many,
+    cache_key_for_book,
+    cache_set,
+    cache_set_many,
+    invalidate_cache_tags,
+    publish_event,
+)
+from .mongo_service import mongo_service
+
+# Negative entry for ids that do not exist (or were deleted).
+MISSING: Dict[str, Any] = {"__missing__": True}
+
+
+def get_book(book_id: str) -> Optional[Dict[str, Any]]:
+    """Detalle completo de un libro leyendo primero de Redis (read-through)."""
+    key = cache_key_for_book(book_id)
+    cached = cache_get(key)
+    if cached is not None:
+        return None if cached == MISSING else cached
+    book = mongo_service.get_book(book_id)
+    if book is None:
+        cache_set(key, MISSING, settings.CACHE_NEGATIVE_TTL_SECONDS)
+    else:
+        cache_set(key, book, settings.CACHE_BOOK_TTL_SECONDS)
+    return book
+
+
+def store_book(book: Dict[str, Any]) -> None:
+    """Write-through tras crear o editar: el detalle queda ya actualizado en cache."""
+    key = cache_key_for_book(book["_id"])
+    if book.get("deleted"):
+        cache_set(key, MISSING, settings.CACHE_NEGATIVE_TTL_SECONDS)
+    else:
+        cache_set(key, book, settings.CACHE_BOOK_TTL_SECONDS)
+    _broadcast(key)
+
+
+def forget_book(book_id: str) -> None:
+    key = cache_key_for_book(book_id)
+    cache_set(key, MISSING, settings.CACHE_NEGATIVE_TTL_SECONDS)
+    _broadcast(key)
+
+
+def expire_book(book_id: str) -> None:
+    """Descarta el detalle cacheado de un libro que sigue existiendo; la próxima lectura lo recarga."""
+    key = cache_key_for_book(book_id)
+    cache_delete(key)
+    _broadcast(key)
+
+
+def expire_books(book_ids: Iterable[str]) -> int:
+    """Como ``expire_book`` para varios libros: un solo DEL y un solo aviso a las L1."""
+    return invalidate_cache_tags((), keys=[cache_key_for_book(book_id) for book_id in book_ids])
+
+
+def get_books(book_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Varios detalles con un MGET; los que faltan se leen de Mongo en una consulta y se cachean."""
+    book_ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+    cached = cache_get_many([cache_key_for_book(book_id) for book_id in book_ids])
+    books: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for book_id in book_ids:
+        value = cached.get(cache_key_for_book(book_id))
+        if value is None:
+            missing.append(book_id)
+        elif value != MISSING:
+            books[book_id] = value
+    if missing:
+        fetched = {book["_id"]: book for book in mongo_service.get_books(missing)}
+        cache_set_many(
+            {cache_key_for_book(book_id): book for book_id, book in fetched.items()},
+            settings.CACHE_BOOK_TTL_SECONDS,
+        )
+        books.update(fetched)
+    return books
+
+
+def warm_books(book_ids: Iterable[str]) -> int:
+    """Precarga el detalle de ``book_ids``; devuelve cuántos libros quedan en cache."""
+    return len(get_books(book_ids))
+
+
+def _broadcast(key: str) -> None:
+    # Other processes may hold this detail in their L1.
+    if settings.CACHE_L1_ENABLED and key.startswith(tuple(settings.CACHE_L1_PREFIXES)):
+        publish_event("cache_invalidated", {"prefix": key})
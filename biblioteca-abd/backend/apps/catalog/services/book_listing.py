@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...authx.services.redis_service import cache_key_for_book_tag
+from .mongo_service import mongo_service
+
+# Parameters that change the total: every page and sort of a filter shares one count.
+COUNT_PARAMS = ("q", "author_id", "genres")
+
+
+def book_filters(params: Dict[str, Any]) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    if params.get("q"):
+        filters["$text"] = {"$search": params["q"]}
+    if params.get("author_id"):
+        filters["authors.id"] = params["author_id"]
+    if params.get("genres"):
+        filters["genres"] = params["genres"].split(",")
+    filters["deleted"] = {"$ne": True}
+    return filters
+
+
+def count_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: params.get(key) for key in COUNT_PARAMS}
+
+
+def build_book_page(
+    params: Dict[str, Any],
+    fields: Optional[Tuple[str, ...]],
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Página del listado tal como la devuelve ``GET /api/books`` (sin el total).
+
+    ``cursor`` None usa paginación por número de página; "" es la primera
+    página en modo cursor. Lanza ``InvalidCursor`` si el cursor no es válido.
+    """
+    filters = book_filters(params)
+    page_size = params["page_size"]
+    if cursor is not None:
+        books, next_cursor = mongo_service.list_books_page(
+            filters, params["sort"], params["order"], page_size, cursor or None, fields=fields
+        )
+        return {"results": books, "page_size": page_size, "next_cursor": next_cursor}
+    page = params["page"]
+    books = mongo_service.list_books(
+        filters,
+        params["sort"],
+        params["order"],
+        (page - 1) * page_size,
+        page_size,
+        fields=fields,
+        blend=params.get("blend", 0.0),
+    )
+    return {"results": books, "page": page, "page_size": page_size}
+
+
+def book_count(params: Dict[str, Any]) -> Dict[str, Any]:
+    count, estimated = mongo_service.count_books(book_filters(params))
+    return {"count": count, "count_estimated": estimated}
+
+
+def page_tags(page: Dict[str, Any]) -> List[str]:
+    """Tags de cache de una página: uno por libro, para invalidarla cuando cambie alguno."""
+    return [cache_key_for_book_tag(book["_id"]) for book in page.get("results", []) if "_id" in book]
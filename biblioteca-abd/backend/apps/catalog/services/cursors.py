@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, **expected: Any) -> Dict[str, Any]:
+    """Decodifica un cursor opaco y comprueba que pertenece al mismo orden."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(token) from exc
+    if not isinstance(payload, dict) or "id" not in payload or "k" not in payload:
+        raise InvalidCursor(token)
+    for name, value in expected.items():
+        if payload.get(name) != value:
+            raise InvalidCursor(token)
+    return payload
+
+
+def keyset_filter(field: str, value: Any, last_id: Any, descending: bool) -> Dict[str, Any]:
+    """Condición Mongo para "documentos posteriores a (value, last_id)".
+
+    Sigue el orden ``[(field, dir), ("_id", dir)]``; null/ausente ordena como el
+    valor más bajo, igual que en Mongo.
+    """
+    id_op = "$lt" if descending else "$gt"
+    tie = {field: value, "_id": {id_op: last_id}}
+    if value is None:
+        if descending:
+            return tie
+        return {"$or": [{field: {"$ne": None}}, tie]}
+    branches = [{field: {id_op: value}}, tie]
+    if descending:
+        branches.insert(1, {field: None})
+    return {"$or": branches}
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from .text_search import FIELD_WEIGHTS, TextIndex
+
+SORT_FIELDS = ("avg_rating", "rating_count")
+
+
+def sort_value(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass(frozen=True)
+class _IndexEntry:
+    genres: FrozenSet[str]
+    authors: FrozenSet[str]
+    sort_keys: Dict[str, Tuple[float, str]]
+
+
+class MemoryBookStore:
+    """Almacén en memoria con índices para el modo degradado del catálogo.
+
+    Mantiene un mapa por id, índices invertidos de géneros y ``authors.id`` y
+    vistas ordenadas por ``avg_rating``/``rating_count`` que solo contienen
+    libros activos, de modo que una página cuesta O(page size).
+    """
+
+    def __init__(self) -> None:
+        self._books: Dict[str, Dict[str, Any]] = {}
+        self._entries: Dict[str, _IndexEntry] = {}
+        self._by_genre: Dict[str, Set[str]] = defaultdict(set)
+        self._by_author: Dict[str, Set[str]] = defaultdict(set)
+        self._sorted: Dict[str, List[Tuple[float, str]]] = {name: [] for name in SORT_FIELDS}
+        self._text = TextIndex()
+        self._by_natural_key: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._books.values()))
+
+    def clear(self) -> None:
+        self._books.clear()
+        self._entries.clear()
+        self._by_genre.clear()
+        self._by_author.clear()
+        for view in self._sorted.values():
+            view.clear()
+        self._text.clear()
+        self._by_natural_key.clear()
+
+    def add(self, book: Dict[str, Any]) -> Dict[str, Any]:
+        book_id = str(book["_id"])
+        self._unindex(book_id)
+        previous = self._books.get(book_id)
+        self._books[book_id] = book
+        self._index(book_id, book)
+        self._track_natural_key(book_id, previous.get("natural_key") if previous else None, book)
+        return book
+
+    def get(self, book_id: Any) -> Optional[Dict[str, Any]]:
+        return self._books.get(str(book_id))
+
+    def get_by_natural_key(self, natural_key: str) -> Optional[Dict[str, Any]]:
+        book_id = self._by_natural_key.get(natural_key)
+        return self._books.get(book_id) if book_id is not None else None
+
+    def update(self, book_id: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        key = str(book_id)
+        book = self._books.get(key)
+        if book is None:
+            return None
+        previous_key = book.get("natural_key")
+        # Rating deltas touch every review write: only re-tokenize when the text changes.
+        text = "deleted" in updates or any(name in updates for name in FIELD_WEIGHTS)
+        self._unindex(key, text=text)
+        book.update(updates)
+        self._index(key, book, text=text)
+        self._track_natural_key(key, previous_key, book)
+        return book
+
+    def _track_natural_key(self, book_id: str, previous_key: Optional[str], book: Dict[str, Any]) -> None:
+        # Soft-deleted books keep their key, as in Mongo's unique index: a re-import
+        # then updates them instead of creating a duplicate.
+        current = book.get("natural_key")
+        if previous_key and previous_key != current and self._by_natural_key.get(previous_key) == book_id:
+            del self._by_natural_key[previous_key]
+        if current:
+            self._by_natural_key[current] = book_id
+
+    def active_ids(self, filters: Dict[str, Any]) -> Optional[Set[str]]:
+        """Ids que cumplen los filtros indexados; None significa "todos los activos"."""
+        candidates: Optional[Set[str]] = None
+        if "genres" in filters:
+            genres = filters["genres"] if isinstance(filters["genres"], list) else [filters["genres"]]
+            matched: Set[str] = set()
+            for genre in genres:
+                matched |= self._by_genre.get(genre, set())
+            candidates = matched
+        if "authors.id" in filters:
+            matched = set(self._by_author.get(str(filters["authors.id"]), ()))
+            candidates = matched if candidates is None else candidates & matched
+        if "title" in filters:
+            term = str(filters["title"]).lower()
+            pool = self._entries.keys() if candidates is None else candidates
+            candidates = {
+                book_id
+                for book_id in pool
+                if term in str(self._books[book_id].get("title", "")).lower()
+            }
+        if "$text" in filters:
+            matched = set(self._text.search(filters["$text"]["$search"]))
+            candidates = matched if candidates is None else candidates & matched
+        return candidates
+
+    def count(self, filters: Dict[str, Any]) -> int:
+        candidates = self.active_ids(filters)
+        return len(self._entries) if candidates is None else len(candidates)
+
+    def search(
+        self, filters: Dict[str, Any], skip: int, limit: int, blend: float = 0.0
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Resultados de ``$text`` ordenados por relevancia, opcionalmente mezclada con avg_rating."""
+        scores = self._text.search(filters["$text"]["$search"])
+        candidates = self.active_ids({key: value for key, value in filters.items() if key != "$text"})
+        ranked = []
+        for book_id, score in scores.items():
+            if candidates is not None and book_id not in candidates:
+                continue
+            if blend:
+                score *= 1 + blend * self._entries[book_id].sort_keys["avg_rating"][0] / 5
+            ranked.append((score, book_id))
+        top = heapq.nlargest(skip + limit, ranked)
+        return [(self._books[book_id], score) for score, book_id in top[skip:]]
+
+    def query(
+        self,
+        filters: Dict[str, Any],
+        sort_key: str,
+        descending: bool,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Página ordenada por (sort_key, id); ``after`` continúa un cursor."""
+        view = self._sorted[sort_key]
+        candidates = self.active_ids(filters)
+        if candidates is not None and len(candidates) * 8 <= len(view):
+            # Few matches: sorting them is cheaper than walking the whole view.
+            view = sorted(self._entries[book_id].sort_keys[sort_key] for book_id in candidates)
+            candidates = None
+        start, end = 0, len(view)
+        if after is not None:
+            key = (sort_value(after[0]), str(after[1]))
+            if descending:
+                end = bisect_left(view, key)
+            else:
+                start = bisect_right(view, key)
+        if candidates is None:
+            if descending:
+                stop = max(end - skip, start)
+                keys = view[max(stop - limit, start) : stop][::-1]
+            else:
+                begin = min(start + skip, end)
+                keys = view[begin : min(begin + limit, end)]
+            return [self._books[book_id] for _, book_id in keys]
+        page: List[Dict[str, Any]] = []
+        positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+        for position in positions:
+            book_id = view[position][1]
+            if book_id not in candidates:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            page.append(self._books[book_id])
+            if len(page) >= limit:
+                break
+        return page
+
+    def _index(self, book_id: str, book: Dict[str, Any], text: bool = True) -> None:
+        if book.get("deleted"):
+            return
+        genres = book.get("genres") or []
+        if isinstance(genres, str):
+            genres = [genres]
+        entry = _IndexEntry(
+            genres=frozenset(str(genre) for genre in genres),
+            authors=frozenset(
+                str(author.get("id"))
+                for author in book.get("authors") or []
+                if isinstance(author, dict) and author.get("id") is not None
+            ),
+            sort_keys={name: (sort_value(book.get(name)), book_id) for name in SORT_FIELDS},
+        )
+        for genre in entry.genres:
+            self._by_genre[genre].add(book_id)
+        for author_id in entry.authors:
+            self._by_author[author_id].add(book_id)
+        for name, key in entry.sort_keys.items():
+            insort(self._sorted[name], key)
+        if text:
+            self._text.add(book_id, book)
+        self._entries[book_id] = entry
+
+    def _unindex(self, book_id: str, text: bool = True) -> None:
+        entry = self._entries.pop(book_id, None)
+        if entry is None:
+            return
+        if text:
+            self._text.remove(book_id)
+        for genre in entry.genres:
+            self._discard(self._by_genre, genre, book_id)
+        for author_id in entry.authors:
+            self._discard(self._by_author, author_id, book_id)
+        for name, key in entry.sort_keys.items():
+            view = self._sorted[name]
+            position = bisect_left(view, key)
+            if position < len(view) and view[position] == key:
+                del view[position]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], value: str, book_id: str) -> None:
+        ids = index.get(value)
+        if ids is None:
+            return
+        ids.discard(book_id)
+        if not ids:
+            del index[value]
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from django.conf import settings
+from pymongo import MongoClient, errors, monitoring
+from pymongo.database import Database
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+
+@dataclass
+class _PooledClient:
+    client: MongoClient
+    pid: int
+    healthy: bool = False
+    checked_at: float = field(default=0.0)
+
+
+_lock = threading.Lock()
+_clients: Dict[str, _PooledClient] = {}
+
+
+class _HealthListener(monitoring.CommandListener, monitoring.ServerHeartbeatListener):
+    """Invalida el ping cacheado en cuanto el driver ve caer el servidor.
+
+    Sin él, una consulta que falla a mitad de intervalo seguiría confiando en
+    ``healthy=True`` hasta el siguiente ping programado.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        pass
+
+    def failed(self, event) -> None:
+        if isinstance(event, monitoring.CommandFailedEvent):
+            # Only failures that mean the server is gone, not a bad query.
+            error = getattr(errors, event.failure.get("errtype", ""), None)
+            if not (isinstance(error, type) and issubclass(error, ConnectionFailure)):
+                return
+        mark_unhealthy(self.url)
+
+
+def _build_client(url: str) -> MongoClient:
+    # connect=False defers the topology monitor threads until the first operation,
+    # so a client created before a gunicorn/celery fork is never shared with the child.
+    return MongoClient(
+        url,
+        connect=False,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        event_listeners=[_HealthListener(url)],
+    )
+
+
+def _pooled(url: str) -> Optional[_PooledClient]:
+    pid = os.getpid()
+    pooled = _clients.get(url)
+    if pooled is not None and pooled.pid == pid:
+        return pooled
+    with _lock:
+        pooled = _clients.get(url)
+        if pooled is not None and pooled.pid == pid:
+            return pooled
+        try:
+            pooled = _PooledClient(client=_build_client(url), pid=pid)
+        except PyMongoError:
+            return None
+        _clients[url] = pooled
+        return pooled
+
+
+def get_client(url: Optional[str] = None) -> Optional[MongoClient]:
+    pooled = _pooled(url or settings.MONGO_URL)
+    return pooled.client if pooled is not None else None
+
+
+def get_database(db_name: Optional[str] = None, url: Optional[str] = None) -> Optional[Database]:
+    """Devuelve la base de datos compartida o None si Mongo no responde.
+
+    El ping se cachea durante MONGO_HEALTHCHECK_INTERVAL_SECONDS, de modo que el
+    camino caliente no paga un round trip extra por consulta.
+    """
+    pooled = _pooled(url or settings.MONGO_URL)
+    if pooled is None:
+        return None
+    now = time.monotonic()
+    if now - pooled.checked_at >= settings.MONGO_HEALTHCHECK_INTERVAL_SECONDS:
+        try:
+            pooled.client.admin.command("ping")
+            pooled.healthy = True
+        except PyMongoError:
+            pooled.healthy = False
+        pooled.checked_at = now
+    if not pooled.healthy:
+        return None
+    return pooled.client[db_name or settings.MONGO_DB]
+
+
+def mark_unhealthy(url: Optional[str] = None) -> None:
+    """Descarta el último ping: la próxima llamada a ``get_database`` vuelve a comprobar Mongo."""
+    pooled = _clients.get(url or settings.MONGO_URL)
+    if pooled is not None and pooled.pid == os.getpid():
+        pooled.healthy = False
+        pooled.checked_at = 0.0
+
+
+def reset_clients() -> None:
+    with _lock:
+        pooled_clients = list(_clients.values())
+        _clients.clear()
+    pid = os.getpid()
+    for pooled in pooled_clients:
+        if pooled.pid == pid:
+            pooled.client.close()
+
+
+def _reset_after_fork() -> None:
+    # The parent's sockets and monitor threads are unusable in the child: drop the
+    # references without closing them so the parent keeps its pool intact.
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
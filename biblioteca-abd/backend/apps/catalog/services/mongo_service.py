@@ -1,119 +1,385 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterable, List, Optional
+from datetime import datetime
+from itertools import islice
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
+import structlog
 from bson import ObjectId
 from bson.errors import InvalidId
 from django.conf import settings
-from pymongo import ASCENDING, DESCENDING, MongoClient, ReturnDocument
-from pymongo.errors import PyMongoError
+from pymongo import ASCENDING, DESCENDING, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from . import ratings
+from .cursors import decode_cursor, encode_cursor, keyset_filter
+from .memory_store import MemoryBookStore, sort_value
+from .mongo_client import get_client, get_database
+from .projection import mongo_projection, project, with_fields
+from .text_search import FIELD_WEIGHTS
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+# ``$text`` without a text index fails with IndexNotFound.
+INDEX_NOT_FOUND = 27
+
+
+def regex_search(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Sustituye ``$text`` por una subcadena sin distinguir mayúsculas en los campos de texto."""
+    pattern = {"$regex": re.escape(filters["$text"]["$search"]), "$options": "i"}
+    rest = {key: value for key, value in filters.items() if key != "$text"}
+    return {**rest, "$or": [{name: pattern} for name in FIELD_WEIGHTS]}
 
 
 @dataclass
 class MongoCatalogService:
     url: str = settings.MONGO_URL
     db_name: str = settings.MONGO_DB
-    _memory_books: List[Dict[str, Any]] = field(default_factory=list)
+    _memory_books: MemoryBookStore = field(default_factory=MemoryBookStore)
     _memory_authors: List[Dict[str, Any]] = field(default_factory=list)
 
     @property
     def client(self) -> Optional[MongoClient]:
-        try:
-            return MongoClient(self.url, serverSelectionTimeoutMS=500)
-        except PyMongoError:
-            return None
+        return get_client(self.url)
 
     def db(self):
-        client = self.client
-        if client is None:
-            return None
-        try:
-            client.admin.command("ping")
-            return client[self.db_name]
-        except PyMongoError:
-            return None
+        return get_database(self.db_name, url=self.url)
 
     # Persistence helpers
     def ensure_indexes(self) -> None:
         database = self.db()
         if database is None:
             return
-        books = database.books
-        authors = database.authors
-        try:
-            books.create_index([("title", "text"), ("synopsis", "text")])
-            books.create_index([("genres", ASCENDING), ("year", DESCENDING)])
-            books.create_index([("avg_rating", DESCENDING), ("rating_count", DESCENDING)])
-            authors.create_index("name", unique=True)
-        except PyMongoError:
-            pass
+        specs = [
+            (
+                database.books,
+                [("title", "text"), ("synopsis", "text")],
+                {"weights": FIELD_WEIGHTS, "default_language": "spanish", "name": "books_text"},
+            ),
+            (database.books, [("genres", ASCENDING), ("year", DESCENDING)], {}),
+            (database.books, [("avg_rating", DESCENDING), ("rating_count", DESCENDING)], {}),
+            # Keyset pagination sorts on (field, _id); the tiebreaker must be in the index.
+            (database.books, [("avg_rating", DESCENDING), ("_id", DESCENDING)], {}),
+            (database.books, [("rating_count", DESCENDING), ("_id", DESCENDING)], {}),
+            (
+                database.books,
+                "natural_key",
+                {"unique": True, "partialFilterExpression": {"natural_key": {"$exists": True}}},
+            ),
+            (database.authors, "name", {"unique": True}),
+        ]
+        for collection, keys, options in specs:
+            try:
+                collection.create_index(keys, **options)
+            except PyMongoError as exc:
+                # An older index with other options (e.g. the previous text index) must be
+                # dropped by hand; keep creating the rest.
+                logger.warning("mongo_index_failed", collection=collection.name, keys=str(keys), error=str(exc))
 
     def list_books(
-        self, filters: Dict[str, Any], sort: str, order: str, skip: int, limit: int
+        self,
+        filters: Dict[str, Any],
+        sort: str,
+        order: str,
+        skip: int,
+        limit: int,
+        fields: Optional[Tuple[str, ...]] = None,
+        blend: float = 0.0,
     ) -> List[Dict[str, Any]]:
         filters = {**filters, "deleted": {"$ne": True}}
         database = self.db()
-        sort_key = "avg_rating" if sort == "rating" else "rating_count"
-        sort_direction = DESCENDING if order == "desc" else ASCENDING
+        if sort == "relevance" and "$text" in filters:
+            return self._search_books(database, filters, skip, limit, fields, blend)
+        sort_key, sort_direction = self._sort_spec(sort, order)
         if database is None:
-            active_books = [book for book in self._memory_books if not book.get("deleted")]
-            data = self._apply_filters(active_books, {k: v for k, v in filters.items() if k != "deleted"})
-            return sorted(data, key=lambda x: x.get(sort_key, 0), reverse=sort_direction == DESCENDING)[
-                skip : skip + limit
-            ]
-        cursor = (
-            database.books.find(filters)
-            .sort([(sort_key, sort_direction)])
-            .skip(skip)
-            .limit(limit)
+            memory_filters = {k: v for k, v in filters.items() if k != "deleted"}
+            books = self._memory_books.query(
+                memory_filters, sort_key, sort_direction == DESCENDING, skip, limit
+            )
+            return [project(book, fields) for book in books]
+        return self._text_fallback(
+            filters,
+            lambda current: self._serialize_many(
+                database.books.find(current, mongo_projection(fields))
+                .sort([(sort_key, sort_direction), ("_id", sort_direction)])
+                .skip(skip)
+                .limit(limit)
+            ),
         )
-        return self._serialize_many(cursor)
 
-    def _apply_filters(self, data: List[Dict[str, Any]], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        result = data
-        if "title" in filters:
-            term = filters["title"].lower()
-            result = [item for item in result if term in item.get("title", "").lower()]
-        if "authors.id" in filters:
-            author_id = filters["authors.id"]
-            result = [item for item in result if any(a.get("id") == author_id for a in item.get("authors", []))]
-        if "genres" in filters:
-            genres = set(filters["genres"]) if isinstance(filters["genres"], list) else {filters["genres"]}
-            result = [item for item in result if genres.intersection(set(item.get("genres", [])))]
-        return result
+    def count_books(self, filters: Dict[str, Any]) -> Tuple[int, bool]:
+        """Total de libros para un filtro y si el valor es una estimación.
+
+        Sin filtros selectivos se usa ``estimated_document_count`` (metadatos de la
+        colección, incluye los borrados lógicos) en lugar de recorrer el índice.
+        """
+        selective = {k: v for k, v in filters.items() if k != "deleted"}
+        database = self.db()
+        if database is None:
+            return self._memory_books.count(selective), False
+        if not selective:
+            return database.books.estimated_document_count(), True
+        total = self._text_fallback(
+            {**selective, "deleted": {"$ne": True}}, lambda current: database.books.count_documents(current)
+        )
+        return total, False
+
+    def list_books_page(
+        self,
+        filters: Dict[str, Any],
+        sort: str,
+        order: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Paginación por cursor: cada página cuesta lo mismo que la primera.
+
+        Lanza ``InvalidCursor`` si el cursor no corresponde a este orden.
+        """
+        filters = {**filters, "deleted": {"$ne": True}}
+        sort_key, sort_direction = self._sort_spec(sort, order)
+        descending = sort_direction == DESCENDING
+        fields = with_fields(fields, sort_key)
+        after = decode_cursor(cursor, s=sort_key, o=order) if cursor else None
+        database = self.db()
+        if database is None:
+            memory_filters = {k: v for k, v in filters.items() if k != "deleted"}
+            position = (after["k"], after["id"]) if after else None
+            books = self._memory_books.query(
+                memory_filters, sort_key, descending, limit=limit + 1, after=position
+            )
+            books = [project(book, fields) for book in books]
+        else:
+
+            def page(current: Dict[str, Any]) -> List[Dict[str, Any]]:
+                if after:
+                    current = {
+                        "$and": [
+                            current,
+                            keyset_filter(sort_key, after["k"], self._object_id(after["id"]), descending),
+                        ]
+                    }
+                found = (
+                    database.books.find(current, mongo_projection(fields))
+                    .sort([(sort_key, sort_direction), ("_id", sort_direction)])
+                    .limit(limit + 1)
+                )
+                return self._serialize_many(found)
+
+            books = self._text_fallback(filters, page)
+        if len(books) <= limit:
+            return books, None
+        books = books[:limit]
+        last_value = books[-1].get(sort_key)
+        if database is None:
+            # The memory views order on the coerced value, so the cursor must too.
+            last_value = sort_value(last_value)
+        next_cursor = encode_cursor({"k": last_value, "id": books[-1]["_id"], "s": sort_key, "o": order})
+        return books, next_cursor
+
+    def _search_books(
+        self,
+        database,
+        filters: Dict[str, Any],
+        skip: int,
+        limit: int,
+        fields: Optional[Tuple[str, ...]],
+        blend: float,
+    ) -> List[Dict[str, Any]]:
+        """Ranking por ``textScore``; ``blend`` (0..1) potencia los libros mejor valorados."""
+        if database is None:
+            memory_filters = {k: v for k, v in filters.items() if k != "deleted"}
+            ranked = self._memory_books.search(memory_filters, skip, limit, blend)
+            return [{**project(book, fields), "score": score} for book, score in ranked]
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": filters},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if blend:
+            rating = {"$convert": {"input": "$avg_rating", "to": "double", "onError": 0, "onNull": 0}}
+            boost = {"$add": [1, {"$multiply": [blend / 5, rating]}]}
+            pipeline.append({"$set": {"score": {"$multiply": ["$score", boost]}}})
+        pipeline.append({"$sort": {"score": -1, "_id": -1}})
+        if skip:
+            pipeline.append({"$skip": skip})
+        pipeline.append({"$limit": limit})
+        projection = mongo_projection(with_fields(fields, "score"))
+        if projection:
+            pipeline.append({"$project": projection})
+        try:
+            return self._serialize_many(database.books.aggregate(pipeline))
+        except OperationFailure as exc:
+            if exc.code != INDEX_NOT_FOUND:
+                raise
+            logger.warning("mongo_text_index_missing", error=str(exc))
+            # Without the index there is no textScore to rank by: best rated first.
+            return self.list_books(regex_search(filters), "rating", "desc", skip, limit, fields)
+
+    def _text_fallback(self, filters: Dict[str, Any], run: Callable[[Dict[str, Any]], T]) -> T:
+        """Ejecuta ``run(filters)``; si falta el índice de texto, repite la consulta con ``regex_search``.
+
+        Así una búsqueda con ``q`` sigue funcionando antes de ``make indexes``.
+        """
+        try:
+            return run(filters)
+        except OperationFailure as exc:
+            if exc.code != INDEX_NOT_FOUND or "$text" not in filters:
+                raise
+            logger.warning("mongo_text_index_missing", error=str(exc))
+            return run(regex_search(filters))
+
+    def _sort_spec(self, sort: str, order: str) -> Tuple[str, int]:
+        sort_key = "avg_rating" if sort in ("rating", "relevance") else "rating_count"
+        sort_direction = DESCENDING if order == "desc" else ASCENDING
+        return sort_key, sort_direction
 
     def create_book(self, data: Dict[str, Any]) -> Dict[str, Any]:
         database = self.db()
         if database is None:
             data.setdefault("_id", f"mem-{len(self._memory_books) + 1}")
-            self._memory_books.append(data)
-            return data
+            return self._memory_books.add(data)
         inserted = database.books.insert_one(data)
         data_copy = dict(data)
         data_copy["_id"] = str(inserted.inserted_id)
         return data_copy
 
-    def get_book(self, book_id: str) -> Optional[Dict[str, Any]]:
+    def upsert_books(self, books: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Upsert idempotente por ``natural_key``, omitiendo filas con el mismo ``content_hash``.
+
+        Cada libro debe traer ``natural_key`` y ``content_hash``. Se hace una sola
+        lectura de los hashes existentes y un ``bulk_write`` no ordenado solo con
+        las filas nuevas o modificadas. Devuelve ``inserted``, ``updated``,
+        ``skipped``, ``errors`` (índices relativos al lote recibido) y
+        ``updated_ids`` (libros existentes reescritos, cuyo detalle cacheado caduca).
+        ``avg_rating``/``rating_count`` del feed solo se escriben al insertar: en
+        libros existentes las estadísticas las mantienen las reseñas.
+        """
+        summary: Dict[str, Any] = {"inserted": 0, "updated": 0, "skipped": 0, "errors": [], "updated_ids": []}
+        # The same key twice in a batch: the last row wins, earlier ones are skipped.
+        latest: Dict[str, int] = {}
+        for index, book in enumerate(books):
+            latest[book["natural_key"]] = index
+        summary["skipped"] = len(books) - len(latest)
+        now = datetime.utcnow().isoformat()
         database = self.db()
         if database is None:
-            for book in self._memory_books:
-                if str(book.get("_id")) == str(book_id) and not book.get("deleted"):
-                    return book
-            return None
+            for index in latest.values():
+                book = books[index]
+                existing = self._memory_books.get_by_natural_key(book["natural_key"])
+                if existing is None:
+                    book.setdefault("_id", f"mem-{len(self._memory_books) + 1}")
+                    self._memory_books.add({**book, "created_at": now, "updated_at": now})
+                    summary["inserted"] += 1
+                elif existing.get("content_hash") == book["content_hash"]:
+                    summary["skipped"] += 1
+                else:
+                    changes = {k: v for k, v in book.items() if k != "_id" and k not in ratings.FEED_FIELDS}
+                    self._memory_books.update(existing["_id"], {**changes, "updated_at": now})
+                    summary["updated"] += 1
+                    summary["updated_ids"].append(str(existing["_id"]))
+            return summary
+        known = {
+            document["natural_key"]: document
+            for document in database.books.find(
+                {"natural_key": {"$in": list(latest)}}, {"natural_key": 1, "content_hash": 1}
+            )
+        }
+        operations, positions = [], []
+        for key, index in latest.items():
+            book = books[index]
+            existing = known.get(key)
+            if existing is not None and existing.get("content_hash") == book["content_hash"]:
+                summary["skipped"] += 1
+                continue
+            if existing is not None:
+                summary["updated_ids"].append(str(existing["_id"]))
+            changes = {k: v for k, v in book.items() if k != "_id" and k not in ratings.FEED_FIELDS}
+            seed = {k: book[k] for k in ratings.FEED_FIELDS if k in book}
+            operations.append(
+                UpdateOne(
+                    {"natural_key": key},
+                    {"$set": {**changes, "updated_at": now}, "$setOnInsert": {**seed, "created_at": now}},
+                    upsert=True,
+                )
+            )
+            positions.append(index)
+        if not operations:
+            return summary
+        try:
+            result = database.books.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details or {}
+            summary["errors"] = [
+                {"index": positions[error["index"]], "error": error.get("errmsg", "")}
+                for error in details.get("writeErrors", [])
+            ]
+        summary["inserted"] += details.get("nUpserted", 0)
+        summary["updated"] += details.get("nModified", 0)
+        return summary
+
+    def get_book(
+        self, book_id: str, fields: Optional[Tuple[str, ...]] = None
+    ) -> Optional[Dict[str, Any]]:
+        database = self.db()
+        if database is None:
+            book = self._memory_books.get(book_id)
+            if book is None or book.get("deleted"):
+                return None
+            return project(book, fields)
         result = database.books.find_one(
-            {"_id": self._object_id(book_id), "deleted": {"$ne": True}}
+            {"_id": self._object_id(book_id), "deleted": {"$ne": True}},
+            mongo_projection(fields),
         )
         return self._serialize(result)
 
+    def get_books(self, book_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Varios libros activos en una sola consulta; los ids inexistentes se omiten."""
+        book_ids = list(book_ids)
+        database = self.db()
+        if database is None:
+            books = (self._memory_books.get(book_id) for book_id in book_ids)
+            return [book for book in books if book is not None and not book.get("deleted")]
+        cursor = database.books.find(
+            {"_id": {"$in": [self._object_id(book_id) for book_id in book_ids]}, "deleted": {"$ne": True}}
+        )
+        return self._serialize_many(cursor)
+
+    def existing_book_ids(self, book_ids: Iterable[str]) -> Set[str]:
+        """Subconjunto de ``book_ids`` que son libros activos, leyendo solo ``_id``."""
+        book_ids = {str(book_id) for book_id in book_ids}
+        database = self.db()
+        if database is None:
+            return {
+                book_id
+                for book_id in book_ids
+                if (book := self._memory_books.get(book_id)) is not None and not book.get("deleted")
+            }
+        cursor = database.books.find(
+            {"_id": {"$in": [self._object_id(book_id) for book_id in book_ids]}, "deleted": {"$ne": True}},
+            {"_id": 1},
+        )
+        return {str(document["_id"]) for document in cursor}
+
     def update_book(self, book_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         database = self.db()
         if database is None:
-            for book in self._memory_books:
-                if str(book.get("_id")) == str(book_id):
-                    book.update(updates)
-                    return book
-            return None
+            return self._memory_books.update(book_id, updates)
         result = database.books.find_one_and_update(
             {"_id": self._object_id(book_id)},
             {"$set": updates},
@@ -121,6 +387,70 @@ class MongoCatalogService:
         )
         return self._serialize(result)
 
+    def apply_rating_delta(self, book_id: str, sum_delta: float, count_delta: int) -> None:
+        """Suma el delta de una reseña a ``rating_sum``/``rating_count`` y recalcula ``avg_rating``.
+
+        Es una sola actualización atómica del documento del libro, sin leer sus reseñas.
+        """
+        database = self.db()
+        if database is None:
+            book = self._memory_books.get(book_id)
+            if book is not None:
+                self._memory_books.update(book_id, ratings.apply_delta(book, sum_delta, count_delta))
+            return
+        database.books.update_one({"_id": self._object_id(book_id)}, ratings.delta_pipeline(sum_delta, count_delta))
+
+    def iter_book_ids(self, batch_size: int) -> Iterator[List[str]]:
+        """Ids de todos los libros (también los borrados) en lotes, sin cargarlos a la vez."""
+        database = self.db()
+        if database is None:
+            ids: Iterator[str] = (str(book["_id"]) for book in self._memory_books)
+        else:
+            cursor = database.books.find({}, {"_id": 1}).sort("_id", ASCENDING).batch_size(batch_size)
+            ids = (str(document["_id"]) for document in cursor)
+        while True:
+            batch = list(islice(ids, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def rating_stats(self, book_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Estadísticas de valoración de los libros de ``book_ids`` que existen."""
+        fields = ("avg_rating", "rating_count", "rating_sum", "rating_base_sum", "rating_base_count")
+        book_ids = [str(book_id) for book_id in book_ids]
+        database = self.db()
+        if database is None:
+            books = (self._memory_books.get(book_id) for book_id in book_ids)
+            return {
+                str(book["_id"]): {key: book[key] for key in fields if key in book}
+                for book in books
+                if book is not None
+            }
+        cursor = database.books.find(
+            {"_id": {"$in": [self._object_id(book_id) for book_id in book_ids]}},
+            {key: 1 for key in fields},
+        )
+        return {book["_id"]: book for book in self._serialize_many(cursor)}
+
+    def set_rating_totals(self, totals: Dict[str, Tuple[float, int]]) -> None:
+        """Fija las estadísticas a baseline + (suma, número) de reseñas activas, libro a libro."""
+        if not totals:
+            return
+        database = self.db()
+        if database is None:
+            for book_id, (review_sum, review_count) in totals.items():
+                book = self._memory_books.get(book_id)
+                if book is not None:
+                    self._memory_books.update(book_id, ratings.with_totals(book, review_sum, review_count))
+            return
+        database.books.bulk_write(
+            [
+                UpdateOne({"_id": self._object_id(book_id)}, ratings.totals_pipeline(review_sum, review_count))
+                for book_id, (review_sum, review_count) in totals.items()
+            ],
+            ordered=False,
+        )
+
     def list_authors(self, filters: Dict[str, Any], skip: int, limit: int) -> List[Dict[str, Any]]:
         database = self.db()
         if database is None:
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+BOOK_SUMMARY_FIELDS: Tuple[str, ...] = (
+    "title",
+    "authors.id",
+    "authors.name",
+    "genres",
+    "year",
+    "cover_url",
+    "avg_rating",
+    "rating_count",
+)
+FIELD_PRESETS: Dict[str, Optional[Tuple[str, ...]]] = {
+    "summary": BOOK_SUMMARY_FIELDS,
+    "full": None,
+}
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(value: Optional[str], default: str = "full") -> Optional[Tuple[str, ...]]:
+    """Traduce ``?fields=`` a una tupla de rutas; None significa documento completo."""
+    value = (value or default).strip()
+    if value in FIELD_PRESETS:
+        return FIELD_PRESETS[value]
+    fields = [item.strip() for item in value.split(",") if item.strip()]
+    if not fields or any(not _FIELD_PATTERN.match(item) for item in fields):
+        raise InvalidFields(value)
+    return _normalize(fields)
+
+
+def with_fields(fields: Optional[Tuple[str, ...]], *extra: str) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    return _normalize([*fields, *extra])
+
+
+def fields_label(fields: Optional[Tuple[str, ...]]) -> str:
+    return "full" if fields is None else ",".join(fields)
+
+
+def mongo_projection(fields: Optional[Tuple[str, ...]]) -> Optional[Dict[str, int]]:
+    if fields is None:
+        return None
+    return {field: 1 for field in fields}
+
+
+def project(document: Dict[str, Any], fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    """Aplica en memoria la misma proyección que Mongo aplicaría con ``mongo_projection``."""
+    if fields is None:
+        return document
+    result: Dict[str, Any] = {}
+    if "_id" in document:
+        result["_id"] = document["_id"]
+    for field in fields:
+        _copy_path(document, result, field.split("."))
+    return result
+
+
+def _normalize(fields: Iterable[str]) -> Tuple[str, ...]:
+    # Mongo rejects projections where a path and one of its parents both appear.
+    unique = sorted(set(fields))
+    kept: List[str] = []
+    for field in unique:
+        if not any(field.startswith(f"{parent}.") for parent in kept):
+            kept.append(field)
+    return tuple(kept)
+
+
+def _copy_path(source: Dict[str, Any], target: Dict[str, Any], parts: List[str]) -> None:
+    head, rest = parts[0], parts[1:]
+    if head not in source:
+        return
+    value = source[head]
+    if not rest:
+        target[head] = value
+    elif isinstance(value, dict):
+        _copy_path(value, target.setdefault(head, {}), rest)
+    elif isinstance(value, list):
+        items = [item for item in value if isinstance(item, dict)]
+        slots = target.setdefault(head, [{} for _ in items])
+        for item, slot in zip(items, slots):
+            _copy_path(item, slot, rest)
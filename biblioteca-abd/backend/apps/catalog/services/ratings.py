@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from .memory_store import sort_value
+
+# Stats kept on each book: rating_sum/rating_count are updated by deltas from
+# reviews and avg_rating is derived from them. A book imported with
+# avg_rating/rating_count but no rating_sum keeps those ratings as a fixed
+# baseline (rating_base_sum/rating_base_count) the first time it is touched,
+# so reviews add to them instead of replacing them.
+
+# Feed fields that only seed a new book: once it exists its stats belong to
+# reviews, so re-imports never overwrite them.
+FEED_FIELDS = ("avg_rating", "rating_count")
+
+_MISSING_SUM = {"$eq": [{"$type": "$rating_sum"}, "missing"]}
+_NUMBER = {"$convert": {"input": "$avg_rating", "to": "double", "onError": 0, "onNull": 0}}
+_COUNT = {"$convert": {"input": "$rating_count", "to": "double", "onError": 0, "onNull": 0}}
+
+_CAPTURE_BASELINE: Dict[str, Any] = {
+    "$set": {
+        "rating_base_sum": {
+            "$ifNull": [
+                "$rating_base_sum",
+                {"$cond": [_MISSING_SUM, {"$multiply": [_NUMBER, _COUNT]}, 0]},
+            ]
+        },
+        "rating_base_count": {"$ifNull": ["$rating_base_count", {"$cond": [_MISSING_SUM, _COUNT, 0]}]},
+    }
+}
+
+_DERIVE_AVERAGE: Dict[str, Any] = {
+    "$set": {
+        "avg_rating": {
+            "$cond": [
+                {"$gt": ["$rating_count", 0]},
+                {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 2]},
+                0,
+            ]
+        }
+    }
+}
+
+
+def delta_pipeline(sum_delta: float, count_delta: int) -> List[Dict[str, Any]]:
+    """Update de agregación que suma un delta a las estadísticas en una sola escritura atómica."""
+    return [
+        _CAPTURE_BASELINE,
+        {
+            "$set": {
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", "$rating_base_sum"]}, sum_delta]},
+                "rating_count": {
+                    "$add": [
+                        {"$cond": [_MISSING_SUM, "$rating_base_count", {"$ifNull": ["$rating_count", 0]}]},
+                        count_delta,
+                    ]
+                },
+            }
+        },
+        _DERIVE_AVERAGE,
+    ]
+
+
+def totals_pipeline(review_sum: float, review_count: int) -> List[Dict[str, Any]]:
+    """Update de agregación que fija las estadísticas a baseline + totales de reseñas."""
+    return [
+        _CAPTURE_BASELINE,
+        {
+            "$set": {
+                "rating_sum": {"$add": ["$rating_base_sum", review_sum]},
+                "rating_count": {"$add": ["$rating_base_count", review_count]},
+            }
+        },
+        _DERIVE_AVERAGE,
+    ]
+
+
+def baseline(book: Dict[str, Any]) -> Tuple[float, int]:
+    if "rating_base_sum" in book:
+        return float(book["rating_base_sum"]), int(book.get("rating_base_count", 0))
+    if "rating_sum" in book:
+        return 0.0, 0
+    count = int(sort_value(book.get("rating_count")))
+    return sort_value(book.get("avg_rating")) * count, count
+
+
+def _stats(rating_sum: float, rating_count: int, base: Tuple[float, int]) -> Dict[str, Any]:
+    return {
+        "rating_base_sum": base[0],
+        "rating_base_count": base[1],
+        "rating_sum": rating_sum,
+        "rating_count": rating_count,
+        "avg_rating": round(rating_sum / rating_count, 2) if rating_count > 0 else 0,
+    }
+
+
+def apply_delta(book: Dict[str, Any], sum_delta: float, count_delta: int) -> Dict[str, Any]:
+    """Equivalente en Python de ``delta_pipeline`` para el almacén en memoria."""
+    base = baseline(book)
+    if "rating_sum" in book:
+        current = (float(book["rating_sum"]), int(book.get("rating_count", 0)))
+    else:
+        current = base
+    return _stats(current[0] + sum_delta, current[1] + count_delta, base)
+
+
+def with_totals(book: Dict[str, Any], review_sum: float, review_count: int) -> Dict[str, Any]:
+    base = baseline(book)
+    return _stats(base[0] + review_sum, base[1] + review_count, base)
+
+
+def drifted(book: Dict[str, Any], review_sum: float, review_count: int) -> bool:
+    """True si las estadísticas guardadas no coinciden con baseline + totales de reseñas."""
+    if "rating_sum" not in book:
+        return review_count > 0
+    expected = with_totals(book, review_sum, review_count)
+    return int(book.get("rating_count", 0)) != expected["rating_count"] or (
+        abs(float(book["rating_sum"]) - expected["rating_sum"]) > 1e-6
+    )
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set
+
+# Same weights as the Mongo text index created in ``ensure_indexes``.
+FIELD_WEIGHTS = {"title": 10, "synopsis": 2}
+
+SPANISH_STOPWORDS = frozenset(
+    """
+    a al algo ante con contra de del desde el ella ellas ellos en entre era es esa ese eso esta
+    este esto la las le les lo los mas me mi mis muy no nos o para pero por que se sin sobre su
+    sus tu un una uno unos y ya
+    """.split()
+)
+_TOKEN_PATTERN = re.compile(r"\w+")
+MIN_PREFIX_LENGTH = 3
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes: "Canción" -> "cancion"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(fold(text)) if token not in SPANISH_STOPWORDS]
+
+
+class TextIndex:
+    """Índice invertido ponderado para la búsqueda del catálogo en memoria.
+
+    Cada término apunta a los libros que lo contienen con su peso (frecuencia por
+    peso del campo); la puntuación es la suma de ``peso * idf`` de los términos
+    de la consulta. El último término también casa por prefijo, para que una
+    búsqueda parcial ("fic") encuentre "ficciones".
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._vocabulary.clear()
+
+    def add(self, doc_id: str, fields: Dict[str, str]) -> None:
+        weights: Counter = Counter()
+        for name, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(str(fields.get(name) or "")):
+                weights[token] += weight
+        for token, weight in weights.items():
+            if token not in self._postings:
+                insort(self._vocabulary, token)
+            self._postings[token][doc_id] = float(weight)
+        self._doc_terms[doc_id] = set(weights)
+
+    def remove(self, doc_id: str) -> None:
+        for token in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    del self._vocabulary[position]
+
+    def search(self, query: str) -> Dict[str, float]:
+        tokens = tokenize(query)
+        scores: Dict[str, float] = defaultdict(float)
+        total = max(len(self._doc_terms), 1)
+        for position, token in enumerate(tokens):
+            terms: Iterable[str] = [token]
+            if position == len(tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH:
+                terms = self._with_prefix(token)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + total / len(postings))
+                for doc_id, weight in postings.items():
+                    scores[doc_id] += weight * idf
+        return dict(scores)
+
+    def _with_prefix(self, prefix: str) -> List[str]:
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Optional
+
+import structlog
+from celery import shared_task
+from django.conf import settings
+
+from ..authx.services.redis_service import (
+    books_cache_generation,
+    cache_key_for_books,
+    cache_key_for_books_count,
+    cache_missing,
+    cache_set,
+    claim,
+    decay_popular_books_queries,
+    popular_books_queries,
+)
+from .services.book_listing import book_count, build_book_page, count_params, page_tags
+from .services.projection import parse_fields
+
+logger = structlog.get_logger(__name__)
+
+WARM_DEBOUNCE_KEY = "lock:warm:books"
+
+
+@shared_task(soft_time_limit=settings.CACHE_WARM_TIME_LIMIT_SECONDS)
+def warm_books_cache(limit: Optional[int] = None, scheduled: bool = False) -> Dict[str, Any]:
+    """Recalcula las N páginas del listado más pedidas que no están en cache.
+
+    Se lanza tras cada invalidación (con rebote) y periódicamente desde beat;
+    las ejecuciones periódicas además envejecen el ranking de popularidad.
+    """
+    started = time.monotonic()
+    deadline = started + settings.CACHE_WARM_TIME_LIMIT_SECONDS
+    generation = books_cache_generation()
+    candidates = {
+        cache_key_for_books(params, generation): params
+        for params in popular_books_queries(limit or settings.CACHE_WARM_TOP_N)
+    }
+    pending = cache_missing(list(candidates))
+    warmed = failed = skipped = 0
+    with ThreadPoolExecutor(max_workers=settings.CACHE_WARM_CONCURRENCY) as pool:
+        futures = {}
+        for key in pending:
+            if time.monotonic() >= deadline:
+                skipped += 1
+                continue
+            futures[pool.submit(_warm_page, key, candidates[key], generation, deadline)] = key
+        for future in as_completed(futures):
+            try:
+                if future.result():
+                    warmed += 1
+                else:
+                    skipped += 1
+            except Exception:
+                failed += 1
+                logger.exception("warm_books_cache_page_failed", key=futures[future])
+    if scheduled:
+        decay_popular_books_queries(settings.CACHE_POPULAR_DECAY, settings.CACHE_POPULAR_MAX_TRACKED)
+    result = {
+        "generation": generation,
+        "candidates": len(candidates),
+        "warmed": warmed,
+        "skipped": skipped,
+        "failed": failed,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    logger.info("warm_books_cache_finished", scheduled=scheduled, **result)
+    return result
+
+
+def _warm_page(key: str, params: Dict[str, Any], generation: int, deadline: float) -> bool:
+    if time.monotonic() >= deadline:
+        return False
+    cursor = "" if "cursor" in params else None
+    page = build_book_page(params, parse_fields(params.get("fields"), default="summary"), cursor)
+    counts = book_count(params)
+    cache_set(cache_key_for_books_count(count_params(params), generation), counts)
+    cache_set(key, {**page, **counts}, tags=page_tags(page))
+    return True
+
+
+def schedule_books_cache_warm() -> None:
+    """Encola ``warm_books_cache`` tras una invalidación, como mucho una vez por ventana de rebote.
+
+    Si Redis (que también es el broker) no responde no se encola nada; en modo
+    eager tampoco, para no recalcular el listado dentro de la propia petición.
+    """
+    if warm_books_cache.app.conf.task_always_eager:
+        return
+    if not claim(WARM_DEBOUNCE_KEY, settings.CACHE_WARM_DEBOUNCE_SECONDS):
+        return
+    try:
+        warm_books_cache.apply_async(countdown=settings.CACHE_WARM_DEBOUNCE_SECONDS, retry=False)
+    except Exception as exc:
+        logger.warning("warm_books_cache_not_scheduled", error=str(exc))
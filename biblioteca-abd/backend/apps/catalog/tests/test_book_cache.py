@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.catalog import views as catalog_views
+from apps.catalog.services import book_cache
+from apps.catalog.services.mongo_service import mongo_service
+
+
+@pytest.fixture(autouse=True)
+def fake_cache(monkeypatch):
+    store: dict[str, tuple] = {}
+
+    def fake_set(key, value, ttl=None):
+        store[key] = (value, ttl)
+
+    def fake_set_many(items, ttl=None):
+        for key, value in items.items():
+            store[key] = (value, ttl)
+
+    monkeypatch.setattr(book_cache, "cache_get", lambda key: store.get(key, (None,))[0])
+    monkeypatch.setattr(book_cache, "cache_set", fake_set)
+    monkeypatch.setattr(book_cache, "cache_get_many", lambda keys: {k: store[k][0] for k in keys if k in store})
+    monkeypatch.setattr(book_cache, "cache_set_many", fake_set_many)
+    monkeypatch.setattr(catalog_views, "invalidate_books_cache", lambda: None)
+    mongo_service._memory_books.clear()
+    yield store
+    mongo_service._memory_books.clear()
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    calls = []
+    original = mongo_service.get_book
+
+    def counting_get_book(book_id, fields=None):
+        calls.append(book_id)
+        return original(book_id, fields=fields)
+
+    monkeypatch.setattr(mongo_service, "get_book", counting_get_book)
+    return calls
+
+
+def test_detail_is_read_through_and_projected_per_request(reads):
+    book = mongo_service.create_book({"title": "Rayuela", "year": 1963})
+    client = APIClient()
+
+    first = client.get(reverse("book-detail", args=[book["_id"]]))
+    second = client.get(reverse("book-detail", args=[book["_id"]]), {"fields": "title"})
+
+    assert first.data["year"] == 1963
+    assert second.data == {"_id": book["_id"], "title": "Rayuela"}
+    assert reads == [book["_id"]]
+
+
+def test_unknown_ids_are_negatively_cached(fake_cache, reads, settings):
+    settings.CACHE_NEGATIVE_TTL_SECONDS = 7
+
+    assert book_cache.get_book("nope") is None
+    assert book_cache.get_book("nope") is None
+
+    assert reads == ["nope"]
+    assert fake_cache["cache:books:detail:nope"] == (book_cache.MISSING, 7)
+
+
+def test_update_writes_through_and_delete_evicts(reads):
+    book = mongo_service.create_book({"title": "Rayuela", "year": 1963})
+    client = APIClient()
+    client.get(reverse("book-detail", args=[book["_id"]]))
+
+    client.patch(reverse("book-detail", args=[book["_id"]]), {"year": 1964}, format="json")
+    assert client.get(reverse("book-detail", args=[book["_id"]])).data["year"] == 1964
+
+    client.delete(reverse("book-detail", args=[book["_id"]]))
+    assert client.get(reverse("book-detail", args=[book["_id"]])).status_code == 404
+    assert reads == [book["_id"]]
+
+
+def test_get_books_fetches_only_the_misses_in_one_batch(fake_cache, monkeypatch):
+    cached = mongo_service.create_book({"title": "Cacheado"})
+    fresh = mongo_service.create_book({"title": "Nuevo"})
+    fake_cache[f"cache:books:detail:{cached['_id']}"] = (cached, 60)
+    batches = []
+    original = mongo_service.get_books
+    monkeypatch.setattr(mongo_service, "get_books", lambda ids: batches.append(ids) or original(ids))
+
+    books = book_cache.get_books([cached["_id"], fresh["_id"], "missing", fresh["_id"]])
+
+    assert set(books) == {cached["_id"], fresh["_id"]}
+    assert batches == [[fresh["_id"], "missing"]]
+    assert book_cache.warm_books([fresh["_id"]]) == 1
+    assert len(batches) == 1
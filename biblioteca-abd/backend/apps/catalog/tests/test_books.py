@@ -1,9 +1,9 @@
+import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
-import pytest
 
-from apps.catalog.services.mongo_service import mongo_service
 from apps.catalog import views as catalog_views
+from apps.catalog.services.mongo_service import mongo_service
 
 
 @pytest.fixture(autouse=True)
@@ -47,13 +47,26 @@ def test_deleted_book_is_not_listed_or_retrieved():
     assert detail_response.status_code == 404
 
 
+def test_create_and_update_invalidate_the_list_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(catalog_views, "invalidate_books_cache", lambda: calls.append("invalidate"))
+
+    client = APIClient()
+    create_response = client.post(reverse("book-list"), {"title": "Nuevo"}, format="json")
+    book_id = create_response.data["_id"]
+    client.patch(reverse("book-detail", args=[book_id]), {"year": 2001}, format="json")
+    client.patch(reverse("book-detail", args=["missing"]), {"year": 2001}, format="json")
+
+    assert calls == ["invalidate", "invalidate"]
+
+
 def test_cache_is_invalidated_when_book_is_deleted(monkeypatch):
     cache_store: dict[str, dict] = {}
 
     def fake_get(key):
         return cache_store.get(key)
 
-    def fake_set(key, value, ttl=None):
+    def fake_set(key, value, ttl=None, tags=()):
         cache_store[key] = value
 
     def fake_invalidate():
@@ -88,3 +101,139 @@ def test_cache_is_invalidated_when_book_is_deleted(monkeypatch):
 
     detail_response = client.get(reverse("book-detail", args=[book_id]))
     assert detail_response.status_code == 404
+
+
+def test_cursor_pagination_walks_all_books_in_rating_order():
+    for index in range(5):
+        mongo_service.create_book({"title": f"Libro {index}", "avg_rating": index % 3, "rating_count": index})
+
+    client = APIClient()
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(reverse("book-list"), {"cursor": cursor, "page_size": 2})
+        assert response.status_code == 200
+        assert len(response.data["results"]) <= 2
+        seen.extend(book["_id"] for book in response.data["results"])
+        cursor = response.data["next_cursor"]
+
+    assert seen == ["mem-3", "mem-5", "mem-2", "mem-4", "mem-1"]
+
+
+def test_invalid_cursor_is_rejected():
+    client = APIClient()
+    response = client.get(reverse("book-list"), {"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    mongo_service.create_book({"title": "A", "avg_rating": 1})
+    mongo_service.create_book({"title": "B", "avg_rating": 2})
+    first = client.get(reverse("book-list"), {"cursor": "", "page_size": 1})
+    other_order = client.get(
+        reverse("book-list"), {"cursor": first.data["next_cursor"], "sort": "popularity"}
+    )
+    assert other_order.status_code == 400
+
+
+def test_list_uses_summary_projection_and_honors_fields():
+    mongo_service.create_book(
+        {
+            "title": "Ficciones",
+            "synopsis": "Cuentos",
+            "authors": [{"id": "auth-2", "name": "Borges", "bio": "Larga"}],
+            "avg_rating": 4.7,
+        }
+    )
+    client = APIClient()
+
+    summary = client.get(reverse("book-list")).data["results"][0]
+    assert "synopsis" not in summary
+    assert summary["authors"] == [{"id": "auth-2", "name": "Borges"}]
+
+    custom = client.get(reverse("book-list"), {"fields": "title"}).data["results"][0]
+    assert custom == {"_id": "mem-1", "title": "Ficciones"}
+
+    full = client.get(reverse("book-list"), {"fields": "full"}).data["results"][0]
+    assert full["synopsis"] == "Cuentos"
+
+    detail = client.get(reverse("book-detail", args=["mem-1"]), {"fields": "title,avg_rating"})
+    assert detail.data == {"_id": "mem-1", "title": "Ficciones", "avg_rating": 4.7}
+
+
+def test_invalid_fields_are_rejected():
+    client = APIClient()
+    response = client.get(reverse("book-list"), {"fields": "title,$where"})
+    assert response.status_code == 400
+
+
+def test_search_is_accent_insensitive_and_ranked_by_relevance():
+    mongo_service.create_book({"title": "Cuentos completos", "synopsis": "Incluye Ficciones", "avg_rating": 5})
+    mongo_service.create_book({"title": "Ficciones", "synopsis": "Cuentos", "avg_rating": 3})
+    mongo_service.create_book({"title": "Rayuela", "synopsis": "Novela", "avg_rating": 4})
+    client = APIClient()
+
+    response = client.get(reverse("book-list"), {"q": "ficción"})
+    assert response.status_code == 200
+    # "ficción" folds to "ficcion", which prefixes "ficciones".
+    assert [book["title"] for book in response.data["results"]] == ["Ficciones", "Cuentos completos"]
+    assert response.data["results"][0]["score"] > response.data["results"][1]["score"]
+
+    by_rating = client.get(reverse("book-list"), {"q": "ficciones", "sort": "rating"})
+    assert [book["title"] for book in by_rating.data["results"]] == ["Cuentos completos", "Ficciones"]
+
+
+def test_count_is_the_filter_total_not_the_page_size():
+    for index in range(5):
+        genres = ["Fantasía"] if index % 2 else ["Ensayo"]
+        mongo_service.create_book({"title": f"Libro {index}", "genres": genres})
+    client = APIClient()
+
+    response = client.get(reverse("book-list"), {"page_size": 2})
+    assert len(response.data["results"]) == 2
+    assert response.data["count"] == 5
+    assert response.data["count_estimated"] is False
+
+    filtered = client.get(reverse("book-list"), {"genres": "Fantasía", "cursor": "", "page_size": 1})
+    assert filtered.data["count"] == 2
+
+
+def test_search_falls_back_to_regex_without_text_index(monkeypatch):
+    from pymongo.errors import OperationFailure
+
+    queries = []
+
+    class FakeCursor(list):
+        def sort(self, *args):
+            return self
+
+        skip = limit = sort
+
+    class FakeBooks:
+        def _check(self, filters):
+            queries.append(filters)
+            if "$text" in filters or "$text" in filters.get("$and", [{}])[0]:
+                raise OperationFailure("text index required for $text query", code=27)
+
+        def find(self, filters, projection=None):
+            self._check(filters)
+            return FakeCursor([{"_id": "b1", "title": "El Quijote"}])
+
+        def aggregate(self, pipeline):
+            self._check(pipeline[0]["$match"])
+
+        def count_documents(self, filters):
+            self._check(filters)
+            return 1
+
+    class FakeDatabase:
+        books = FakeBooks()
+
+    monkeypatch.setattr(mongo_service, "db", lambda: FakeDatabase())
+    filters = {"$text": {"$search": "quij(ote"}}
+
+    assert mongo_service.list_books(filters, "relevance", "desc", 0, 10)[0]["_id"] == "b1"
+    assert mongo_service.list_books(filters, "popularity", "desc", 0, 10)[0]["_id"] == "b1"
+    assert mongo_service.count_books(filters) == (1, False)
+    assert mongo_service.list_books_page(filters, "rating", "desc", 10)[0][0]["_id"] == "b1"
+    fallback = queries[-1]
+    assert "$text" not in fallback
+    assert fallback["$or"][0] == {"title": {"$regex": r"quij\(ote", "$options": "i"}}
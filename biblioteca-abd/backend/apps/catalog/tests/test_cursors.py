@@ -0,0 +1,30 @@
+import pytest
+
+from apps.catalog.services.cursors import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+)
+
+
+def test_cursor_round_trip_checks_sort_spec():
+    token = encode_cursor({"k": 4.5, "id": "abc", "s": "avg_rating", "o": "desc"})
+    assert decode_cursor(token, s="avg_rating", o="desc")["id"] == "abc"
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, s="rating_count", o="desc")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("%%%")
+
+
+def test_keyset_filter_keeps_missing_values_after_numbers_when_descending():
+    assert keyset_filter("avg_rating", 4, "x", descending=True) == {
+        "$or": [
+            {"avg_rating": {"$lt": 4}},
+            {"avg_rating": None},
+            {"avg_rating": 4, "_id": {"$lt": "x"}},
+        ]
+    }
+    assert keyset_filter("avg_rating", None, "x", descending=False) == {
+        "$or": [{"avg_rating": {"$ne": None}}, {"avg_rating": None, "_id": {"$gt": "x"}}]
+    }
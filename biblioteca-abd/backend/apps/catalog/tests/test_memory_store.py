@@ -0,0 +1,82 @@
+from apps.catalog.services.memory_store import MemoryBookStore
+
+
+def _book(book_id, rating, count, genres=(), author="a-1", title="Libro"):
+    return {
+        "_id": book_id,
+        "title": title,
+        "genres": list(genres),
+        "authors": [{"id": author, "name": "Autor"}],
+        "avg_rating": rating,
+        "rating_count": count,
+    }
+
+
+def _ids(books):
+    return [book["_id"] for book in books]
+
+
+def test_pages_follow_presorted_views():
+    store = MemoryBookStore()
+    for index in range(10):
+        store.add(_book(f"b{index}", rating=index / 2, count=10 - index))
+
+    assert _ids(store.query({}, "avg_rating", True, 0, 3)) == ["b9", "b8", "b7"]
+    assert _ids(store.query({}, "avg_rating", True, 3, 3)) == ["b6", "b5", "b4"]
+    assert _ids(store.query({}, "rating_count", True, 0, 2)) == ["b0", "b1"]
+    assert _ids(store.query({}, "avg_rating", False, 8, 5)) == ["b8", "b9"]
+
+
+def test_inverted_indexes_combine_filters():
+    store = MemoryBookStore()
+    store.add(_book("b1", 4.0, 1, genres=["Fantasía"], author="a-1"))
+    store.add(_book("b2", 3.0, 1, genres=["Fantasía", "Terror"], author="a-2"))
+    store.add(_book("b3", 5.0, 1, genres=["Terror"], author="a-2"))
+
+    assert _ids(store.query({"genres": ["Fantasía"]}, "avg_rating", True, 0, 10)) == ["b1", "b2"]
+    assert _ids(store.query({"genres": ["Terror"], "authors.id": "a-2"}, "avg_rating", True, 0, 10)) == [
+        "b3",
+        "b2",
+    ]
+    assert store.query({"authors.id": "missing"}, "avg_rating", True, 0, 10) == []
+
+
+def test_update_and_soft_delete_keep_indexes_in_sync():
+    store = MemoryBookStore()
+    store.add(_book("b1", 4.0, 1, genres=["Fantasía"]))
+    store.add(_book("b2", 3.0, 1, genres=["Fantasía"]))
+
+    store.update("b2", {"avg_rating": 5.0, "genres": ["Ensayo"]})
+    assert _ids(store.query({}, "avg_rating", True, 0, 10)) == ["b2", "b1"]
+    assert _ids(store.query({"genres": ["Fantasía"]}, "avg_rating", True, 0, 10)) == ["b1"]
+
+    store.update("b1", {"deleted": True})
+    assert _ids(store.query({}, "avg_rating", True, 0, 10)) == ["b2"]
+    assert store.query({"genres": ["Fantasía"]}, "avg_rating", True, 0, 10) == []
+    assert store.get("b1")["deleted"] is True
+
+
+def test_rating_updates_skip_text_reindexing_and_natural_keys_follow_updates(monkeypatch):
+    store = MemoryBookStore()
+    store.add({**_book("b1", 4.0, 10, title="Rayuela"), "natural_key": "title:rayuela|"})
+    tokenized = []
+    add = store._text.add
+    monkeypatch.setattr(
+        store._text, "add", lambda doc_id, fields: tokenized.append(doc_id) or add(doc_id, fields)
+    )
+
+    store.update("b1", {"avg_rating": 4.5, "rating_count": 11})
+    assert tokenized == []
+    assert _ids(store.query({"$text": {"$search": "rayuela"}}, "avg_rating", True)) == ["b1"]
+
+    store.update(
+        "b1", {"title": "Rayuela (edición crítica)", "natural_key": "title:rayuela edicion critica|"}
+    )
+    assert tokenized == ["b1"]
+    assert store.get_by_natural_key("title:rayuela|") is None
+    assert store.get_by_natural_key("title:rayuela edicion critica|")["_id"] == "b1"
+
+    # Soft-deleted books keep their key (Mongo's unique index still holds it) but leave the text index.
+    store.update("b1", {"deleted": True})
+    assert store.get_by_natural_key("title:rayuela edicion critica|")["_id"] == "b1"
+    assert store.query({"$text": {"$search": "rayuela"}}, "avg_rating", True) == []
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from pymongo.errors import PyMongoError
+from pymongo.monitoring import CommandFailedEvent
+
+from apps.catalog.services import mongo_client
+from apps.catalog.services.mongo_service import MongoCatalogService
+from apps.reviews.services.mongo_reviews import MongoReviewService
+
+
+class DummyAdmin:
+    def __init__(self, client: "DummyClient"):
+        self._client = client
+
+    def command(self, name: str):
+        self._client.pings += 1
+        if not self._client.available:
+            raise PyMongoError("down")
+        return {"ok": 1}
+
+
+class DummyClient:
+    def __init__(self, available: bool = True):
+        self.available = available
+        self.pings = 0
+        self.closed = False
+        self.admin = DummyAdmin(self)
+
+    def __getitem__(self, name: str):
+        return f"db:{name}"
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def built_clients(monkeypatch, settings):
+    settings.MONGO_HEALTHCHECK_INTERVAL_SECONDS = 60
+    built: list[DummyClient] = []
+
+    def fake_build(url):
+        client = DummyClient()
+        built.append(client)
+        return client
+
+    mongo_client.reset_clients()
+    monkeypatch.setattr(mongo_client, "_build_client", fake_build)
+    yield built
+    mongo_client.reset_clients()
+
+
+def test_catalog_and_review_services_share_one_client(built_clients):
+    catalog = MongoCatalogService()
+    reviews = MongoReviewService()
+
+    assert catalog.db() == reviews.db()
+    assert catalog.client is reviews.client
+    assert len(built_clients) == 1
+
+
+def test_health_check_is_not_repeated_on_every_query(built_clients):
+    service = MongoCatalogService()
+    for _ in range(5):
+        assert service.db() is not None
+    assert built_clients[0].pings == 1
+
+
+def test_unhealthy_client_falls_back_until_next_check(built_clients, settings):
+    mongo_client.get_client()
+    built_clients[0].available = False
+    service = MongoCatalogService()
+    assert service.db() is None
+
+    built_clients[0].available = True
+    assert service.db() is None  # result cached for the interval
+    settings.MONGO_HEALTHCHECK_INTERVAL_SECONDS = 0
+    assert service.db() is not None
+
+
+def test_new_client_is_built_in_forked_process(built_clients, monkeypatch):
+    parent = mongo_client.get_client()
+    monkeypatch.setattr(mongo_client.os, "getpid", lambda: -1)
+
+    child = mongo_client.get_client()
+
+    assert child is not parent
+    assert not parent.closed
+    assert len(built_clients) == 2
+
+
+def test_connection_failure_forces_a_new_health_check(built_clients, settings):
+    service = MongoCatalogService()
+    assert service.db() is not None
+    listener = mongo_client._HealthListener(settings.MONGO_URL)
+
+    listener.failed(_command_failed("DuplicateKeyError"))
+    assert service.db() is not None
+    assert built_clients[0].pings == 1
+
+    built_clients[0].available = False
+    listener.failed(_command_failed("AutoReconnect"))
+    assert service.db() is None
+    assert built_clients[0].pings == 2
+
+
+def _command_failed(errtype: str) -> CommandFailedEvent:
+    return CommandFailedEvent(
+        duration=timedelta(0),
+        failure={"errmsg": "boom", "errtype": errtype},
+        command_name="find",
+        request_id=1,
+        connection_id=("localhost", 27017),
+        operation_id=1,
+    )
@@ -0,0 +1,22 @@
+from apps.catalog.services.projection import mongo_projection, parse_fields, project
+
+
+def test_parse_fields_drops_paths_covered_by_a_parent():
+    fields = parse_fields("authors.name,authors,title")
+    assert fields == ("authors", "title")
+    assert mongo_projection(fields) == {"authors": 1, "title": 1}
+    assert parse_fields(None) is None
+
+
+def test_project_handles_nested_lists_like_mongo():
+    document = {
+        "_id": "b1",
+        "title": "Ficciones",
+        "synopsis": "...",
+        "authors": [{"id": "a1", "name": "Borges", "bio": "..."}, "legacy"],
+    }
+    assert project(document, ("authors.name", "title")) == {
+        "_id": "b1",
+        "title": "Ficciones",
+        "authors": [{"name": "Borges"}],
+    }
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.catalog import tasks as catalog_tasks
+from apps.catalog import views as catalog_views
+from apps.catalog.services.mongo_service import mongo_service
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    mongo_service._memory_books.clear()
+    for index in range(3):
+        mongo_service.create_book({"title": f"Libro {index}", "avg_rating": index, "genres": ["Novela"]})
+    store: dict[str, dict] = {}
+    monkeypatch.setattr(catalog_tasks, "books_cache_generation", lambda: 3)
+    monkeypatch.setattr(
+        catalog_tasks, "cache_set", lambda key, value, ttl=None, tags=(): store.__setitem__(key, value)
+    )
+    monkeypatch.setattr(catalog_tasks, "cache_missing", lambda keys: [key for key in keys if key not in store])
+    monkeypatch.setattr(catalog_tasks, "decay_popular_books_queries", lambda factor, keep: None)
+    yield store
+    mongo_service._memory_books.clear()
+
+
+def _requested_params(monkeypatch, query):
+    recorded = []
+    monkeypatch.setattr(catalog_views, "record_books_query", recorded.append)
+    monkeypatch.setattr(catalog_views, "cache_get", lambda key: None)
+    monkeypatch.setattr(catalog_views, "cache_set", lambda key, value, ttl=None, tags=(): None)
+    monkeypatch.setattr(catalog_views, "books_cache_generation", lambda: 3)
+    response = APIClient().get(reverse("book-list"), query)
+    return recorded[0], response.data
+
+
+def test_warm_caches_the_same_payload_the_view_serves(catalog, monkeypatch):
+    params, served = _requested_params(monkeypatch, {"genres": "Novela", "page_size": 2})
+    monkeypatch.setattr(catalog_tasks, "popular_books_queries", lambda limit: [params])
+
+    result = catalog_tasks.warm_books_cache.run()
+
+    assert result["warmed"] == 1 and result["failed"] == 0
+    key = catalog_tasks.cache_key_for_books(params, 3)
+    assert catalog[key] == served
+    assert catalog_tasks.cache_key_for_books_count({"q": None, "author_id": None, "genres": "Novela"}, 3) in catalog
+
+
+def test_warm_skips_cached_pages_and_respects_the_time_limit(catalog, monkeypatch, settings):
+    params, _ = _requested_params(monkeypatch, {})
+    monkeypatch.setattr(catalog_tasks, "popular_books_queries", lambda limit: [params])
+    catalog_tasks.warm_books_cache.run()
+
+    assert catalog_tasks.warm_books_cache.run()["warmed"] == 0
+
+    catalog.clear()
+    settings.CACHE_WARM_TIME_LIMIT_SECONDS = 0
+    result = catalog_tasks.warm_books_cache.run()
+    assert result["warmed"] == 0 and result["skipped"] == 1
+
+
+def test_invalidations_schedule_one_debounced_warm(monkeypatch):
+    from config.celery import app as celery_app
+
+    claims = iter([True, False])
+    scheduled = []
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=False)
+    monkeypatch.setattr(catalog_tasks, "claim", lambda key, ttl: next(claims))
+    monkeypatch.setattr(catalog_tasks.warm_books_cache, "apply_async", lambda **kwargs: scheduled.append(kwargs))
+
+    try:
+        catalog_tasks.schedule_books_cache_warm()
+        catalog_tasks.schedule_books_cache_warm()
+    finally:
+        celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=previous)
+
+    assert len(scheduled) == 1
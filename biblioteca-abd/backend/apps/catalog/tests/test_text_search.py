@@ -0,0 +1,21 @@
+from apps.catalog.services.text_search import TextIndex, fold, tokenize
+
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    assert fold("Canción") == "cancion"
+    assert tokenize("La casa de los Espíritus") == ["casa", "espiritus"]
+
+
+def test_title_matches_outrank_synopsis_and_prefix_matches_last_term():
+    index = TextIndex()
+    index.add("b1", {"title": "Ficciones", "synopsis": "Cuentos de Borges"})
+    index.add("b2", {"title": "El Aleph", "synopsis": "Más ficciones y cuentos"})
+    index.add("b3", {"title": "Rayuela", "synopsis": "Novela"})
+
+    scores = index.search("ficciones")
+    assert set(scores) == {"b1", "b2"}
+    assert scores["b1"] > scores["b2"]
+    assert set(index.search("fic")) == {"b1", "b2"}
+
+    index.remove("b1")
+    assert set(index.search("ficciones")) == {"b2"}
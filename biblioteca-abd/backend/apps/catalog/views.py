@@ -5,12 +5,20 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
 from ..authx.services.redis_service import (
+    books_cache_generation,
     cache_get,
     cache_key_for_books,
+    cache_key_for_books_count,
     cache_set,
     invalidate_books_cache,
+    record_books_query,
 )
+from .services import book_cache
+from .services.book_listing import book_count, build_book_page, count_params, page_tags
+from .services.cursors import InvalidCursor
 from .services.mongo_service import mongo_service
+from .services.projection import InvalidFields, fields_label, parse_fields, project
+from .tasks import schedule_books_cache_warm
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -24,63 +32,96 @@ class BookViewSet(viewsets.ViewSet):
     pagination_class = StandardResultsSetPagination
 
     def list(self, request):
+        query = request.query_params.get("q")
         params = {
-            "q": request.query_params.get("q"),
+            "q": query,
             "author_id": request.query_params.get("author_id"),
             "genres": request.query_params.get("genres"),
-            "sort": request.query_params.get("sort", "rating"),
+            "sort": request.query_params.get("sort") or ("relevance" if query else "rating"),
             "order": request.query_params.get("order", "desc"),
             "page": int(request.query_params.get("page", 1)),
             "page_size": int(request.query_params.get("page_size", 20)),
         }
-        cache_key = cache_key_for_books(params)
-        cached = cache_get(cache_key)
-        if cached is not None:
-            return Response(cached)
-
-        filters: Dict[str, Any] = {}
-        if params["q"]:
-            filters["title"] = params["q"]
-        if params["author_id"]:
-            filters["authors.id"] = params["author_id"]
-        if params["genres"]:
-            filters["genres"] = params["genres"].split(",")
-        filters["deleted"] = {"$ne": True}
-
-        page = params["page"]
-        page_size = params["page_size"]
-        skip = (page - 1) * page_size
-        books = mongo_service.list_books(filters, params["sort"], params["order"], skip, page_size)
-        response_data = {
-            "results": books,
-            "page": page,
-            "page_size": page_size,
-            "count": len(books),
-        }
-        cache_set(cache_key, response_data)
+        if params["sort"] == "relevance":
+            try:
+                params["blend"] = min(max(float(request.query_params.get("blend", 0)), 0.0), 1.0)
+            except ValueError:
+                return Response({"detail": "blend debe ser numérico"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = parse_fields(request.query_params.get("fields"), default="summary")
+        except InvalidFields:
+            return Response({"detail": "fields inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        params["fields"] = fields_label(fields)
+        cursor = request.query_params.get("cursor")
+        if cursor is not None and params["sort"] == "relevance" and query:
+            return Response(
+                {"detail": "cursor no disponible al ordenar por relevancia"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if cursor is not None:
+            # Keyset mode: only the first page is cached, deeper pages are cheap.
+            params.pop("page")
+            params["cursor"] = ""
+        generation = books_cache_generation()
+        cache_key = cache_key_for_books(params, generation)
+        if not cursor:
+            record_books_query(params)
+            cached = cache_get(cache_key)
+            if cached is not None:
+                return Response(cached)
+
+        try:
+            response_data = build_book_page(params, fields, cursor)
+        except InvalidCursor:
+            return Response({"detail": "cursor inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        response_data.update(self._total_count(params, generation))
+        if not cursor:
+            cache_set(cache_key, response_data, tags=page_tags(response_data))
         return Response(response_data)
 
+    def _total_count(self, params: Dict[str, Any], generation: int) -> Dict[str, Any]:
+        # Every page of the same filter shares one cached count.
+        count_key = cache_key_for_books_count(count_params(params), generation)
+        cached = cache_get(count_key)
+        if cached is not None:
+            return cached
+        data = book_count(params)
+        cache_set(count_key, data)
+        return data
+
     def retrieve(self, request, pk=None):
-        book = mongo_service.get_book(pk)
+        try:
+            fields = parse_fields(request.query_params.get("fields"))
+        except InvalidFields:
+            return Response({"detail": "fields inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        # The full document is cached once per book; projections are applied on top.
+        book = book_cache.get_book(pk)
         if not book:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return Response(book)
+        return Response(project(book, fields))
 
     def create(self, request):
         book = mongo_service.create_book(request.data)
+        invalidate_books_cache()
+        schedule_books_cache_warm()
         return Response(book, status=status.HTTP_201_CREATED)
 
     def partial_update(self, request, pk=None):
         updated = mongo_service.update_book(pk, request.data)
         if not updated:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        book_cache.store_book(updated)
+        invalidate_books_cache()
+        schedule_books_cache_warm()
         return Response(updated)
 
     def destroy(self, request, pk=None):
         updated = mongo_service.update_book(pk, {"deleted": True})
         if not updated:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        book_cache.forget_book(pk)
         invalidate_books_cache()
+        schedule_books_cache_warm()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import IO, Any, Iterator
+
+_WHITESPACE = " \t\r\n"
+_decoder = json.JSONDecoder()
+MAX_ITEM_CHARS = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class MalformedLine:
+    line: int
+    error: str
+
+
+class _Reader:
+    """Buffer over a text file that only keeps the unconsumed tail in memory."""
+
+    def __init__(self, fh: IO[str], chunk_size: int, max_item_chars: int = MAX_ITEM_CHARS) -> None:
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.max_item_chars = max_item_chars
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba {char!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        while True:
+            self.peek()
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                # A malformed item never decodes: stop reading once it is larger than
+                # any valid item could be instead of buffering the rest of the file.
+                if len(self.buffer) - self.pos > self.max_item_chars:
+                    raise ValueError(
+                        f"JSON inválido o elemento mayor que {self.max_item_chars} caracteres: {exc.msg}"
+                    ) from exc
+                if not self.fill():
+                    raise
+                continue
+            # A number or literal ending exactly at the buffer edge may continue in
+            # the next chunk: read more and decode again before trusting it.
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_items(
+    fh: IO[str], chunk_size: int = 64 * 1024, max_item_chars: int = MAX_ITEM_CHARS
+) -> Iterator[Any]:
+    """Recorre una lista JSON o un sobre ``{"items": [...]}`` elemento a elemento.
+
+    La memoria queda acotada por ``chunk_size`` más ``max_item_chars``: un
+    elemento (o una clave del sobre) mayor, o corrupto, lanza ``ValueError``
+    sin leer el resto del fichero. El primer elemento se entrega sin esperar
+    al final.
+    """
+    reader = _Reader(fh, chunk_size, max_item_chars)
+    first = reader.peek()
+    if first == "":
+        return
+    if first == "[":
+        yield from _iter_array(reader)
+        return
+    reader.expect("{")
+    while True:
+        char = reader.peek()
+        if char == "}":
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        if char == "":
+            raise ValueError("JSON truncado")
+        key = reader.value()
+        reader.expect(":")
+        if key == "items" and reader.peek() == "[":
+            yield from _iter_array(reader)
+        else:
+            reader.value()
+
+
+def iter_ndjson(fh: IO[str]) -> Iterator[Any]:
+    """Un objeto JSON por línea; las líneas corruptas se entregan como ``MalformedLine``."""
+    for number, line in enumerate(fh, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield MalformedLine(line=number, error=f"JSON inválido en la línea {number}: {exc.msg}")
+
+
+def _iter_array(reader: _Reader) -> Iterator[Any]:
+    reader.expect("[")
+    while True:
+        char = reader.peek()
+        if char == "]":
+            reader.pos += 1
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        if char == "":
+            raise ValueError("JSON truncado")
+        yield reader.value()
@@ -1,18 +1,34 @@
 from __future__ import annotations
 
 import csv
+import hashlib
 import json
+import re
+import time
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from celery import shared_task
 import structlog
+from celery import chord, shared_task
+from celery.utils import uuid
+from django.conf import settings
 
+from ..authx.services.redis_service import invalidate_books_cache
+from ..catalog.services import book_cache
 from ..catalog.services.mongo_service import mongo_service
-
+from ..catalog.services.text_search import fold
+from ..catalog.tasks import schedule_books_cache_warm
+from ..reviews.services.book_stats import recompute_books
+from ..reviews.services.mongo_reviews import mongo_reviews
+from .json_stream import MalformedLine, iter_json_items, iter_ndjson
 
 logger = structlog.get_logger(__name__)
 
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+_ISBN_NOISE = re.compile(r"[^0-9X]")
+_SPACES = re.compile(r"\s+")
+
 
 def _load_csv(path: Path) -> Iterable[Dict[str, Any]]:
     with path.open() as fh:
@@ -22,22 +38,182 @@ def _load_csv(path: Path) -> Iterable[Dict[str, Any]]:
 
 
 def _load_json(path: Path) -> Iterable[Dict[str, Any]]:
-    with path.open() as fh:
-        data = json.load(fh)
-    if isinstance(data, list):
-        return data
-    return data.get("items", [])
+    with path.open(encoding="utf-8") as fh:
+        if path.suffix.lower() in NDJSON_SUFFIXES:
+            yield from iter_ndjson(fh)
+        else:
+            yield from iter_json_items(fh, max_item_chars=settings.IMPORT_MAX_ITEM_CHARS)
+
+
+def _batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    numbered = enumerate(rows, start=1)
+    while True:
+        batch = list(islice(numbered, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _normalize_book(row: Any) -> Dict[str, Any]:
+    if isinstance(row, MalformedLine):
+        raise ValueError(row.error)
+    if not isinstance(row, dict):
+        raise ValueError("la fila debe ser un objeto")
+    # CSV cells are always strings: drop empty ones and coerce the numeric fields.
+    book = {key: value for key, value in row.items() if key and value not in ("", None)}
+    if not str(book.get("title", "")).strip():
+        raise ValueError("title requerido")
+    for name, cast in (("year", int), ("rating_count", int), ("avg_rating", float)):
+        if name in book:
+            try:
+                book[name] = cast(book[name])
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"{name} inválido: {book[name]!r}") from exc
+    if isinstance(book.get("genres"), str):
+        book["genres"] = [genre.strip() for genre in book["genres"].split(";") if genre.strip()]
+    book["natural_key"] = _natural_key(book)
+    book["content_hash"] = _content_hash(book)
+    return book
+
+
+def _natural_key(book: Dict[str, Any]) -> str:
+    """ISBN normalizado si lo hay; si no, título y autores plegados ("title:...|autor;autor")."""
+    isbn = _ISBN_NOISE.sub("", str(book.get("isbn") or "").upper())
+    if isbn:
+        return f"isbn:{isbn}"
+    authors = book.get("authors") or []
+    if isinstance(authors, str):
+        authors = authors.split(";")
+    names = sorted(
+        _SPACES.sub(" ", fold(str(author.get("name", "") if isinstance(author, dict) else author))).strip()
+        for author in authors
+    )
+    title = _SPACES.sub(" ", fold(str(book["title"]))).strip()
+    return f"title:{title}|{';'.join(name for name in names if name)}"
+
+
+def _content_hash(book: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {key: value for key, value in book.items() if key not in ("_id", "natural_key", "content_hash")},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _normalize_review(row: Any) -> Dict[str, Any]:
+    if isinstance(row, MalformedLine):
+        raise ValueError(row.error)
+    if not isinstance(row, dict):
+        raise ValueError("la fila debe ser un objeto")
+    review = {key: value for key, value in row.items() if key and value not in ("", None)}
+    review.pop("_id", None)
+    if not str(review.get("book_id", "")).strip():
+        raise ValueError("book_id requerido")
+    review["book_id"] = str(review["book_id"]).strip()
+    try:
+        rating = int(review.get("rating"))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"rating inválido: {review.get('rating')!r}") from exc
+    if not 1 <= rating <= 5:
+        raise ValueError(f"rating debe estar entre 1 y 5: {rating}")
+    review["rating"] = rating
+    review["user_id"] = str(review.get("user_id", "anon"))
+    review["_id"] = _review_id(review)
+    return review
+
+
+def _review_id(review: Dict[str, Any]) -> str:
+    """Id determinista (ObjectId en hex) a partir de libro, usuario, puntuación, fecha y texto.
+
+    Reimportar el mismo fichero vuelve a dar los mismos ids y no duplica reseñas.
+    """
+    canonical = json.dumps(
+        [review[key] for key in ("book_id", "user_id", "rating")]
+        + [review.get("created_at", ""), review.get("text", "")],
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+def _import_rows(
+    rows: Iterable[Dict[str, Any]],
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    refresh_listing: bool = True,
+) -> Dict[str, Any]:
+    """Importa libros por lotes; ``refresh_listing=False`` deja la invalidación del listado al llamador."""
+    started = time.perf_counter()
+    failed = 0
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+    errors: List[Dict[str, Any]] = []
+
+    def record(row_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({"row": row_number, "error": message})
+
+    for batch in _batched(rows, settings.IMPORT_BATCH_SIZE):
+        books, row_numbers = [], []
+        for row_number, row in batch:
+            try:
+                books.append(_normalize_book(row))
+            except ValueError as exc:
+                record(row_number, str(exc))
+                continue
+            row_numbers.append(row_number)
+        if books:
+            result = mongo_service.upsert_books(books)
+            for name in counts:
+                counts[name] += result[name]
+            if result["updated_ids"]:
+                book_cache.expire_books(result["updated_ids"])
+            for error in result["errors"]:
+                record(row_numbers[error["index"]], error["error"])
+        if on_progress is not None:
+            on_progress({"imported": counts["inserted"] + counts["updated"], **counts, "failed": failed})
+
+    if refresh_listing and (counts["inserted"] or counts["updated"]):
+        _refresh_listing()
+    return _import_result(counts, failed, errors, time.perf_counter() - started)
+
+
+def _refresh_listing() -> None:
+    invalidate_books_cache()
+    schedule_books_cache_warm()
+
+
+def _import_result(
+    counts: Dict[str, int], failed: int, errors: List[Dict[str, Any]], elapsed: float
+) -> Dict[str, Any]:
+    inserted, updated, skipped = counts.get("inserted", 0), counts.get("updated", 0), counts.get("skipped", 0)
+    processed = inserted + updated + skipped + failed
+    return {
+        "imported": inserted + updated,
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(processed / elapsed, 1) if elapsed > 0 else float(processed),
+    }
 
 
 @shared_task(bind=True)
 def import_books_from_csv(self, path: str) -> Dict[str, Any]:
     path_obj = Path(path)
-    imported = 0
+    parallel = _fan_out(self, path_obj, "csv")
+    if parallel is not None:
+        return parallel
     try:
-        for row in _load_csv(path_obj):
-            mongo_service.create_book(row)
-            imported += 1
-        return {"imported": imported}
+        result = _import_rows(_load_csv(path_obj))
+        logger.info("import_books_finished", path=str(path_obj), format="csv", **_summary(result))
+        return result
     finally:
         _cleanup_import_file(path_obj)
 
@@ -45,16 +221,223 @@ def import_books_from_csv(self, path: str) -> Dict[str, Any]:
 @shared_task(bind=True)
 def import_books_from_json(self, path: str) -> Dict[str, Any]:
     path_obj = Path(path)
-    imported = 0
+    if path_obj.suffix.lower() in NDJSON_SUFFIXES:
+        parallel = _fan_out(self, path_obj, "ndjson")
+        if parallel is not None:
+            return parallel
+    try:
+        result = _import_rows(_load_json(path_obj))
+        logger.info("import_books_finished", path=str(path_obj), format="json", **_summary(result))
+        return result
+    finally:
+        _cleanup_import_file(path_obj)
+
+
+def _import_review_rows(
+    rows: Iterable[Dict[str, Any]],
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Inserta reseñas por lotes y recalcula al final una sola vez cada libro afectado.
+
+    No pasa por el anti-spam por usuario ni aplica deltas reseña a reseña: las
+    estadísticas y resúmenes se rehacen con ``recompute_books`` en lotes de
+    REVIEW_STATS_BATCH_SIZE libros. Cada reseña lleva un id determinista, así
+    que las ya importadas se cuentan como ``skipped`` y no se duplican.
+    """
+    started = time.perf_counter()
+    failed = 0
+    counts = {"inserted": 0, "skipped": 0}
+    errors: List[Dict[str, Any]] = []
+    touched: Dict[str, None] = {}
+
+    def record(row_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            errors.append({"row": row_number, "error": message})
+
+    for batch in _batched(rows, settings.IMPORT_BATCH_SIZE):
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        for row_number, row in batch:
+            try:
+                valid.append((row_number, _normalize_review(row)))
+            except ValueError as exc:
+                record(row_number, str(exc))
+        known = mongo_service.existing_book_ids(review["book_id"] for _, review in valid)
+        reviews, row_numbers = [], []
+        for row_number, review in valid:
+            if review["book_id"] not in known:
+                record(row_number, f"libro inexistente: {review['book_id']}")
+                continue
+            reviews.append(review)
+            row_numbers.append(row_number)
+        if reviews:
+            result = mongo_reviews.insert_reviews(reviews)
+            counts["inserted"] += result["inserted"]
+            counts["skipped"] += len(result["duplicates"])
+            rejected = {error["index"] for error in result["errors"]} | set(result["duplicates"])
+            for error in result["errors"]:
+                record(row_numbers[error["index"]], error["error"])
+            touched.update(
+                (review["book_id"], None) for index, review in enumerate(reviews) if index not in rejected
+            )
+        if on_progress is not None:
+            on_progress({"imported": counts["inserted"], **counts, "failed": failed, "books": len(touched)})
+
+    book_ids = list(touched)
+    for start in range(0, len(book_ids), settings.REVIEW_STATS_BATCH_SIZE):
+        recompute_books(book_ids[start : start + settings.REVIEW_STATS_BATCH_SIZE])
+    if book_ids:
+        _refresh_listing()
+    result = _import_result(counts, failed, errors, time.perf_counter() - started)
+    result["books"] = len(book_ids)
+    return result
+
+
+@shared_task(bind=True)
+def import_reviews(self, path: str) -> Dict[str, Any]:
+    """Backfill de reseñas históricas desde un CSV o (ND)JSON, leído en streaming."""
+    path_obj = Path(path)
+
+    def report(progress: Dict[str, Any]) -> None:
+        # Called directly (``.run``) there is no task id to attach progress to.
+        if self.request.id and not self.request.is_eager:
+            self.update_state(state="PROGRESS", meta=progress)
+
     try:
-        for row in _load_json(path_obj):
-            mongo_service.create_book(row)
-            imported += 1
-        return {"imported": imported}
+        rows = _load_csv(path_obj) if path_obj.suffix.lower() == ".csv" else _load_json(path_obj)
+        result = _import_review_rows(rows, on_progress=report)
+        logger.info("import_reviews_finished", path=str(path_obj), **_summary(result))
+        return result
     finally:
         _cleanup_import_file(path_obj)
 
 
+@shared_task(bind=True)
+def import_books_chunk(
+    self,
+    path: str,
+    start: int,
+    end: int,
+    fmt: str,
+    fieldnames: Optional[List[str]] = None,
+    chunk: int = 0,
+) -> Dict[str, Any]:
+    """Importa el rango de bytes ``[start, end)`` de un fichero CSV/NDJSON.
+
+    Nunca lanza: un fallo del chunk se devuelve como error para que el chord
+    llegue siempre a ``aggregate_import_results`` y este borre el fichero.
+    """
+    lines = _read_lines(Path(path), start, end)
+    rows = csv.DictReader(lines, fieldnames=fieldnames) if fmt == "csv" else iter_ndjson(lines)
+
+    def report(progress: Dict[str, Any]) -> None:
+        if not self.request.is_eager:
+            self.update_state(state="PROGRESS", meta=progress)
+
+    try:
+        # aggregate_import_results refreshes the listing once for the whole chord.
+        result = _import_rows(rows, on_progress=report, refresh_listing=False)
+    except Exception as exc:
+        logger.exception("import_chunk_failed", path=path, chunk=chunk)
+        return {**_import_result({}, 0, [], 0.0), "chunk_errors": [{"chunk": chunk, "error": str(exc)}]}
+    for error in result["errors"]:
+        error["chunk"] = chunk
+    return result
+
+
+@shared_task
+def aggregate_import_results(results: List[Dict[str, Any]], path: str, started_at: float) -> Dict[str, Any]:
+    try:
+        errors: List[Dict[str, Any]] = []
+        chunk_errors: List[Dict[str, Any]] = []
+        for result in results:
+            errors.extend(result["errors"])
+            chunk_errors.extend(result.get("chunk_errors", []))
+        aggregated = _import_result(
+            {name: sum(result[name] for result in results) for name in ("inserted", "updated", "skipped")},
+            sum(result["failed"] for result in results),
+            errors[: settings.IMPORT_MAX_REPORTED_ERRORS],
+            time.time() - started_at,
+        )
+        aggregated["chunks"] = len(results)
+        if aggregated["imported"]:
+            _refresh_listing()
+        if chunk_errors:
+            aggregated["chunk_errors"] = chunk_errors
+        logger.info("import_books_finished", path=path, format="parallel", **_summary(aggregated))
+        return aggregated
+    finally:
+        _cleanup_import_file(Path(path))
+
+
+def _fan_out(task, path_obj: Path, fmt: str) -> Optional[Dict[str, Any]]:
+    """Reparte ficheros grandes en rangos de líneas procesados por un chord de Celery.
+
+    Los cortes caen siempre en un salto de línea, así que un CSV con campos
+    entrecomillados que contengan saltos de línea debe importarse por debajo
+    de IMPORT_PARALLEL_MIN_BYTES.
+    """
+    if path_obj.stat().st_size < settings.IMPORT_PARALLEL_MIN_BYTES:
+        return None
+    fieldnames = None
+    data_start = 0
+    if fmt == "csv":
+        with path_obj.open("rb") as fh:
+            header = fh.readline()
+            data_start = fh.tell()
+        fieldnames = next(csv.reader([header.decode("utf-8-sig")]), [])
+    ranges = _plan_chunks(path_obj, data_start, settings.IMPORT_CHUNK_BYTES)
+    if len(ranges) < 2:
+        return None
+    chunk_ids = [uuid() for _ in ranges]
+    header_tasks = [
+        import_books_chunk.s(str(path_obj), start, end, fmt, fieldnames, index).set(task_id=chunk_ids[index])
+        for index, (start, end) in enumerate(ranges)
+    ]
+    workflow = chord(header_tasks, aggregate_import_results.s(str(path_obj), time.time()))
+    if task.app.conf.task_always_eager:
+        return workflow.apply().get()
+    aggregate = workflow.apply_async()
+    logger.info("import_books_fan_out", path=str(path_obj), format=fmt, chunks=len(ranges))
+    return {
+        "mode": "parallel",
+        "chunks": len(ranges),
+        "aggregate_task_id": aggregate.id,
+        "chunk_task_ids": chunk_ids,
+    }
+
+
+def _plan_chunks(path_obj: Path, data_start: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+    size = path_obj.stat().st_size
+    bounds = [data_start]
+    with path_obj.open("rb") as fh:
+        position = data_start
+        while position + chunk_bytes < size:
+            fh.seek(position + chunk_bytes)
+            fh.readline()
+            position = fh.tell()
+            if position >= size:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _read_lines(path_obj: Path, start: int, end: int) -> Iterator[str]:
+    with path_obj.open("rb") as fh:
+        fh.seek(start)
+        while fh.tell() < end:
+            line = fh.readline()
+            if not line:
+                return
+            yield line.decode("utf-8")
+
+
+def _summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in result.items() if key not in ("errors", "chunk_errors")}
+
+
 def _cleanup_import_file(path_obj: Path) -> None:
     try:
         path_obj.unlink()
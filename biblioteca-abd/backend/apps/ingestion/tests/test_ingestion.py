@@ -27,14 +27,15 @@ def test_csv_import_task_removes_temp_file(tmp_path, monkeypatch):
 
     created = []
 
-    def fake_create_book(data):
-        created.append(data)
+    def fake_upsert_books(books):
+        created.extend(books)
+        return {"inserted": len(books), "updated": 0, "skipped": 0, "errors": [], "updated_ids": []}
 
-    monkeypatch.setattr(mongo_service, "create_book", fake_create_book)
+    monkeypatch.setattr(mongo_service, "upsert_books", fake_upsert_books)
 
     result = import_books_from_csv.run(str(tmp_file))
 
-    assert result == {"imported": 1}
+    assert result["imported"] == 1
     assert created[0]["title"] == "Temporal Book"
     assert not tmp_file.exists()
 
@@ -43,12 +44,183 @@ def test_json_import_task_removes_temp_file_on_error(tmp_path, monkeypatch):
     tmp_file = tmp_path / "books.json"
     tmp_file.write_text(json.dumps([{"title": "Temporal Book"}]))
 
-    def fail_create_book(_data):
+    def fail_upsert_books(_books):
         raise RuntimeError("boom")
 
-    monkeypatch.setattr(mongo_service, "create_book", fail_create_book)
+    monkeypatch.setattr(mongo_service, "upsert_books", fail_upsert_books)
 
     with pytest.raises(RuntimeError):
         import_books_from_json.run(str(tmp_file))
 
     assert not tmp_file.exists()
+
+
+def test_csv_import_writes_in_batches_and_reports_bad_rows(tmp_path, settings, monkeypatch):
+    settings.IMPORT_BATCH_SIZE = 2
+    tmp_file = tmp_path / "books.csv"
+    tmp_file.write_text("title,year,genres\nUno,2001,Fantasía;Novela\n,2002,\nTres,abc,\nCuatro,,\nCinco,2005,\n")
+
+    batches = []
+    original = mongo_service.upsert_books
+
+    def spy_upsert_books(books):
+        batches.append(len(books))
+        return original(books)
+
+    monkeypatch.setattr(mongo_service, "upsert_books", spy_upsert_books)
+
+    result = import_books_from_csv.run(str(tmp_file))
+
+    assert result["imported"] == 3
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 3]
+    assert result["rows_per_second"] > 0
+    assert batches == [1, 1, 1]
+    books = mongo_service.list_books({}, "rating", "desc", 0, 10)
+    assert {book["title"] for book in books} == {"Uno", "Cuatro", "Cinco"}
+    assert mongo_service.get_book("mem-1")["genres"] == ["Fantasía", "Novela"]
+
+
+def test_ndjson_import_keeps_going_after_a_bad_line(tmp_path):
+    tmp_file = tmp_path / "books.ndjson"
+    tmp_file.write_text('{"title": "Uno"}\n{"title": \n{"title": "Dos"}\n')
+
+    result = import_books_from_json.run(str(tmp_file))
+
+    assert result["imported"] == 2
+    assert result["errors"][0]["row"] == 2
+    assert not tmp_file.exists()
+
+
+def test_reimport_skips_unchanged_rows_and_updates_changed_ones(tmp_path, monkeypatch):
+    from apps.ingestion import tasks as ingestion_tasks
+
+    invalidations, expired = [], []
+    monkeypatch.setattr(ingestion_tasks, "invalidate_books_cache", lambda: invalidations.append(1))
+    monkeypatch.setattr(ingestion_tasks.book_cache, "expire_books", lambda ids: expired.extend(ids))
+    first = tmp_path / "first.ndjson"
+    first.write_text(
+        '{"title": "Rayuela", "authors": [{"name": "Julio Cortázar"}], "year": 1963}\n'
+        '{"title": "Ficciones", "isbn": "978-84-206-3387-5", "year": 1944}\n'
+    )
+    assert import_books_from_json.run(str(first))["inserted"] == 2
+
+    second = tmp_path / "second.ndjson"
+    second.write_text(
+        '{"title": "  RAYUELA ", "authors": [{"name": "julio cortazar"}], "year": 1963}\n'
+        '{"title": "Ficciones", "isbn": "9788420633875", "year": 1944}\n'
+        '{"title": "Ficciones", "isbn": "9788420633875", "year": 1956}\n'
+        '{"title": "Pedro Páramo", "year": 1955}\n'
+    )
+    result = import_books_from_json.run(str(second))
+
+    # The folded title/author key matches, but the raw title changed so the row is rewritten.
+    assert result == {**result, "inserted": 1, "updated": 2, "skipped": 1, "imported": 3, "failed": 0}
+    assert len(mongo_service._memory_books) == 3
+    ficciones = mongo_service._memory_books.get_by_natural_key("isbn:9788420633875")
+    assert ficciones["year"] == 1956
+    # Rewritten books drop their cached detail; new ones had none.
+    rayuela = mongo_service._memory_books.get_by_natural_key("title:rayuela|julio cortazar")
+    assert sorted(expired) == sorted([rayuela["_id"], ficciones["_id"]])
+
+    third = tmp_path / "third.ndjson"
+    third.write_text('{"title": "Pedro Páramo", "year": 1955}\n')
+    assert import_books_from_json.run(str(third))["skipped"] == 1
+    # Only the imports that wrote something invalidate the list cache.
+    assert len(invalidations) == 2
+
+
+def test_reimport_keeps_review_driven_ratings(tmp_path, monkeypatch):
+    from apps.ingestion import tasks as ingestion_tasks
+
+    monkeypatch.setattr(ingestion_tasks, "invalidate_books_cache", lambda: None)
+    monkeypatch.setattr(ingestion_tasks.book_cache, "expire_books", lambda ids: None)
+    first = tmp_path / "first.ndjson"
+    first.write_text('{"title": "Rayuela", "year": 1963, "avg_rating": 4.0, "rating_count": 10}\n')
+    import_books_from_json.run(str(first))
+    book = mongo_service._memory_books.get_by_natural_key("title:rayuela|")
+    mongo_service.apply_rating_delta(book["_id"], 5, 1)
+
+    second = tmp_path / "second.ndjson"
+    second.write_text('{"title": "Rayuela", "year": 1964, "avg_rating": 8.0, "rating_count": 1}\n')
+    assert import_books_from_json.run(str(second))["updated"] == 1
+
+    book = mongo_service.get_book(book["_id"])
+    assert book["year"] == 1964
+    assert (book["rating_sum"], book["rating_count"], book["avg_rating"]) == (45.0, 11, 4.09)
+
+
+@pytest.fixture
+def eager_celery():
+    from config.celery import app as celery_app
+
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True)
+    yield
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=previous)
+
+
+def test_large_csv_is_split_into_chunks_and_aggregated(tmp_path, settings, eager_celery, monkeypatch):
+    from apps.ingestion import tasks as ingestion_tasks
+
+    refreshes = []
+    monkeypatch.setattr(ingestion_tasks, "invalidate_books_cache", lambda: refreshes.append("invalidate"))
+    monkeypatch.setattr(ingestion_tasks, "schedule_books_cache_warm", lambda: refreshes.append("warm"))
+    settings.IMPORT_PARALLEL_MIN_BYTES = 1
+    settings.IMPORT_CHUNK_BYTES = 40
+    tmp_file = tmp_path / "books.csv"
+    lines = ["title,year"] + [f"Libro número {index},{2000 + index}" for index in range(12)] + [",1999"]
+    tmp_file.write_text("\n".join(lines) + "\n")
+
+    result = import_books_from_csv.run(str(tmp_file))
+
+    assert result["chunks"] > 1
+    assert result["imported"] == 12
+    assert result["failed"] == 1
+    assert result["errors"][0]["error"] == "title requerido"
+    titles = {book["title"] for book in mongo_service.list_books({}, "rating", "desc", 0, 50)}
+    assert titles == {f"Libro número {index}" for index in range(12)}
+    # One listing refresh for the whole chord, not one per chunk.
+    assert refreshes == ["invalidate", "warm"]
+    assert not tmp_file.exists()
+
+
+def test_status_view_combines_parallel_chunk_progress(monkeypatch):
+    from apps.ingestion import views as ingestion_views
+
+    class FakeResult:
+        def __init__(self, state, info=None):
+            self.state = state
+            self.info = info
+            self.result = info
+
+        def successful(self):
+            return self.state == "SUCCESS"
+
+        def failed(self):
+            return self.state == "FAILURE"
+
+    results = {
+        "root": FakeResult(
+            "SUCCESS",
+            {"mode": "parallel", "chunks": 2, "aggregate_task_id": "agg", "chunk_task_ids": ["c1", "c2"]},
+        ),
+        "agg": FakeResult("PENDING"),
+        "c1": FakeResult("SUCCESS", {"imported": 10, "failed": 1, "errors": [{"row": 3, "chunk": 0}]}),
+        "c2": FakeResult("PROGRESS", {"imported": 4, "failed": 0}),
+    }
+    monkeypatch.setattr(ingestion_views.celery_app, "AsyncResult", lambda task_id: results[task_id])
+
+    response = APIClient().get(reverse("import-status", args=["root"]))
+
+    assert response.data["state"] == "PROGRESS"
+    assert response.data["progress"] == {
+        "chunks": 2,
+        "completed": 1,
+        "imported": 14,
+        "inserted": 0,
+        "updated": 0,
+        "skipped": 0,
+        "failed": 1,
+        "errors": [{"row": 3, "chunk": 0}],
+    }
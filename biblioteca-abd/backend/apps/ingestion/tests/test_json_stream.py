@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from apps.ingestion.json_stream import MalformedLine, iter_json_items, iter_ndjson
+
+
+def test_streams_top_level_list_across_small_chunks():
+    items = [{"title": f"Libro {index}", "year": 1900 + index} for index in range(20)]
+    fh = io.StringIO(json.dumps(items, indent=2))
+    assert list(iter_json_items(fh, chunk_size=7)) == items
+
+
+def test_streams_items_envelope_and_skips_other_keys():
+    payload = '{"total": 123456789, "meta": {"source": "feed"}, "items": [{"title": "A"}, {"title": "B"}], "x": 1}'
+    for chunk_size in (1, 3, 5, 64):
+        assert list(iter_json_items(io.StringIO(payload), chunk_size=chunk_size)) == [
+            {"title": "A"},
+            {"title": "B"},
+        ]
+    assert list(iter_json_items(io.StringIO('{"other": []}'))) == []
+
+
+def test_first_item_is_yielded_before_the_rest_is_read():
+    class ExplodingFile(io.StringIO):
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise AssertionError("read past the first item")
+            return super().read(size)
+
+    fh = ExplodingFile('[{"title": "A"}, {"title": "B"}]')
+    assert next(iter_json_items(fh, chunk_size=20)) == {"title": "A"}
+
+
+def test_truncated_json_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_items(io.StringIO('[{"title": "A"}, {"tit')))
+
+
+def test_ndjson_reports_malformed_lines_without_stopping():
+    fh = io.StringIO('{"title": "A"}\n\nnot json\n{"title": "B"}\n')
+    rows = list(iter_ndjson(fh))
+    assert rows[0] == {"title": "A"}
+    assert isinstance(rows[1], MalformedLine) and rows[1].line == 3
+    assert rows[2] == {"title": "B"}
+
+
+def test_malformed_item_fails_without_buffering_the_rest_of_the_file():
+    class CountingFile(io.StringIO):
+        consumed = 0
+
+        def read(self, size=-1):
+            chunk = super().read(size)
+            self.consumed += len(chunk)
+            return chunk
+
+    tail = ", ".join(json.dumps({"title": f"Libro {index}", "synopsis": "x" * 200}) for index in range(5000))
+    fh = CountingFile('[{"title": "A"}, {"title": oops}, ' + tail + "]")
+    items = iter_json_items(fh, chunk_size=1024, max_item_chars=4096)
+
+    assert next(items) == {"title": "A"}
+    with pytest.raises(ValueError, match="4096"):
+        next(items)
+    assert fh.consumed < 8 * 1024 < len(fh.getvalue())
@@ -0,0 +1,165 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.catalog.services import book_cache
+from apps.catalog.services.mongo_service import mongo_service
+from apps.ingestion import tasks as ingestion_tasks
+from apps.ingestion import views as ingestion_views
+from apps.reviews.services import book_stats
+from apps.reviews.services.mongo_reviews import mongo_reviews
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    mongo_service._memory_books.clear()
+    mongo_reviews._memory_reviews.clear()
+    mongo_reviews._memory_summaries.clear()
+    monkeypatch.setattr(book_cache, "expire_book", lambda book_id: None)
+    monkeypatch.setattr(book_stats, "invalidate_cache_tags", lambda tags, keys=(): len(tags))
+    monkeypatch.setattr(ingestion_tasks, "invalidate_books_cache", lambda: None)
+    monkeypatch.setattr(ingestion_tasks, "schedule_books_cache_warm", lambda: None)
+    first = mongo_service.create_book({"title": "Uno", "avg_rating": 4.0, "rating_count": 10})
+    second = mongo_service.create_book({"title": "Dos"})
+    yield first["_id"], second["_id"]
+    mongo_service._memory_books.clear()
+    mongo_reviews._memory_reviews.clear()
+    mongo_reviews._memory_summaries.clear()
+
+
+@pytest.mark.django_db
+def test_review_import_is_staff_only(monkeypatch):
+    queued = []
+    monkeypatch.setattr(ingestion_views.import_reviews, "delay", lambda path: queued.append(path) or _Task())
+    upload = {"file": _upload("reviews.csv", "book_id,rating\n1,5\n")}
+    client = APIClient()
+
+    assert client.post(reverse("import-reviews"), upload).status_code in (401, 403)
+    client.force_authenticate(User.objects.create_user("lector", password="secret"))
+    assert client.post(reverse("import-reviews"), {"file": _upload("reviews.csv", "")}).status_code == 403
+
+    client.force_authenticate(User.objects.create_user("admin", password="secret", is_staff=True))
+    response = client.post(
+        reverse("import-reviews"), {"file": _upload("reviews.csv", "book_id,rating\n1,5\n")}
+    )
+    assert response.status_code == 202 and response.data["task_id"] == "task-1"
+    assert queued[0].endswith(".csv")
+
+
+def test_csv_review_import_validates_in_batches_and_recomputes_each_book_once(
+    catalog, tmp_path, settings, monkeypatch
+):
+    settings.IMPORT_BATCH_SIZE = 2
+    first, second = catalog
+    tmp_file = tmp_path / "reviews.csv"
+    tmp_file.write_text(
+        "book_id,user_id,rating,text\n"
+        f"{first},u1,5,Genial\n"
+        f"{first},u1,9,Fuera de rango\n"
+        f"{second},u1,3,\n"
+        "desconocido,u2,4,\n"
+        f"{first},u1,1,Flojo\n"
+        ",u3,2,\n"
+    )
+    lookups, recomputed = [], []
+    existing = mongo_service.existing_book_ids
+    monkeypatch.setattr(
+        mongo_service, "existing_book_ids", lambda ids: lookups.append(1) or existing(list(ids))
+    )
+    recompute = ingestion_tasks.recompute_books
+    monkeypatch.setattr(
+        ingestion_tasks, "recompute_books", lambda ids: recomputed.append(sorted(ids)) or recompute(ids)
+    )
+
+    result = ingestion_tasks.import_reviews.run(str(tmp_file))
+
+    assert result["inserted"] == 3 and result["failed"] == 3 and result["books"] == 2
+    assert [error["row"] for error in result["errors"]] == [2, 4, 6]
+    assert len(lookups) == 3
+    assert recomputed == [sorted([first, second])]
+    book = mongo_service.get_book(first)
+    assert (book["rating_count"], book["rating_sum"]) == (12, 46.0)
+    assert mongo_reviews.get_summary(first)["histogram"] == {"1": 1, "2": 0, "3": 0, "4": 0, "5": 1}
+    assert mongo_reviews.get_summary(second)["count"] == 1
+    assert not tmp_file.exists()
+
+
+def test_ndjson_review_import_keeps_going_after_a_bad_line(catalog, tmp_path):
+    first, _ = catalog
+    tmp_file = tmp_path / "reviews.ndjson"
+    tmp_file.write_text(
+        json.dumps({"book_id": first, "rating": 4})
+        + "\n{roto\n"
+        + json.dumps({"book_id": first, "rating": "2"})
+        + "\n"
+    )
+
+    result = ingestion_tasks.import_reviews.run(str(tmp_file))
+
+    assert result["inserted"] == 2 and result["failed"] == 1
+    assert mongo_reviews.get_summary(first)["mean"] == 3.0
+    assert all(review["deleted_at"] is None for review in mongo_reviews._memory_reviews)
+    assert not tmp_file.exists()
+
+
+def test_review_import_can_be_rerun_without_duplicating_reviews(catalog, tmp_path, monkeypatch):
+    first, second = catalog
+    content = f"book_id,user_id,rating,text,created_at\n{first},u1,5,Genial,2020-01-01\n{second},u2,3,,\n"
+    recomputed = []
+    recompute = ingestion_tasks.recompute_books
+    monkeypatch.setattr(
+        ingestion_tasks, "recompute_books", lambda ids: recomputed.append(ids) or recompute(ids)
+    )
+    (tmp_path / "first.csv").write_text(content)
+    (tmp_path / "again.csv").write_text(content)
+
+    assert ingestion_tasks.import_reviews.run(str(tmp_path / "first.csv"))["inserted"] == 2
+    result = ingestion_tasks.import_reviews.run(str(tmp_path / "again.csv"))
+
+    assert (result["inserted"], result["skipped"], result["failed"]) == (0, 2, 0)
+    assert len(mongo_reviews._memory_reviews) == 2 and len(recomputed) == 1
+    assert mongo_service.get_book(first)["rating_count"] == 11
+
+
+class _Task:
+    id = "task-1"
+
+
+def _upload(name, content):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    return SimpleUploadedFile(name, content.encode("utf-8"), content_type="text/plain")
+
+
+def test_status_view_exposes_review_import_progress(catalog, tmp_path, settings, monkeypatch):
+    settings.IMPORT_BATCH_SIZE = 1
+    first, _ = catalog
+    tmp_file = tmp_path / "reviews.csv"
+    tmp_file.write_text(f"book_id,rating\n{first},5\n{first},0\n")
+    states = {}
+
+    class FakeResult:
+        def __init__(self, task_id):
+            self.state, self.info = states.get(task_id, ("PENDING", None))
+
+        def successful(self):
+            return self.state == "SUCCESS"
+
+    task = ingestion_tasks.import_reviews
+    monkeypatch.setattr(task, "update_state", lambda state, meta: states.__setitem__("task-1", (state, meta)))
+    monkeypatch.setattr(ingestion_views.celery_app, "AsyncResult", FakeResult)
+    task.push_request(id="task-1", is_eager=False)
+    try:
+        task.run(str(tmp_file))
+    finally:
+        task.pop_request()
+
+    response = APIClient().get(reverse("import-status", args=["task-1"]))
+
+    assert response.data == {
+        "state": "PROGRESS",
+        "progress": {"imported": 1, "inserted": 1, "skipped": 0, "failed": 1, "books": 1},
+    }
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import ImportBooksView, ImportStatusView
+from .views import ImportBooksView, ImportReviewsView, ImportStatusView
 
 urlpatterns = [
     path("import/books", ImportBooksView.as_view(), name="import-books"),
+    path("import/reviews", ImportReviewsView.as_view(), name="import-reviews"),
     path("import/status/<str:task_id>", ImportStatusView.as_view(), name="import-status"),
 ]
@@ -1,12 +1,20 @@
 import tempfile
 from pathlib import Path
 
-from config.celery import app as celery_app
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .tasks import import_books_from_csv, import_books_from_json
+from config.celery import app as celery_app
+
+from .tasks import import_books_from_csv, import_books_from_json, import_reviews
+
+
+def _store_upload(upload) -> Path:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(upload.name).suffix.lower()) as tmp:
+        for chunk in upload.chunks():
+            tmp.write(chunk)
+        return Path(tmp.name)
 
 
 class ImportBooksView(APIView):
@@ -16,23 +24,54 @@ class ImportBooksView(APIView):
         upload = request.FILES.get("file")
         if not upload:
             return Response({"detail": "archivo requerido"}, status=status.HTTP_400_BAD_REQUEST)
-        suffix = Path(upload.name).suffix.lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            for chunk in upload.chunks():
-                tmp.write(chunk)
-            tmp_path = Path(tmp.name)
-        if suffix == ".csv":
+        tmp_path = _store_upload(upload)
+        if tmp_path.suffix == ".csv":
             task = import_books_from_csv.delay(str(tmp_path))
         else:
             task = import_books_from_json.delay(str(tmp_path))
         return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
 
 
+class ImportReviewsView(APIView):
+    """Backfill de reseñas: sin límite anti-spam por usuario, así que solo para staff."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"detail": "archivo requerido"}, status=status.HTTP_400_BAD_REQUEST)
+        task = import_reviews.delay(str(_store_upload(upload)))
+        return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
+
 class ImportStatusView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request, task_id: str):
         result = celery_app.AsyncResult(task_id)
         if result.successful():
-            return Response({"state": result.state, "result": result.result})
+            payload = result.result
+            if isinstance(payload, dict) and payload.get("mode") == "parallel":
+                return Response(self._parallel_status(payload))
+            return Response({"state": result.state, "result": payload})
+        if result.state == "PROGRESS" and isinstance(result.info, dict):
+            return Response({"state": result.state, "progress": result.info})
         return Response({"state": result.state})
+
+    def _parallel_status(self, payload):
+        aggregate = celery_app.AsyncResult(payload["aggregate_task_id"])
+        if aggregate.successful():
+            return {"state": aggregate.state, "result": aggregate.result}
+        counters = ("imported", "inserted", "updated", "skipped", "failed")
+        progress = {"chunks": payload["chunks"], "completed": 0, **dict.fromkeys(counters, 0), "errors": []}
+        for chunk_id in payload["chunk_task_ids"]:
+            chunk = celery_app.AsyncResult(chunk_id)
+            info = chunk.info if isinstance(chunk.info, dict) else {}
+            if chunk.successful():
+                progress["completed"] += 1
+                progress["errors"].extend(info.get("errors", []))
+            for name in counters:
+                progress[name] += info.get(name, 0)
+        state = aggregate.state if aggregate.failed() else "PROGRESS"
+        return {"state": state, "progress": progress}
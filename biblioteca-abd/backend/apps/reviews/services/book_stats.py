@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ...authx.services.redis_service import (
+    cache_key_for_book,
+    cache_key_for_book_tag,
+    cache_key_for_review_summary,
+    invalidate_cache_tags,
+    mark_books_dirty,
+)
+from ...catalog.services.mongo_service import mongo_service
+from ...catalog.tasks import schedule_books_cache_warm
+from . import summaries
+from .mongo_reviews import mongo_reviews
+
+
+def _contribution(review: Optional[Dict[str, Any]]) -> Optional[Tuple[str, str]]:
+    if not review or review.get("deleted_at") or review.get("rating") is None or not review.get("book_id"):
+        return None
+    return str(review["book_id"]), str(int(review["rating"]))
+
+
+def review_changed(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> bool:
+    """Aplica a las estadísticas del libro la diferencia entre dos versiones de una reseña.
+
+    ``before`` None es un alta y ``after`` None un borrado. Cuesta una escritura
+    en el libro y otra en su resumen por libro afectado, sin importar cuántas
+    reseñas tenga. Las caches del libro no se tocan aquí: el libro queda
+    marcado y ``drain_book_stats`` las invalida una vez por ventana, aunque
+    lleguen miles de reseñas. Devuelve True si hay que programar ese vaciado.
+    """
+    histograms: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    old, new = _contribution(before), _contribution(after)
+    if old is not None:
+        histograms[old[0]][old[1]] -= 1
+    if new is not None:
+        histograms[new[0]][new[1]] += 1
+    latest = after.get("created_at") if before is None and new is not None else None
+    changed = []
+    for book_id, histogram in histograms.items():
+        histogram = {rating: delta for rating, delta in histogram.items() if delta}
+        if not histogram:
+            continue
+        count = sum(histogram.values())
+        rating_sum = float(sum(int(rating) * delta for rating, delta in histogram.items()))
+        mongo_service.apply_rating_delta(book_id, rating_sum, count)
+        mongo_reviews.apply_summary_delta(book_id, histogram, latest)
+        changed.append(book_id)
+    if not changed:
+        return False
+    if mark_books_dirty(changed):
+        return True
+    # Redis did not take the mark: invalidate right away instead.
+    expire_books(changed)
+    return False
+
+
+def recompute_books(book_ids: List[str]) -> int:
+    """Recalcula estadísticas y resúmenes de un lote con una sola agregación e invalida sus caches."""
+    found = mongo_reviews.review_summaries(book_ids)
+    fresh = {book_id: found.get(book_id) or summaries.empty(book_id) for book_id in book_ids}
+    mongo_service.set_rating_totals(
+        {book_id: (float(summary["sum"]), int(summary["count"])) for book_id, summary in fresh.items()}
+    )
+    mongo_reviews.set_summaries(fresh)
+    return expire_books(book_ids)
+
+
+def expire_books(book_ids: Iterable[str]) -> int:
+    """Invalida detalle, resumen de reseñas y solo las páginas del listado que contienen estos libros.
+
+    Las páginas populares invalidadas se recalientan en segundo plano.
+    """
+    book_ids = [str(book_id) for book_id in book_ids]
+    invalidated = invalidate_cache_tags(
+        [cache_key_for_book_tag(book_id) for book_id in book_ids],
+        keys=[cache_key_for_book(book_id) for book_id in book_ids]
+        + [cache_key_for_review_summary(book_id) for book_id in book_ids],
+    )
+    if book_ids:
+        schedule_books_cache_warm()
+    return invalidated
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ...catalog.services.memory_store import sort_value
+
+
+def position_value(field: str, value: Any) -> Any:
+    """Valor con el que ``page`` ordena y compara; los cursores deben guardar este mismo."""
+    return sort_value(value) if field == "rating" else str(value or "")
+
+
+class MemoryReviewStore:
+    """Reseñas en memoria para el modo degradado, indexadas por id y por libro.
+
+    Listar o agregar las reseñas de un libro solo recorre las de ese libro.
+    """
+
+    def __init__(self) -> None:
+        self._reviews: Dict[str, Dict[str, Any]] = {}
+        self._by_book: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+
+    def __len__(self) -> int:
+        return len(self._reviews)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(list(self._reviews.values()))
+
+    def clear(self) -> None:
+        self._reviews.clear()
+        self._by_book.clear()
+
+    def add(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        review_id = str(review["_id"])
+        self._unindex(review_id)
+        self._reviews[review_id] = review
+        self._by_book[str(review.get("book_id"))][review_id] = review
+        return review
+
+    def get(self, review_id: Any) -> Optional[Dict[str, Any]]:
+        return self._reviews.get(str(review_id))
+
+    def update(self, review_id: Any, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        review = self._reviews.get(str(review_id))
+        if review is None:
+            return None
+        self._unindex(str(review_id))
+        review.update(updates)
+        return self.add(review)
+
+    def for_book(self, book_id: Any) -> List[Dict[str, Any]]:
+        """Reseñas activas de un libro."""
+        return [
+            review for review in self._by_book.get(str(book_id), {}).values() if not review.get("deleted_at")
+        ]
+
+    def page(
+        self,
+        book_id: Any,
+        field: str,
+        descending: bool,
+        limit: int,
+        after: Optional[Tuple[Any, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Página ordenada por ``(field, _id)``, siguiente a ``after`` si se indica."""
+
+        def position(review: Dict[str, Any]) -> Tuple[Any, str]:
+            return position_value(field, review.get(field)), str(review["_id"])
+
+        ordered = sorted(self.for_book(book_id), key=position, reverse=descending)
+        if after is not None:
+            if descending:
+                ordered = [review for review in ordered if position(review) < after]
+            else:
+                ordered = [review for review in ordered if position(review) > after]
+        return ordered[:limit]
+
+    def _unindex(self, review_id: str) -> None:
+        previous = self._reviews.pop(review_id, None)
+        if previous is not None:
+            self._by_book.get(str(previous.get("book_id")), {}).pop(review_id, None)
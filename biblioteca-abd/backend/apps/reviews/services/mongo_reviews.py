@@ -2,89 +2,295 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import structlog
 from bson import ObjectId
 from bson.errors import InvalidId
 from django.conf import settings
-from pymongo import MongoClient, ReturnDocument
-from pymongo.errors import PyMongoError
+from pymongo import ASCENDING, DESCENDING, MongoClient, ReplaceOne, ReturnDocument
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from ...catalog.services.cursors import decode_cursor, encode_cursor, keyset_filter
+from ...catalog.services.mongo_client import get_client, get_database
+from . import summaries
+from .memory_store import MemoryReviewStore, position_value
+
+logger = structlog.get_logger(__name__)
+
+# Reviews written before soft deletes have no ``deleted_at`` at all: ``None``
+# matches both null and a missing field, like the memory store does.
+ACTIVE: Dict[str, Any] = {"deleted_at": None}
+DUPLICATE_KEY = 11000
+REVIEW_SORTS: Dict[str, Tuple[str, int]] = {
+    "newest": ("created_at", DESCENDING),
+    "highest": ("rating", DESCENDING),
+    "lowest": ("rating", ASCENDING),
+}
 
 
 @dataclass
 class MongoReviewService:
     url: str = settings.MONGO_URL
     db_name: str = settings.MONGO_DB
-    _memory_reviews: List[Dict[str, Any]] = field(default_factory=list)
+    _memory_reviews: MemoryReviewStore = field(default_factory=MemoryReviewStore)
+    _memory_summaries: Dict[str, Dict[str, Any]] = field(default_factory=dict)
 
     @property
     def client(self) -> Optional[MongoClient]:
-        try:
-            return MongoClient(self.url, serverSelectionTimeoutMS=500)
-        except PyMongoError:
-            return None
+        return get_client(self.url)
 
     def db(self):
-        client = self.client
-        if client is None:
-            return None
-        try:
-            client.admin.command("ping")
-            return client[self.db_name]
-        except PyMongoError:
-            return None
+        return get_database(self.db_name, url=self.url)
+
+    def ensure_indexes(self) -> None:
+        """Índices de ``reviews`` para listar las reseñas activas de un libro ya ordenadas."""
+        database = self.db()
+        if database is None:
+            return
+        # ``deleted_at`` is an equality key rather than a partial filter: a partial
+        # index on ``$type: null`` could not serve ``ACTIVE``, which also matches
+        # reviews without the field.
+        active = [("book_id", ASCENDING), ("deleted_at", ASCENDING)]
+        specs = [
+            (active + [("created_at", DESCENDING), ("_id", DESCENDING)], "reviews_book_active_newest"),
+            (active + [("rating", DESCENDING), ("_id", DESCENDING)], "reviews_book_active_rating"),
+        ]
+        for keys, name in specs:
+            try:
+                database.reviews.create_index(keys, name=name)
+            except PyMongoError as exc:
+                logger.warning("mongo_index_failed", collection="reviews", keys=str(keys), error=str(exc))
 
     def create_review(self, data: Dict[str, Any]) -> Dict[str, Any]:
         data.setdefault("created_at", datetime.utcnow().isoformat())
+        data["deleted_at"] = None
         database = self.db()
         if database is None:
             data.setdefault("_id", f"rev-{len(self._memory_reviews) + 1}")
-            self._memory_reviews.append(data)
-            return data
+            return self._memory_reviews.add(data)
         inserted = database.reviews.insert_one(data)
         document = dict(data)
         document["_id"] = str(inserted.inserted_id)
         return document
 
-    def list_reviews_for_book(self, book_id: str) -> List[Dict[str, Any]]:
+    def insert_reviews(self, reviews: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Alta en bloque con un ``insert_many`` no ordenado: un documento rechazado no frena al resto.
+
+        Devuelve ``inserted``, ``duplicates`` (reseñas cuyo ``_id`` ya existía) y
+        ``errors``, ambos con índices relativos al lote recibido.
+        """
+        summary: Dict[str, Any] = {"inserted": 0, "duplicates": [], "errors": []}
+        if not reviews:
+            return summary
+        now = datetime.utcnow().isoformat()
+        for review in reviews:
+            review.setdefault("created_at", now)
+            review["deleted_at"] = None
         database = self.db()
         if database is None:
-            return [
-                review
-                for review in self._memory_reviews
-                if review.get("book_id") == book_id and not review.get("deleted_at")
-            ]
-        cursor = database.reviews.find({"book_id": book_id, "deleted_at": {"$exists": False}})
-        return self._serialize_many(cursor)
-
-    def update_review(self, review_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            for index, review in enumerate(reviews):
+                review.setdefault("_id", f"rev-{len(self._memory_reviews) + 1}")
+                if self._memory_reviews.get(review["_id"]) is not None:
+                    summary["duplicates"].append(index)
+                    continue
+                self._memory_reviews.add(review)
+                summary["inserted"] += 1
+            return summary
+        # Imported reviews carry a deterministic hex id: store it as a real ObjectId.
+        documents = [
+            {**review, "_id": self._object_id(review["_id"])} if "_id" in review else review
+            for review in reviews
+        ]
+        try:
+            result = database.reviews.insert_many(documents, ordered=False)
+            summary["inserted"] = len(result.inserted_ids)
+        except BulkWriteError as exc:
+            details = exc.details or {}
+            summary["inserted"] = details.get("nInserted", 0)
+            for error in details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY:
+                    summary["duplicates"].append(error["index"])
+                else:
+                    summary["errors"].append({"index": error["index"], "error": error.get("errmsg", "")})
+        return summary
+
+    def list_reviews_for_book(
+        self, book_id: str, sort: str = "newest", limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Página de reseñas activas de un libro por cursor, en el orden de ``REVIEW_SORTS``.
+
+        Lanza ``InvalidCursor`` si el cursor no corresponde a este orden.
+        """
+        sort_key, direction = REVIEW_SORTS[sort]
+        descending = direction == DESCENDING
+        after = decode_cursor(cursor, s=sort) if cursor else None
         database = self.db()
         if database is None:
-            for review in self._memory_reviews:
-                if str(review.get("_id")) == str(review_id):
-                    review.update(updates)
-                    return review
-            return None
+            position = (after["k"], after["id"]) if after else None
+            reviews = self._memory_reviews.page(book_id, sort_key, descending, limit + 1, after=position)
+        else:
+            filters: Dict[str, Any] = {"book_id": book_id, **ACTIVE}
+            if after:
+                keyset = keyset_filter(sort_key, after["k"], self._object_id(after["id"]), descending)
+                filters = {"$and": [filters, keyset]}
+            found = (
+                database.reviews.find(filters)
+                .sort([(sort_key, direction), ("_id", direction)])
+                .limit(limit + 1)
+            )
+            reviews = self._serialize_many(found)
+        if len(reviews) <= limit:
+            return reviews, None
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        last_value = last.get(sort_key)
+        if database is None:
+            # The memory store orders on the coerced value, so the cursor must too.
+            last_value = position_value(sort_key, last_value)
+        return reviews, encode_cursor({"k": last_value, "id": last["_id"], "s": sort})
+
+    def update_review(
+        self, review_id: str, updates: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Edita una reseña activa; devuelve la versión anterior y la nueva (None si no existe)."""
+        database = self.db()
+        if database is None:
+            review = self._find_active(review_id)
+            if review is None:
+                return None, None
+            before = dict(review)
+            return before, self._memory_reviews.update(review_id, updates)
         document = database.reviews.find_one_and_update(
-            {"_id": self._object_id(review_id)},
+            {"_id": self._object_id(review_id), "deleted_at": None},
             {"$set": updates},
-            return_document=ReturnDocument.AFTER,
+            return_document=ReturnDocument.BEFORE,
+        )
+        if document is None:
+            return None, None
+        before = self._serialize(document)
+        return before, {**before, **updates}
+
+    def delete_review(self, review_id: str) -> Optional[Dict[str, Any]]:
+        """Borrado lógico idempotente: solo la primera llamada devuelve la reseña borrada."""
+        deleted_at = datetime.utcnow().isoformat()
+        database = self.db()
+        if database is None:
+            review = self._find_active(review_id)
+            if review is None:
+                return None
+            before = dict(review)
+            self._memory_reviews.update(review_id, {"deleted_at": deleted_at})
+            return before
+        document = database.reviews.find_one_and_update(
+            {"_id": self._object_id(review_id), "deleted_at": None},
+            {"$set": {"deleted_at": deleted_at}},
+            return_document=ReturnDocument.BEFORE,
         )
         return self._serialize(document)
 
-    def delete_review(self, review_id: str) -> bool:
+    def review_summaries(self, book_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Resúmenes calculados desde las reseñas activas (todos los libros si ``book_ids`` es None).
+
+        Una sola agregación agrupada por (libro, puntuación) para todo el lote.
+        """
+        wanted = None if book_ids is None else {str(book_id) for book_id in book_ids}
+        found: Dict[str, Dict[str, Any]] = {}
         database = self.db()
         if database is None:
-            for review in self._memory_reviews:
-                if str(review.get("_id")) == str(review_id):
-                    review["deleted_at"] = datetime.utcnow().isoformat()
-                    return True
-            return False
-        result = database.reviews.update_one(
-            {"_id": self._object_id(review_id)},
-            {"$set": {"deleted_at": datetime.utcnow().isoformat()}},
+            if wanted is None:
+                reviews: Iterable[Dict[str, Any]] = (
+                    review for review in self._memory_reviews if not review.get("deleted_at")
+                )
+            else:
+                reviews = (review for book_id in wanted for review in self._memory_reviews.for_book(book_id))
+            for review in reviews:
+                if review.get("rating") is None:
+                    continue
+                book_id = str(review.get("book_id"))
+                summary = found.setdefault(book_id, summaries.empty(book_id))
+                summaries.add_review(summary, review["rating"], review.get("created_at"))
+            return found
+        match: Dict[str, Any] = {**ACTIVE, "rating": {"$type": "number"}}
+        if wanted is not None:
+            match["book_id"] = {"$in": list(wanted)}
+        pipeline = [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": {"book_id": "$book_id", "rating": "$rating"},
+                    "count": {"$sum": 1},
+                    "latest": {"$max": "$created_at"},
+                }
+            },
+        ]
+        for row in database.reviews.aggregate(pipeline):
+            book_id = str(row["_id"]["book_id"])
+            summary = found.setdefault(book_id, summaries.empty(book_id))
+            rating = str(int(row["_id"]["rating"]))
+            summaries.apply_delta(summary, {rating: int(row["count"])}, row.get("latest"))
+        return found
+
+    def rating_totals(self, book_ids: Optional[Iterable[str]] = None) -> Dict[str, Tuple[float, int]]:
+        """Suma y número de valoraciones activas por libro (todos si ``book_ids`` es None)."""
+        return {
+            book_id: (float(summary["sum"]), int(summary["count"]))
+            for book_id, summary in self.review_summaries(book_ids).items()
+        }
+
+    def get_summary(self, book_id: str) -> Optional[Dict[str, Any]]:
+        database = self.db()
+        if database is None:
+            return self._memory_summaries.get(str(book_id))
+        return database.book_review_summaries.find_one({"_id": str(book_id)})
+
+    def get_summaries(self, book_ids: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Resúmenes guardados (todos si ``book_ids`` es None)."""
+        database = self.db()
+        if database is None:
+            if book_ids is None:
+                return dict(self._memory_summaries)
+            wanted = (str(book_id) for book_id in book_ids)
+            return {
+                book_id: self._memory_summaries[book_id]
+                for book_id in wanted
+                if book_id in self._memory_summaries
+            }
+        filters = {} if book_ids is None else {"_id": {"$in": [str(book_id) for book_id in book_ids]}}
+        return {document["_id"]: document for document in database.book_review_summaries.find(filters)}
+
+    def apply_summary_delta(
+        self, book_id: str, histogram: Dict[str, int], latest_review_at: Optional[str] = None
+    ) -> None:
+        """Suma ``histogram`` (puntuación → ±n) al resumen del libro en una escritura atómica."""
+        book_id = str(book_id)
+        database = self.db()
+        if database is None:
+            summary = self._memory_summaries.setdefault(book_id, summaries.empty(book_id))
+            summaries.apply_delta(summary, histogram, latest_review_at)
+            return
+        database.book_review_summaries.update_one(
+            {"_id": book_id}, summaries.delta_pipeline(histogram, latest_review_at), upsert=True
+        )
+
+    def set_summaries(self, found: Dict[str, Dict[str, Any]]) -> None:
+        """Sustituye los resúmenes de estos libros por los recalculados."""
+        if not found:
+            return
+        database = self.db()
+        if database is None:
+            self._memory_summaries.update(found)
+            return
+        database.book_review_summaries.bulk_write(
+            [ReplaceOne({"_id": book_id}, summary, upsert=True) for book_id, summary in found.items()],
+            ordered=False,
         )
-        return result.modified_count > 0
+
+    def _find_active(self, review_id: str) -> Optional[Dict[str, Any]]:
+        review = self._memory_reviews.get(review_id)
+        if review is None or review.get("deleted_at"):
+            return None
+        return review
 
     def _serialize_many(self, documents: Iterable[Dict[str, Any]] | None) -> List[Dict[str, Any]]:
         if not documents:
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+# One document per book in ``book_review_summaries``:
+# {_id: book_id, histogram: {"1".."5": n}, count, sum, mean, latest_review_at}.
+RATINGS = ("1", "2", "3", "4", "5")
+
+
+def empty(book_id: str) -> Dict[str, Any]:
+    return {
+        "_id": book_id,
+        "histogram": dict.fromkeys(RATINGS, 0),
+        "count": 0,
+        "sum": 0,
+        "mean": 0,
+        "latest_review_at": None,
+    }
+
+
+def _mean(rating_sum: float, count: int) -> float:
+    return round(rating_sum / count, 2) if count > 0 else 0
+
+
+def delta_pipeline(histogram: Dict[str, int], latest_review_at: Optional[str]) -> List[Dict[str, Any]]:
+    """Update de agregación (con upsert) que suma ``histogram`` al resumen y recalcula la media."""
+    count = sum(histogram.values())
+    rating_sum = sum(int(rating) * delta for rating, delta in histogram.items())
+    changes: Dict[str, Any] = {
+        f"histogram.{rating}": {"$add": [{"$ifNull": [f"$histogram.{rating}", 0]}, delta]}
+        for rating, delta in histogram.items()
+    }
+    changes["count"] = {"$add": [{"$ifNull": ["$count", 0]}, count]}
+    changes["sum"] = {"$add": [{"$ifNull": ["$sum", 0]}, rating_sum]}
+    if latest_review_at:
+        changes["latest_review_at"] = {"$max": ["$latest_review_at", latest_review_at]}
+    return [
+        {"$set": changes},
+        {
+            "$set": {
+                "mean": {
+                    "$cond": [{"$gt": ["$count", 0]}, {"$round": [{"$divide": ["$sum", "$count"]}, 2]}, 0]
+                }
+            }
+        },
+    ]
+
+
+def apply_delta(
+    summary: Dict[str, Any], histogram: Dict[str, int], latest_review_at: Optional[str]
+) -> Dict[str, Any]:
+    """Equivalente en Python de ``delta_pipeline`` para el modo en memoria."""
+    for rating, delta in histogram.items():
+        summary["histogram"][rating] = summary["histogram"].get(rating, 0) + delta
+        summary["count"] += delta
+        summary["sum"] += int(rating) * delta
+    if latest_review_at and (summary["latest_review_at"] or "") < latest_review_at:
+        summary["latest_review_at"] = latest_review_at
+    summary["mean"] = _mean(summary["sum"], summary["count"])
+    return summary
+
+
+def add_review(summary: Dict[str, Any], rating: Any, created_at: Optional[str]) -> None:
+    apply_delta(summary, {str(int(rating)): 1}, created_at)
+
+
+def render(book_id: str, summary: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Respuesta del endpoint: el resumen más el porcentaje de cada puntuación."""
+    summary = summary or empty(book_id)
+    histogram = {rating: int(summary.get("histogram", {}).get(rating, 0)) for rating in RATINGS}
+    count = int(summary.get("count", 0))
+    return {
+        "book_id": book_id,
+        "count": count,
+        "mean": summary.get("mean", 0),
+        "histogram": histogram,
+        "percentages": {
+            rating: round(100 * value / count, 1) if count else 0.0 for rating, value in histogram.items()
+        },
+        "latest_review_at": summary.get("latest_review_at"),
+    }
+
+
+def drifted(stored: Optional[Dict[str, Any]], fresh: Optional[Dict[str, Any]]) -> bool:
+    """True si el resumen guardado no coincide con el recalculado (None equivale a vacío)."""
+
+    def key(summary: Optional[Dict[str, Any]]) -> Any:
+        if not summary or not summary.get("count"):
+            return None
+        histogram = summary.get("histogram", {})
+        return (
+            tuple(int(histogram.get(rating, 0)) for rating in RATINGS),
+            summary.get("latest_review_at"),
+        )
+
+    return key(stored) != key(fresh)
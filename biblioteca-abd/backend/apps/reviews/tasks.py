@@ -1,9 +1,120 @@
 from __future__ import annotations
 
+import time
+from typing import Dict, Optional
+
+import structlog
 from celery import shared_task
+from django.conf import settings
+
+from ..authx.services.redis_service import (
+    claim,
+    invalidate_books_cache,
+    pop_dirty_books,
+)
+from ..catalog.services import ratings
+from ..catalog.services.mongo_service import mongo_service
+from ..catalog.tasks import schedule_books_cache_warm
+from .services import summaries
+from .services.book_stats import expire_books, recompute_books
+from .services.mongo_reviews import mongo_reviews
+
+logger = structlog.get_logger(__name__)
+
+DRAIN_DEBOUNCE_KEY = "lock:drain:book-stats"
 
 
 @shared_task
 def recompute_book_stats(book_id: str) -> None:
-    # Placeholder for future aggregation over MongoDB reviews collection.
-    return None
+    """Recalcula las estadísticas y el resumen de un libro desde sus reseñas activas."""
+    recompute_books([str(book_id)])
+
+
+@shared_task
+def reconcile_book_stats(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Corrige la deriva de los deltas comparando cada libro con una agregación completa de reseñas.
+
+    Las escrituras de reseñas solo aplican deltas; esta tarea periódica es la
+    que garantiza que ``rating_sum``/``rating_count`` acaban coincidiendo.
+    Recorre el catálogo por lotes de ``REVIEW_STATS_BATCH_SIZE`` libros, como
+    ``drain_book_stats``, para no cargar todos los resúmenes a la vez.
+    """
+    batch_size = batch_size or settings.REVIEW_STATS_BATCH_SIZE
+    checked = corrected = summaries_corrected = 0
+    for book_ids in mongo_service.iter_book_ids(batch_size):
+        fresh = mongo_reviews.review_summaries(book_ids)
+        totals = {
+            book_id: (float(summary["sum"]), int(summary["count"])) for book_id, summary in fresh.items()
+        }
+        books = mongo_service.rating_stats(book_ids)
+        corrections = {
+            book_id: totals.get(book_id, (0.0, 0))
+            for book_id, book in books.items()
+            if ratings.drifted(book, *totals.get(book_id, (0.0, 0)))
+        }
+        stored = mongo_reviews.get_summaries(book_ids)
+        stale_summaries = {
+            book_id: fresh.get(book_id) or summaries.empty(book_id)
+            for book_id in book_ids
+            if summaries.drifted(stored.get(book_id), fresh.get(book_id))
+        }
+        mongo_service.set_rating_totals(corrections)
+        mongo_reviews.set_summaries(stale_summaries)
+        if corrections or stale_summaries:
+            expire_books(set(corrections) | set(stale_summaries))
+        checked += len(books)
+        corrected += len(corrections)
+        summaries_corrected += len(stale_summaries)
+    if corrected or summaries_corrected:
+        logger.warning("book_stats_drift_corrected", books=corrected, summaries=summaries_corrected)
+    if corrected:
+        invalidate_books_cache()
+        schedule_books_cache_warm()
+    return {"checked": checked, "corrected": corrected, "summaries_corrected": summaries_corrected}
+
+
+@shared_task
+def drain_book_stats(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Recalcula una vez cada libro marcado por escrituras de reseñas y refresca solo sus caches.
+
+    Vacía ``stats:books:dirty`` por lotes: una agregación sobre las reseñas de
+    todo el lote, una escritura en bloque y una invalidación por etiquetas.
+    """
+    batch_size = batch_size or settings.REVIEW_STATS_BATCH_SIZE
+    started = time.monotonic()
+    books = batches = invalidated = 0
+    while True:
+        book_ids = pop_dirty_books(batch_size)
+        if not book_ids:
+            break
+        invalidated += recompute_books(book_ids)
+        books += len(book_ids)
+        batches += 1
+        if len(book_ids) < batch_size:
+            break
+    result = {
+        "books": books,
+        "batches": batches,
+        "invalidated": invalidated,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+    }
+    logger.info("drain_book_stats_finished", **result)
+    return result
+
+
+def schedule_book_stats_drain() -> None:
+    """Encola ``drain_book_stats`` como mucho una vez por ventana de rebote.
+
+    El tráfico del broker crece con las ventanas con escrituras, no con el
+    número de reseñas. En modo eager no se encola nada, para no recalcular
+    dentro de la propia petición: el set queda para la entrada de beat.
+    """
+    if drain_book_stats.app.conf.task_always_eager:
+        return
+    if not claim(DRAIN_DEBOUNCE_KEY, settings.REVIEW_STATS_DEBOUNCE_SECONDS):
+        return
+    try:
+        drain_book_stats.apply_async(countdown=settings.REVIEW_STATS_DEBOUNCE_SECONDS, retry=False)
+    except Exception as exc:
+        # The beat entry drains the set anyway.
+        logger.warning("drain_book_stats_not_scheduled", error=str(exc))
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.authx.services.redis_service import RateLimitResult
+from apps.catalog.services import book_cache
+from apps.catalog.services.mongo_service import mongo_service
+from apps.reviews import tasks as review_tasks
+from apps.reviews import views as review_views
+from apps.reviews.services import book_stats
+from apps.reviews.services.mongo_reviews import mongo_reviews
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    mongo_service._memory_books.clear()
+    mongo_reviews._memory_reviews.clear()
+    mongo_reviews._memory_summaries.clear()
+    expired = []
+    dirty = set()
+    scheduled = []
+    warmed = []
+    monkeypatch.setattr(book_cache, "expire_book", expired.append)
+    monkeypatch.setattr(book_stats, "mark_books_dirty", lambda book_ids: dirty.update(book_ids) or True)
+    monkeypatch.setattr(review_views, "schedule_book_stats_drain", lambda: scheduled.append(1))
+    monkeypatch.setattr(
+        review_tasks, "pop_dirty_books", lambda count: [dirty.pop() for _ in range(min(count, len(dirty)))]
+    )
+    monkeypatch.setattr(
+        book_stats, "invalidate_cache_tags", lambda tags, keys=(): expired.extend(tags) or len(tags)
+    )
+    monkeypatch.setattr(review_tasks, "invalidate_books_cache", lambda: None)
+    monkeypatch.setattr(book_stats, "schedule_books_cache_warm", lambda: warmed.append("stats"))
+    monkeypatch.setattr(review_tasks, "schedule_books_cache_warm", lambda: warmed.append("reconcile"))
+    monkeypatch.setattr(
+        review_views, "anti_spam_limit", lambda user_id: RateLimitResult(allowed=True, limit=5, remaining=4)
+    )
+    imported = mongo_service.create_book({"title": "Importado", "avg_rating": 4.0, "rating_count": 10})
+    fresh = mongo_service.create_book({"title": "Nuevo"})
+    yield {
+        "imported": imported["_id"],
+        "fresh": fresh["_id"],
+        "expired": expired,
+        "dirty": dirty,
+        "scheduled": scheduled,
+        "warmed": warmed,
+    }
+    mongo_service._memory_books.clear()
+    mongo_reviews._memory_reviews.clear()
+    mongo_reviews._memory_summaries.clear()
+
+
+def _review(book_id, rating):
+    response = APIClient().post(reverse("review-create"), {"book_id": book_id, "rating": rating, "user_id": "u1"})
+    assert response.status_code == 201
+    return response.data["_id"]
+
+
+def _stats(book_id):
+    book = mongo_service.get_book(book_id)
+    return book["avg_rating"], book["rating_count"], book["rating_sum"]
+
+
+def test_create_update_and_delete_apply_deltas(catalog):
+    book_id = catalog["fresh"]
+    first = _review(book_id, 5)
+    _review(book_id, 2)
+    assert _stats(book_id) == (3.5, 2, 7.0)
+
+    client = APIClient()
+    assert client.patch(reverse("review-update", args=[first]), {"rating": 3}).status_code == 200
+    assert _stats(book_id) == (2.5, 2, 5.0)
+
+    assert client.delete(reverse("review-update", args=[first])).status_code == 204
+    assert client.delete(reverse("review-update", args=[first])).status_code == 404
+    assert _stats(book_id) == (2.0, 1, 2.0)
+    assert catalog["dirty"] == {book_id} and len(catalog["scheduled"]) == 4
+    assert catalog["expired"] == []
+
+
+def test_drain_recomputes_each_dirty_book_once_and_invalidates_its_pages(catalog, monkeypatch):
+    for rating in (5, 4, 3):
+        _review(catalog["fresh"], rating)
+    _review(catalog["imported"], 5)
+    mongo_service._memory_books.update(catalog["fresh"], {"rating_sum": 99.0})
+    aggregations = []
+    aggregate = review_tasks.mongo_reviews.review_summaries
+    monkeypatch.setattr(
+        review_tasks.mongo_reviews,
+        "review_summaries",
+        lambda ids: aggregations.append(sorted(ids)) or aggregate(ids),
+    )
+
+    result = review_tasks.drain_book_stats.run(batch_size=10)
+
+    assert result["books"] == 2 and result["batches"] == 1
+    assert aggregations == [sorted([catalog["fresh"], catalog["imported"]])]
+    assert _stats(catalog["fresh"]) == (4.0, 3, 12.0)
+    assert sorted(catalog["expired"]) == sorted(
+        f"cache:books:tag:{book_id}" for book_id in (catalog["fresh"], catalog["imported"])
+    )
+    assert catalog["warmed"] == ["stats"]
+    assert review_tasks.drain_book_stats.run()["books"] == 0
+
+
+def test_bursts_schedule_one_drain_per_window(monkeypatch):
+    from config.celery import app as celery_app
+
+    claims = iter([True, False, False])
+    queued = []
+    previous = celery_app.conf.task_always_eager
+    celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=False)
+    monkeypatch.setattr(review_tasks, "claim", lambda key, ttl: next(claims))
+    monkeypatch.setattr(review_tasks.drain_book_stats, "apply_async", lambda **kwargs: queued.append(kwargs))
+    monkeypatch.setattr(review_tasks.drain_book_stats, "apply", lambda **kwargs: queued.append("eager"))
+    try:
+        for _ in range(3):
+            review_tasks.schedule_book_stats_drain()
+        celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True)
+        review_tasks.schedule_book_stats_drain()
+    finally:
+        celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=previous)
+
+    # Eager mode leaves the dirty set for beat instead of draining in the request.
+    assert len(queued) == 1
+
+
+def test_update_rejects_invalid_rating(catalog):
+    review_id = _review(catalog["fresh"], 4)
+
+    response = APIClient().patch(reverse("review-update", args=[review_id]), {"rating": 9})
+
+    assert response.status_code == 400
+    assert _stats(catalog["fresh"]) == (4.0, 1, 4.0)
+
+
+def test_reviews_add_to_imported_ratings(catalog):
+    _review(catalog["imported"], 1)
+
+    book = mongo_service.get_book(catalog["imported"])
+    assert (book["rating_base_count"], book["rating_count"], book["rating_sum"]) == (10, 11, 41.0)
+    assert book["avg_rating"] == 3.73
+
+
+def test_reconcile_corrects_drift_only_where_needed(catalog, monkeypatch):
+    _review(catalog["fresh"], 4)
+    _review(catalog["imported"], 5)
+    mongo_service._memory_books.update(catalog["fresh"], {"rating_sum": 40.0, "rating_count": 9})
+    aggregations = []
+    aggregate = review_tasks.mongo_reviews.review_summaries
+    monkeypatch.setattr(
+        review_tasks.mongo_reviews,
+        "review_summaries",
+        lambda ids: aggregations.append(len(ids)) or aggregate(ids),
+    )
+
+    result = review_tasks.reconcile_book_stats.run(batch_size=1)
+
+    assert result == {"checked": 2, "corrected": 1, "summaries_corrected": 0}
+    assert aggregations == [1, 1]
+    assert _stats(catalog["fresh"]) == (4.0, 1, 4.0)
+    assert _stats(catalog["imported"]) == (4.09, 11, 45.0)
+    assert catalog["warmed"] == ["stats", "reconcile"]
+
+
+def test_summary_is_kept_incrementally_and_served_from_cache(catalog, monkeypatch):
+    cache = {}
+    monkeypatch.setattr(review_views, "cache_get", cache.get)
+    monkeypatch.setattr(review_views, "cache_set", lambda key, value, ttl=None: cache.__setitem__(key, value))
+    book_id = catalog["fresh"]
+    first = _review(book_id, 5)
+    for rating in (5, 4, 1):
+        _review(book_id, rating)
+    client = APIClient()
+    client.patch(reverse("review-update", args=[first]), {"rating": 3})
+    client.delete(reverse("review-update", args=[first]))
+
+    response = client.get(reverse("book-reviews-summary", args=[book_id]))
+
+    assert response.data["count"] == 3 and response.data["mean"] == 3.33
+    assert response.data["histogram"] == {"1": 1, "2": 0, "3": 0, "4": 1, "5": 1}
+    assert response.data["percentages"]["5"] == 33.3
+    assert response.data["latest_review_at"] is not None
+    assert mongo_reviews.get_summary(book_id)["histogram"]["5"] == 1
+    assert mongo_reviews.review_summaries([book_id])[book_id]["histogram"] == response.data["histogram"]
+
+    _review(book_id, 2)
+    assert client.get(reverse("book-reviews-summary", args=[book_id])).data["count"] == 3
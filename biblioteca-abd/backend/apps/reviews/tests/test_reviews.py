@@ -6,3 +6,80 @@ def test_create_review_requires_valid_rating():
     client = APIClient()
     response = client.post(reverse("review-create"), {"book_id": "1", "rating": 6, "text": "oops"})
     assert response.status_code == 400
+
+
+def test_review_spam_returns_retry_after(monkeypatch):
+    from apps.authx.services.redis_service import RateLimitResult
+    from apps.reviews import views as review_views
+
+    monkeypatch.setattr(
+        review_views,
+        "anti_spam_limit",
+        lambda user_id: RateLimitResult(allowed=False, limit=5, remaining=0, retry_after=41.5),
+    )
+    response = APIClient().post(reverse("review-create"), {"book_id": "1", "rating": 4, "user_id": "u1"})
+
+    assert response.status_code == 429
+    assert response["Retry-After"] == "42"
+
+
+def test_book_reviews_are_cursor_paginated_and_sorted():
+    from apps.reviews.services.mongo_reviews import mongo_reviews
+
+    mongo_reviews._memory_reviews.clear()
+    for index, rating in enumerate([3, 5, 1, 4, 5]):
+        mongo_reviews.create_review(
+            {"book_id": "b1", "rating": rating, "created_at": f"2024-01-0{index + 1}T00:00:00"}
+        )
+    mongo_reviews.create_review({"book_id": "b2", "rating": 2})
+    mongo_reviews.delete_review("rev-2")
+    client = APIClient()
+    url = reverse("book-reviews", args=["b1"])
+
+    first = client.get(url, {"page_size": 2}).data
+    second = client.get(url, {"page_size": 2, "cursor": first["next_cursor"]}).data
+
+    assert [review["rating"] for review in first["results"] + second["results"]] == [5, 4, 1, 3]
+    assert second["next_cursor"] is None
+    highest = client.get(url, {"sort": "highest"}).data["results"]
+    assert [review["rating"] for review in highest] == [5, 4, 3, 1]
+    lowest = client.get(url, {"sort": "lowest", "page_size": 3}).data
+    assert [review["rating"] for review in lowest["results"]] == [1, 3, 4]
+    assert client.get(url, {"sort": "highest", "cursor": first["next_cursor"]}).status_code == 400
+    assert client.get(url, {"sort": "random"}).status_code == 400
+    mongo_reviews._memory_reviews.clear()
+
+
+def test_reviews_without_deleted_at_count_as_active():
+    from apps.reviews.services.mongo_reviews import ACTIVE, mongo_reviews
+
+    mongo_reviews._memory_reviews.clear()
+    # Stored before soft deletes existed: no ``deleted_at`` field at all.
+    mongo_reviews._memory_reviews.add({"_id": "legacy", "book_id": "b1", "rating": 4})
+    mongo_reviews.create_review({"book_id": "b1", "rating": 2})
+
+    listed = APIClient().get(reverse("book-reviews", args=["b1"])).data["results"]
+
+    assert ACTIVE == {"deleted_at": None}
+    assert {review["_id"] for review in listed} == {"legacy", "rev-2"}
+    assert mongo_reviews.rating_totals(["b1"]) == {"b1": (6.0, 2)}
+    mongo_reviews._memory_reviews.clear()
+
+
+def test_memory_cursor_pages_through_reviews_without_created_at():
+    from apps.reviews.services.mongo_reviews import mongo_reviews
+
+    mongo_reviews._memory_reviews.clear()
+    for review_id in ("a", "b", "c"):
+        mongo_reviews._memory_reviews.add({"_id": review_id, "book_id": "b1", "rating": 3, "deleted_at": None})
+    client = APIClient()
+    url = reverse("book-reviews", args=["b1"])
+
+    seen, cursor = [], None
+    for _ in range(3):
+        page = client.get(url, {"page_size": 1, **({"cursor": cursor} if cursor else {})}).data
+        seen += [review["_id"] for review in page["results"]]
+        cursor = page["next_cursor"]
+
+    assert seen == ["c", "b", "a"] and cursor is None
+    mongo_reviews._memory_reviews.clear()
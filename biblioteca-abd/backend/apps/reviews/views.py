@@ -1,49 +1,114 @@
+import math
+
+from django.conf import settings
 from rest_framework import permissions, status, viewsets
 from rest_framework.response import Response
 
-from ..authx.services.redis_service import anti_spam_check
-from .services.mongo_reviews import mongo_reviews
-from .tasks import recompute_book_stats
+from ..authx.services.redis_service import (
+    anti_spam_limit,
+    cache_get,
+    cache_key_for_review_summary,
+    cache_set,
+)
+from ..catalog.services.cursors import InvalidCursor
+from .services import book_stats, summaries
+from .services.mongo_reviews import REVIEW_SORTS, mongo_reviews
+from .tasks import schedule_book_stats_drain
+
+MAX_PAGE_SIZE = 100
+
+
+def _rating(value):
+    try:
+        rating = int(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 1 <= rating <= 5 else None
+
+
+def _payload(request):
+    # QueryDict (form/multipart) would turn every value into a list.
+    data = request.data
+    return data.dict() if hasattr(data, "dict") else dict(data)
+
+
+def _stats_changed(before, after):
+    if book_stats.review_changed(before, after):
+        schedule_book_stats_drain()
 
 
 class ReviewViewSet(viewsets.ViewSet):
     permission_classes = [permissions.AllowAny]
 
     def create(self, request):
-        rating = request.data.get("rating")
-        try:
-            rating_value = int(rating)
-        except (TypeError, ValueError):
-            return Response({"detail": "rating debe estar entre 1 y 5"}, status=status.HTTP_400_BAD_REQUEST)
-        if rating_value < 1 or rating_value > 5:
+        rating_value = _rating(request.data.get("rating"))
+        if rating_value is None:
             return Response({"detail": "rating debe estar entre 1 y 5"}, status=status.HTTP_400_BAD_REQUEST)
         user_id = str(request.data.get("user_id", "anon"))
-        if anti_spam_check(user_id):
-            return Response({"detail": "demasiadas reseñas en poco tiempo"}, status=status.HTTP_429_TOO_MANY_REQUESTS)
-        payload = dict(request.data)
+        spam = anti_spam_limit(user_id)
+        if not spam.allowed:
+            return Response(
+                {"detail": "demasiadas reseñas en poco tiempo"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(spam.retry_after))},
+            )
+        payload = _payload(request)
         payload["rating"] = rating_value
         review = mongo_reviews.create_review(payload)
-        recompute_book_stats.delay(review.get("book_id"))
+        _stats_changed(None, review)
         return Response(review, status=status.HTTP_201_CREATED)
 
     def list(self, request, book_id=None):
-        reviews = mongo_reviews.list_reviews_for_book(book_id)
-        return Response({"results": reviews, "count": len(reviews)})
+        sort = request.query_params.get("sort", "newest")
+        if sort not in REVIEW_SORTS:
+            return Response(
+                {"detail": f"sort debe ser uno de: {', '.join(REVIEW_SORTS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            page_size = min(max(int(request.query_params.get("page_size", 20)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({"detail": "page_size debe ser numérico"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            reviews, next_cursor = mongo_reviews.list_reviews_for_book(
+                book_id, sort, page_size, request.query_params.get("cursor") or None
+            )
+        except InvalidCursor:
+            return Response({"detail": "cursor inválido"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": reviews, "page_size": page_size, "sort": sort, "next_cursor": next_cursor})
+
+    def summary(self, request, book_id=None):
+        """Histograma, número, media y fecha de la última reseña; lectura O(1) del resumen materializado."""
+        key = cache_key_for_review_summary(book_id)
+        cached = cache_get(key)
+        if cached is not None:
+            return Response(cached)
+        data = summaries.render(book_id, mongo_reviews.get_summary(book_id))
+        cache_set(key, data, settings.CACHE_BOOK_TTL_SECONDS)
+        return Response(data)
 
     def partial_update(self, request, pk=None):
-        updated = mongo_reviews.update_review(pk, request.data)
+        updates = _payload(request)
+        if "rating" in updates:
+            rating_value = _rating(updates["rating"])
+            if rating_value is None:
+                return Response({"detail": "rating debe estar entre 1 y 5"}, status=status.HTTP_400_BAD_REQUEST)
+            updates["rating"] = rating_value
+        before, updated = mongo_reviews.update_review(pk, updates)
         if not updated:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        recompute_book_stats.delay(updated.get("book_id"))
+        _stats_changed(before, updated)
         return Response(updated)
 
     def destroy(self, request, pk=None):
         removed = mongo_reviews.delete_review(pk)
         if not removed:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        _stats_changed(removed, None)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 review_create = ReviewViewSet.as_view({"post": "create"})
 review_update = ReviewViewSet.as_view({"patch": "partial_update", "delete": "destroy"})
 review_list = ReviewViewSet.as_view({"get": "list"})
+review_summary = ReviewViewSet.as_view({"get": "summary"})
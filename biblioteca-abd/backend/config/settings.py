@@ -36,6 +36,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.authx.middleware.RateLimitHeadersMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -95,12 +96,63 @@ SPECTACULAR_SETTINGS = {
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_CODEC = os.getenv("CACHE_CODEC", "json")
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "0"))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", "1"))
+CACHE_BOOK_TTL_SECONDS = int(os.getenv("CACHE_BOOK_TTL_SECONDS", "600"))
+CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("CACHE_NEGATIVE_TTL_SECONDS", "30"))
+CACHE_SWR_PREFIXES = tuple(
+    prefix for prefix in os.getenv("CACHE_SWR_PREFIXES", "cache:books:list:").split(",") if prefix
+)
+CACHE_SOFT_TTL_SECONDS = int(os.getenv("CACHE_SOFT_TTL_SECONDS", "60"))
+CACHE_LOCK_TTL_MS = int(os.getenv("CACHE_LOCK_TTL_MS", "5000"))
+CACHE_LOCK_WAIT_MS = int(os.getenv("CACHE_LOCK_WAIT_MS", "200"))
+CACHE_POPULAR_SAMPLE_RATE = float(os.getenv("CACHE_POPULAR_SAMPLE_RATE", "0.1"))
+CACHE_POPULAR_MAX_TRACKED = int(os.getenv("CACHE_POPULAR_MAX_TRACKED", "1000"))
+CACHE_POPULAR_DECAY = float(os.getenv("CACHE_POPULAR_DECAY", "0.5"))
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+CACHE_WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", "4"))
+CACHE_WARM_TIME_LIMIT_SECONDS = int(os.getenv("CACHE_WARM_TIME_LIMIT_SECONDS", "60"))
+CACHE_WARM_INTERVAL_SECONDS = int(os.getenv("CACHE_WARM_INTERVAL_SECONDS", "300"))
+CACHE_WARM_DEBOUNCE_SECONDS = int(os.getenv("CACHE_WARM_DEBOUNCE_SECONDS", "5"))
+CACHE_L1_ENABLED = bool(int(os.getenv("CACHE_L1_ENABLED", "0")))
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "512"))
+CACHE_L1_TTL_SECONDS = float(os.getenv("CACHE_L1_TTL_SECONDS", "5"))
+CACHE_L1_PREFIXES = tuple(
+    prefix for prefix in os.getenv("CACHE_L1_PREFIXES", "cache:books:list:").split(",") if prefix
+)
+REVIEW_STATS_BATCH_SIZE = int(os.getenv("REVIEW_STATS_BATCH_SIZE", "500"))
+REVIEW_STATS_DEBOUNCE_SECONDS = int(os.getenv("REVIEW_STATS_DEBOUNCE_SECONDS", "5"))
+REVIEW_STATS_DRAIN_INTERVAL_SECONDS = int(os.getenv("REVIEW_STATS_DRAIN_INTERVAL_SECONDS", "60"))
+REVIEW_STATS_RECONCILE_INTERVAL_SECONDS = int(os.getenv("REVIEW_STATS_RECONCILE_INTERVAL_SECONDS", "3600"))
+CACHE_METRICS_LOG_INTERVAL_SECONDS = float(os.getenv("CACHE_METRICS_LOG_INTERVAL_SECONDS", "60"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT_SECONDS = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", "1"))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", "1"))
+REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", "1"))
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", "30"))
 RATE_LIMIT_WINDOW_SECONDS = int(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "900"))
 RATE_LIMIT_MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "100"))
 AUTH_TOKEN_TTL_SECONDS = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", "86400"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "2048"))
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 MONGO_DB = os.getenv("MONGO_DB", "biblioteca")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "500"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_HEALTHCHECK_INTERVAL_SECONDS = float(os.getenv("MONGO_HEALTHCHECK_INTERVAL_SECONDS", "5"))
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "100"))
+IMPORT_PARALLEL_MIN_BYTES = int(os.getenv("IMPORT_PARALLEL_MIN_BYTES", str(16 * 1024 * 1024)))
+IMPORT_CHUNK_BYTES = int(os.getenv("IMPORT_CHUNK_BYTES", str(8 * 1024 * 1024)))
+IMPORT_MAX_ITEM_CHARS = int(os.getenv("IMPORT_MAX_ITEM_CHARS", str(1024 * 1024)))
 
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
@@ -162,7 +214,20 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.reco.tasks.recompute_similar_books",
         "schedule": 3600,
         "args": [None],
-    }
+    },
+    "drain-book-stats": {
+        "task": "apps.reviews.tasks.drain_book_stats",
+        "schedule": REVIEW_STATS_DRAIN_INTERVAL_SECONDS,
+    },
+    "reconcile-book-stats": {
+        "task": "apps.reviews.tasks.reconcile_book_stats",
+        "schedule": REVIEW_STATS_RECONCILE_INTERVAL_SECONDS,
+    },
+    "warm-books-cache": {
+        "task": "apps.catalog.tasks.warm_books_cache",
+        "schedule": CACHE_WARM_INTERVAL_SECONDS,
+        "kwargs": {"scheduled": True},
+    },
 }
 
 CELERY_TASK_ALWAYS_EAGER = bool(int(os.getenv("CELERY_TASK_ALWAYS_EAGER", "1")))
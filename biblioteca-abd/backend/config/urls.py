@@ -1,4 +1,8 @@
+import hmac
+
+from django.conf import settings
 from django.contrib import admin
+from django.http import Http404, HttpResponse
 from django.urls import include, path, re_path
 from drf_spectacular.views import (
     SpectacularAPIView,
@@ -8,6 +12,8 @@ from drf_spectacular.views import (
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.authx.services.cache_metrics import metrics
+
 
 class HealthView(APIView):
     authentication_classes: list = []
@@ -17,9 +23,23 @@ class HealthView(APIView):
         return Response({"status": "ok"})
 
 
+def metrics_view(request):
+    # Plain Django view: Prometheus expects its text format, not DRF negotiation.
+    # Disabled unless METRICS_TOKEN is set; scrapers send it as a bearer token.
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+        response = HttpResponse("unauthorized", status=401, content_type="text/plain")
+        response["WWW-Authenticate"] = "Bearer"
+        return response
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     re_path(r"^health/?$", HealthView.as_view(), name="health"),
+    re_path(r"^metrics/?$", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/schema/swagger/", SpectacularSwaggerView.as_view(url_name="schema")),
     path("api/schema/redoc/", SpectacularRedocView.as_view(url_name="schema")),
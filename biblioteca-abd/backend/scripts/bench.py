@@ -0,0 +1,221 @@
+"""Micro-benchmarks for the Biblioteca ABD service layer.
+
+Run from the backend directory (or inside the web container):
+
+    python scripts/bench.py mongo-client --iterations 500
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+
+def _measure(func: Callable[[], object], iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{label:<28} mean={statistics.mean(samples):8.3f}ms "
+        f"p50={statistics.median(samples):8.3f}ms p99={p99:8.3f}ms"
+    )
+
+
+def bench_mongo_client(args: argparse.Namespace) -> int:
+    from django.conf import settings
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    from apps.catalog.services.mongo_client import get_database
+
+    if get_database() is None:
+        # Without a server both sides only time a failed server selection or a
+        # cached ``None``, not a query: refuse to print misleading numbers.
+        print(f"MongoDB no disponible en {settings.MONGO_URL}: el benchmark necesita un servidor real.")
+        return 1
+
+    def legacy_request():
+        # Previous behaviour: new client + ping before every query.
+        client = MongoClient(settings.MONGO_URL, serverSelectionTimeoutMS=500)
+        try:
+            client.admin.command("ping")
+            client[settings.MONGO_DB].books.find_one({"deleted": {"$ne": True}})
+        except PyMongoError:
+            pass
+        finally:
+            client.close()
+
+    def pooled_request():
+        get_database().books.find_one({"deleted": {"$ne": True}})
+
+    _report("legacy (client per call)", _measure(legacy_request, args.iterations))
+    _report("pooled (shared client)", _measure(pooled_request, args.iterations))
+    return 0
+
+
+def bench_redis_pool(args: argparse.Namespace) -> int:
+    import redis
+    from django.conf import settings
+
+    from apps.authx.services.redis_service import get_client
+
+    try:
+        get_client().ping()
+    except redis.RedisError:
+        # Without a server both sides would only time client construction.
+        print(f"Redis no disponible en {settings.REDIS_URL}: el benchmark necesita un servidor real.")
+        return 1
+
+    def legacy_call():
+        # Previous behaviour: a new client (and pool) for every cache/rate-limit call.
+        client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        client.get("bench:redis-pool")
+        client.connection_pool.disconnect()
+
+    def pooled_call():
+        get_client().get("bench:redis-pool")
+
+    _report("legacy (client per call)", _measure(legacy_call, args.iterations))
+    _report("pooled (shared pool)", _measure(pooled_call, args.iterations))
+    return 0
+
+
+def _sample_books(count: int) -> List[dict]:
+    synopsis = "Una saga familiar que atraviesa tres generaciones en un país sin nombre. " * 16
+    return [
+        {
+            "_id": f"{index:024x}",
+            "title": f"Libro de ejemplo {index}",
+            "authors": [
+                {"id": f"auth-{index}", "name": "Isabel Allende", "bio": "Escritora chilena. " * 20},
+                {"id": f"auth-{index + 1}", "name": "Jorge Luis Borges", "bio": "Escritor argentino. " * 20},
+            ],
+            "genres": ["Realismo mágico", "Novela"],
+            "year": 1982,
+            "isbn": "978-84-204-8155-5",
+            "synopsis": synopsis,
+            "cover_url": f"https://covers.example.com/{index}.jpg",
+            "avg_rating": 4.5,
+            "rating_count": 1200,
+            "created_at": "2024-01-01T00:00:00",
+            "updated_at": "2024-01-01T00:00:00",
+        }
+        for index in range(count)
+    ]
+
+
+def bench_payload(args: argparse.Namespace) -> int:
+    import json
+
+    import bson
+
+    from apps.catalog.services.projection import BOOK_SUMMARY_FIELDS, project
+
+    books = _sample_books(args.page_size)
+    variants = {
+        "full": books,
+        "summary": [project(book, BOOK_SUMMARY_FIELDS) for book in books],
+    }
+    for label, page in variants.items():
+        payload = json.dumps({"results": page, "page": 1, "page_size": len(page), "count": len(page)})
+        encoded = [bson.encode(book) for book in page]
+        samples = _measure(lambda encoded=encoded: [bson.decode(raw) for raw in encoded], args.iterations)
+        print(
+            f"{label:<8} json={len(payload.encode()):>8}B bson={sum(len(raw) for raw in encoded):>8}B "
+            f"bson_decode_mean={statistics.mean(samples):7.3f}ms"
+        )
+    return 0
+
+
+def bench_codec(args: argparse.Namespace) -> int:
+    import redis
+
+    from apps.authx.services import cache_codec
+    from apps.authx.services.redis_service import get_client
+    from apps.catalog.services.projection import BOOK_SUMMARY_FIELDS, project
+
+    try:
+        client = get_client(binary=True)
+        client.ping()
+    except redis.RedisError:
+        client = None
+        print("Redis no disponible: se omite MEMORY USAGE.")
+
+    books = _sample_books(args.page_size)
+    pages = {
+        "full": {"results": books, "page": 1, "page_size": len(books), "count": 5000, "count_estimated": False},
+        "summary": {
+            "results": [project(book, BOOK_SUMMARY_FIELDS) for book in books],
+            "page": 1,
+            "page_size": len(books),
+            "count": 5000,
+            "count_estimated": False,
+        },
+    }
+    variants = [("json", 0), ("json", 4096), ("msgpack", 0), ("msgpack", 4096)]
+    for page_label, page in pages.items():
+        for codec, threshold in variants:
+            encoded = cache_codec.encode(page, codec=codec, compress_min_bytes=threshold)
+            encode_ms = statistics.mean(
+                _measure(
+                    lambda page=page, codec=codec, threshold=threshold: cache_codec.encode(
+                        page, codec=codec, compress_min_bytes=threshold
+                    ),
+                    args.iterations,
+                )
+            )
+            decode_ms = statistics.mean(
+                _measure(lambda encoded=encoded: cache_codec.decode(encoded), args.iterations)
+            )
+            memory = ""
+            if client is not None:
+                key = f"bench:codec:{page_label}:{codec}:{threshold}"
+                client.set(key, encoded)
+                memory = f" redis={client.memory_usage(key):>8}B"
+                client.delete(key)
+            label = f"{page_label}/{codec}{'+zlib' if threshold else ''}"
+            print(f"{label:<22} size={len(encoded):>8}B{memory} encode={encode_ms:7.3f}ms decode={decode_ms:7.3f}ms")
+    return 0
+
+
+BENCHMARKS = {
+    "mongo-client": bench_mongo_client,
+    "codec": bench_codec,
+    "payload": bench_payload,
+    "redis-pool": bench_redis_pool,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa de servicios")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), help="Benchmark a ejecutar.")
+    parser.add_argument("--iterations", type=int, default=200, help="Repeticiones por caso (default: 200).")
+    parser.add_argument("--page-size", type=int, default=100, help="Libros por página de ejemplo (default: 100).")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    import django
+
+    django.setup()
+    return BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,5 +2,7 @@
 set -euo pipefail
 
 python manage.py migrate --noinput
+# Idempotent; search with q needs the text index.
+python manage.py ensure_indexes
 
 exec python manage.py runserver 0.0.0.0:8000